@@ -15,6 +15,7 @@ from urlparse import urljoin
 from errors import ItemNotFound, \
     HttpServerError, HttpUnauthorized
 import http_status_codes as http_code
+from prophet import utils
 
 DEFAULT_HEADERS = {"Content-Type": "application/json"}
 
@@ -73,11 +74,11 @@ class HttpRequest(object):
 
         logging.info("[HTTP]REQ: [%(method)s] %(headers)s %(url)s, "
                      "body is %(payload)s, "
-                     "query is %(query)s" % {
+                     "query is %(query)s", {
                          "method": method,
                          "headers": headers,
                          "url": url,
-                         "payload": payload,
+                         "payload": utils.capped(payload),
                          "query": query})
 
         ret_headers = None
@@ -109,18 +110,18 @@ class HttpRequest(object):
                          "%(method)s %(url)s, "
                          "RESP CODE: %(status_code)s\n"
                          "RESP HEADERS: %(resp_headers)s\n"
-                         "RESP BODY: %(resp_body)s" % {
+                         "RESP BODY: %(resp_body)s", {
                              "method": method,
                              "url": url,
                              "status_code": status_code,
                              "resp_headers": resp_headers,
-                             "resp_body": resp_body})
+                             "resp_body": utils.capped(resp_body)})
 
             ret_headers = resp_headers
             ret_body = resp_body
         except ValueError as err:
             logging.warn("[HTTP]Failed to parse RESP BODY "
-                         "in json, RESP BODY is %s" % resp_text)
+                         "in json, RESP BODY is %s", utils.capped(resp_text))
             ret_headers = resp_headers
             ret_body = resp_text
         except Exception as err:
@@ -18,10 +18,18 @@ import logging
 import os
 import sys
 
+from prophet import formats
 from prophet.scanner.network import NetworkController
+from prophet.collector import packager
 from prophet.collector.collector import HostCollector
+from prophet.collector.hosts import vmware
+from prophet.planner import flavor
+from prophet.planner import wave
 from prophet.report.host_report import HostReporter
+from prophet.report import mapping
+from prophet.report import transfer
 from prophet.utils import init_logging
+from prophet.utils import set_trace_payloads
 
 VER = "v0.1.0"
 
@@ -34,9 +42,6 @@ SCAN_REPORT_NAME = "scan_results.csv"
 # Default package name
 HOST_PACKAGE_NAME = "hosts_collection"
 
-# Default report name
-REPORT_NAME = "analysis_report.csv"
-
 
 def scan_network(args):
     host = args.host
@@ -56,8 +61,22 @@ def collect_hosts(args):
     force_check = args.force_check
     package_name = args.package_name
 
-    host_collector = HostCollector(host_file, output_path,
-                                   force_check, package_name)
+    host_collector = HostCollector(
+            host_file, output_path, force_check, package_name,
+            workers=args.workers,
+            incremental=args.incremental,
+            result_format=args.result_format,
+            compression=args.compression,
+            compress_level=args.compress_level,
+            vmware_workers=args.vmware_workers,
+            vmware_endpoint_limit=args.vmware_endpoint_limit,
+            vmware_perf_hours=args.vmware_perf_hours,
+            vmware_perf_batch=args.vmware_perf_batch,
+            vmware_cbt=args.vmware_cbt,
+            vmware_cbt_workers=args.vmware_cbt_workers,
+            vm_filters=args.vm_filters,
+            disk_sample_window=args.disk_sample_window,
+            disk_sample_interval=args.disk_sample_interval)
     host_collector.collect_hosts()
     host_collector.package()
 
@@ -66,10 +85,46 @@ def analysis_report(args):
     host_report = HostReporter(args.package_file,
                                args.output_path,
                                args.clean,
-                               args.report_name)
+                               args.report_name,
+                               jobs=args.jobs,
+                               cache=not args.no_cache,
+                               clear_cache=args.clear_cache,
+                               mappings=args.mappings,
+                               transfer_config=args.transfer_config)
     host_report.analysis()
 
 
+def plan_waves(args):
+    wave_planner = wave.WavePlanner(args.report_file,
+                                    args.output_path,
+                                    args.plan_name,
+                                    mapping=args.mapping,
+                                    bandwidth=args.bandwidth,
+                                    window=args.window,
+                                    max_hosts=args.max_hosts,
+                                    group_by=args.group_by)
+    wave_planner.plan()
+
+
+def fit_flavors(args):
+    flavor_matcher = flavor.FlavorMatcher(args.report_file,
+                                          args.output_path,
+                                          args.flavors_file,
+                                          quota_file=args.quota_file,
+                                          fit_name=args.fit_name,
+                                          mapping=args.mapping)
+    flavor_matcher.match()
+
+
+def vm_filter(value):
+    """Check VM filter when arguments are parsed"""
+    try:
+        vmware.parse_vm_filters([value])
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
 def parse_sys_args(argv):
     """Parses commaond-line arguments"""
     parser = argparse.ArgumentParser(
@@ -80,6 +135,10 @@ def parse_sys_args(argv):
     parser.add_argument("-v", "--verbose", action="store_true",
             dest="verbose", default=True,
             help="Show message in standard output.")
+    parser.add_argument("--trace-payloads", action="store_true",
+            dest="trace_payloads", default=False,
+            help="Log full payloads instead of capped ones, works "
+                 "with debug message.")
 
     subparsers = parser.add_subparsers(title='Avaliable commands')
 
@@ -113,6 +172,80 @@ def parse_sys_args(argv):
             required=False, default=HOST_PACKAGE_NAME,
             help="Prefix name for host collection package, "
                  "Default name is %s" % HOST_PACKAGE_NAME)
+    parser_collect.add_argument("--workers", dest="workers",
+            required=False, type=int, default=1,
+            help="Count of hosts collected at the same time, "
+                 "Default is 1")
+    parser_collect.add_argument("--vmware-workers",
+            dest="vmware_workers", required=False, type=int, default=4,
+            help="Count of threads to collect ESXi hosts and VMs "
+                 "in each vCenter or ESXi, Default is 4")
+    parser_collect.add_argument("--vmware-endpoint-limit",
+            dest="vmware_endpoint_limit", required=False, type=int,
+            default=1,
+            help="Count of collections of the same vCenter or ESXi "
+                 "at the same time, Default is 1")
+    parser_collect.add_argument("--vmware-perf-hours",
+            dest="vmware_perf_hours", required=False, type=int,
+            default=0,
+            help="Hours of VM performance history to collect, "
+                 "Default is 0 which means no collection")
+    parser_collect.add_argument("--vmware-perf-batch",
+            dest="vmware_perf_batch", required=False, type=int,
+            default=50,
+            help="Count of VMs in one performance query, "
+                 "Default is 50")
+    parser_collect.add_argument("--vmware-cbt", action="store_true",
+            dest="vmware_cbt", default=False,
+            help="Measure disk change rate of CBT enabled VMs, a "
+                 "temporary snapshot is created and removed for each "
+                 "VM, change rate is available from the second run")
+    parser_collect.add_argument("--vmware-cbt-workers",
+            dest="vmware_cbt_workers", required=False, type=int,
+            default=2,
+            help="Count of VMs measured at the same time in each "
+                 "vCenter or ESXi, Default is 2")
+    parser_collect.add_argument("--vm-filter", dest="vm_filters",
+            action="append", required=False, default=[], type=vm_filter,
+            help="Only collect VMware VMs matched the filter, format "
+                 "is key=value, key is one of datacenter, cluster, "
+                 "folder, resource_pool, power_state and name "
+                 "(regex). Can be given multiple times, values of the "
+                 "same key are OR, different keys are AND")
+    parser_collect.add_argument("--disk-sample-window",
+            dest="disk_sample_window", required=False, type=int,
+            default=0,
+            help="Seconds to sample Windows disk write rate, "
+                 "Default is 0 which means no sampling")
+    parser_collect.add_argument("--disk-sample-interval",
+            dest="disk_sample_interval", required=False, type=int,
+            default=10,
+            help="Seconds between two Windows disk samples, "
+                 "Default is 10")
+    parser_collect.add_argument("--incremental", action="store_true",
+            dest="incremental", default=False,
+            help="Only collect changed VMs and ESXi hosts since last "
+                 "run for VMware hosts, watched properties of all VMs "
+                 "and ESXi hosts are compared with the ones saved in "
+                 "last run to find changes, full collection is done "
+                 "if last run is not usable")
+    parser_collect.add_argument("--result-format", dest="result_format",
+            required=False, default=formats.DEFAULT_FORMAT,
+            choices=sorted(formats.FORMATS),
+            help="Format of result files, jsonl and msgpack are faster "
+                 "and smaller than yaml, msgpack needs the msgpack "
+                 "extra installed by pip install prophet[msgpack]. "
+                 "Default is yaml")
+    parser_collect.add_argument("--compression", dest="compression",
+            required=False, default=packager.DEFAULT_COMPRESSION,
+            choices=sorted(packager.COMPRESSIONS),
+            help="Compression of package, zstd needs python 3.14 or "
+                 "later. Default is deflate")
+    parser_collect.add_argument("--compress-level", dest="compress_level",
+            required=False, type=int, default=None,
+            help="Compression level, 0-9 for deflate and bzip2, "
+                 "needs python 3.7 or later. Default is the default "
+                 "level of compression")
     parser_collect.set_defaults(func=collect_hosts)
 
     # Analysis Arguments
@@ -124,13 +257,102 @@ def parse_sys_args(argv):
     parser_report.add_argument("--output-path", dest="output_path",
             required=True, help="Generate report path")
     parser_report.add_argument("--report-name", dest="report_name",
-            required=False, default=REPORT_NAME, help="Generate report name")
+            required=False,
+            help="Generate report name, report is written as csv or "
+                 "xlsx by extension of name. Only used with one "
+                 "mapping, default is report name in mapping")
+    parser_report.add_argument("--mapping", dest="mappings",
+            action="append", required=False,
+            help="Mapping profile of report, name of builtin profile "
+                 "or path of profile file, can be given many times to "
+                 "generate reports in one pass. Builtin profiles are "
+                 "%s, Default is %s" % (
+                     ", ".join(mapping.available_mappings()),
+                     mapping.DEFAULT_MAPPING))
+    parser_report.add_argument("--transfer-config", dest="transfer_config",
+            required=False,
+            help="Config file of bandwidth, compression and dedup "
+                 "ratios to estimate transfer time, used by mappings "
+                 "with transfer columns, e.g. transfer_estimate")
     parser_report.add_argument("--clean", action="store_true",
             dest="clean", required=False, default=False,
-            help="Clean temp work dir or not, by default is not")
+            help="Deprecated, package is parsed without extraction "
+                 "and no temp work dir is created")
+    parser_report.add_argument("--jobs", dest="jobs", required=False,
+            type=int, default=1,
+            help="Count of processes to parse files, Default is 1")
+    parser_report.add_argument("--no-cache", action="store_true",
+            dest="no_cache", required=False, default=False,
+            help="Don't use or save parsed results cache, by default "
+                 "parsed results of unchanged files are reused")
+    parser_report.add_argument("--clear-cache", action="store_true",
+            dest="clear_cache", required=False, default=False,
+            help="Clear parsed results cache before report")
 
     parser_report.set_defaults(func=analysis_report)
 
+    # Plan Arguments
+    parser_plan = subparsers.add_parser("plan")
+    parser_plan.add_argument("--report-file", dest="report_file",
+            required=True,
+            help="Report file which is generated by prophet-cli report")
+    parser_plan.add_argument("--output-path", dest="output_path",
+            required=True, help="Generate wave plan path")
+    parser_plan.add_argument("--plan-name", dest="plan_name",
+            required=False, default=wave.PLAN_NAME,
+            help="Wave plan name, csv or xlsx, Default is %s" %
+                 wave.PLAN_NAME)
+    parser_plan.add_argument("--mapping", dest="mapping",
+            required=False, default=wave.DEFAULT_MAPPING,
+            help="Mapping profile of report file, Default is %s" %
+                 wave.DEFAULT_MAPPING)
+    parser_plan.add_argument("--bandwidth", dest="bandwidth",
+            required=False, type=float, default=transfer.DEFAULT_BANDWIDTH,
+            help="Available bandwidth in Mbit/s, Default is %s" %
+                 transfer.DEFAULT_BANDWIDTH)
+    parser_plan.add_argument("--window", dest="window",
+            required=False, type=float, default=wave.DEFAULT_WINDOW,
+            help="Hours of each migration window, Default is %s" %
+                 wave.DEFAULT_WINDOW)
+    parser_plan.add_argument("--max-hosts", dest="max_hosts",
+            required=False, type=int, default=wave.DEFAULT_MAX_HOSTS,
+            help="Max count of hosts migrated at the same time, "
+                 "Default is %s" % wave.DEFAULT_MAX_HOSTS)
+    parser_plan.add_argument("--group-by", dest="group_by",
+            required=False, default=wave.GROUP_BY_ESXI,
+            choices=wave.GROUP_BYS,
+            help="Keep hosts in the same ESXi server or subnet together, "
+                 "hosts without ESXi server are grouped by subnet, "
+                 "Default is %s" % wave.GROUP_BY_ESXI)
+
+    parser_plan.set_defaults(func=plan_waves)
+
+    # Flavor Fit Arguments
+    parser_fit = subparsers.add_parser("fit")
+    parser_fit.add_argument("--report-file", dest="report_file",
+            required=True,
+            help="Report file which is generated by prophet-cli report")
+    parser_fit.add_argument("--flavors-file", dest="flavors_file",
+            required=True,
+            help="Flavors of target cloud in yaml or json, e.g. output "
+                 "of openstack flavor list -f json")
+    parser_fit.add_argument("--quota-file", dest="quota_file",
+            required=False,
+            help="Quota of target cloud in yaml, total demand of hosts "
+                 "is checked against it")
+    parser_fit.add_argument("--output-path", dest="output_path",
+            required=True, help="Generate flavor fit report path")
+    parser_fit.add_argument("--fit-name", dest="fit_name",
+            required=False, default=flavor.FIT_NAME,
+            help="Flavor fit report name, csv or xlsx, Default is %s" %
+                 flavor.FIT_NAME)
+    parser_fit.add_argument("--mapping", dest="mapping",
+            required=False, default=flavor.DEFAULT_MAPPING,
+            help="Mapping profile of report file, Default is %s" %
+                 flavor.DEFAULT_MAPPING)
+
+    parser_fit.set_defaults(func=fit_flavors)
+
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
         sys.exit(1)
@@ -144,6 +366,7 @@ def main():
     os.environ["LANG"] = "en_US.utf-8"
     args = parse_sys_args(sys.argv)
     init_logging(args.debug, args.verbose, LOG_FILE, args.output_path)
+    set_trace_payloads(args.trace_payloads)
     args.func(args)
 
 if __name__ == "__main__":
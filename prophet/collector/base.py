@@ -17,11 +17,11 @@ Inherit this class and implement collect method in sub class.
 
 """
 
-import json
 import logging
 import os
 
-import yaml
+from prophet import formats
+from prophet import utils
 
 
 class BaseHostCollector(object):
@@ -29,7 +29,7 @@ class BaseHostCollector(object):
 
     This may extends more base class for different resources in future.
 
-    Yaml Data Structure:
+    Result Data Structure, saved in yaml, jsonl or msgpack:
       {
         "ostype_ip": {
           "results": {results for collection},
@@ -40,7 +40,9 @@ class BaseHostCollector(object):
     """
 
     def __init__(self, ip, username, password, ssh_port, key_path,
-                 output_path, os_type, **kwargs):
+                 output_path, os_type,
+                 result_format=formats.DEFAULT_FORMAT, packager=None,
+                 **kwargs):
         self.ip = ip
         self.username = username
         self.password = password
@@ -48,6 +50,11 @@ class BaseHostCollector(object):
         self.key_path = key_path
         self.output_path = output_path
         self.os_type = os_type
+        self.result_format = formats.get_format(result_format)
+
+        # Packager to append result files as soon as they are saved,
+        # see prophet.collector.packager.StreamingPackager
+        self.packager = packager
 
         # For more arguments, auto set self
         for k, v in kwargs.items():
@@ -60,21 +67,27 @@ class BaseHostCollector(object):
 
         if not os.path.exists(os_path):
             logging.info("Create os path %s" % os_path)
-            os.makedirs(os_path)
+            # NOTE: Results may be saved in multiple threads, path
+            # may be created by other thread at the same time
+            utils.mkdir_p(os_path)
 
         return os_path
 
     @property
     def root_key(self):
-        """Root key for yaml file"""
+        """Root key for result file"""
         return "%s_%s" % (self.os_type, self.ip)
 
     @property
     def collect_path(self):
-        """yaml report save path"""
-        filename = "%s.yaml" % self.root_key
+        """Result file save path"""
+        filename = self.get_filename(self.root_key)
         return os.path.join(self.base_path, filename)
 
+    def get_filename(self, name):
+        """Return result filename with extension of result format"""
+        return "%s%s" % (name, self.result_format.extension)
+
     def collect(self):
         """Implement in each sub class, main method to collect"""
         raise NotImplementedError
@@ -92,19 +105,17 @@ class BaseHostCollector(object):
         """
         return
 
-    def save_to_yaml(self, save_path, values):
-        """Save collection report to yaml file"""
-        logging.info("Saving report to yaml %s..." % save_path)
-
-        # When we use safe_dump save to yaml, we may get 'can not
-        # represent an object' error, so we need to convert to json
-        # and then dumps to yaml as workaround
-        json_datas = json.dumps(values)
-        data_values = json.loads(json_datas)
+    def save_result(self, save_path, values):
+        """Save collection report to file in result format"""
+        logging.info("Saving report to %s %s..." % (
+            self.result_format.name, save_path))
 
-        with open(save_path, "w") as yamlfile:
-            logging.debug("Save values %s: " % data_values)
-            yaml.safe_dump(data_values, yamlfile,
-                           default_flow_style=False)
+        # NOTE: Results may contain objects which safe dumper can
+        # not represent, e.g. AnsibleUnsafeText, each format converts
+        # them to builtin types first
+        logging.debug("Save values %s: ", utils.capped(values))
+        formats.dump(values, save_path, self.result_format)
+        if self.packager:
+            self.packager.add(save_path, values=values)
 
-        logging.info("Saved report to yaml %s" % save_path)
+        logging.info("Saved report to %s" % save_path)
@@ -13,6 +13,7 @@
 
 """Batch job for running mix host type collection"""
 
+from concurrent import futures
 import glob
 import logging
 import os
@@ -21,7 +22,11 @@ import time
 
 import numpy as np
 import pandas as pd
-from stevedore import driver
+
+from prophet import drivers
+from prophet import formats
+from prophet import utils
+from prophet.collector import packager
 
 # VMware
 DEFAULT_VMWARE_PORT = 443
@@ -35,18 +40,43 @@ COLLECTION_REPORT = "collection_report.csv"
 # Driver namespace
 HOST_COLLECTOR_NAMESPACE = "host_collector"
 
+# Default count of hosts collected at the same time
+DEFAULT_WORKERS = 1
+
+# Path under output path to save state for incremental collection, it's
+# not in collection path, so it will not be packaged
+STATE_DIR = ".prophet_state"
+
+# Host types support incremental collection
+INCREMENTAL_OS_TYPES = ["VMWARE"]
+
 class HostCollector(object):
 
     def __init__(self, host_file, output_path,
-                 force_check, package_name):
+                 force_check, package_name,
+                 workers=DEFAULT_WORKERS, incremental=False,
+                 result_format=formats.DEFAULT_FORMAT,
+                 compression=packager.DEFAULT_COMPRESSION,
+                 compress_level=None, **kwargs):
         self.host_file = host_file
         self.output_path = output_path
         self.force_check = force_check
         self.package_name = package_name
+        self.workers = workers
+        self.incremental = incremental
+        self.result_format = result_format
+        self.compression = compression
+        self.compress_level = compress_level
+
+        # For more arguments, pass to each host collector driver
+        self.collector_kwargs = kwargs
 
         # Generate compressed pacakge name
         self._zip_package_name = None
 
+        # Packager to append results to package during collection
+        self._packager = None
+
         # For summary display for each collection
         self.total_check_hosts = []
         self.success_hosts = []
@@ -66,6 +96,11 @@ class HostCollector(object):
         """Path to save collection result"""
         return os.path.join(self.collection_path, COLLECTION_REPORT)
 
+    @property
+    def state_path(self):
+        """Path to save state for incremental collection"""
+        return os.path.join(self.output_path, STATE_DIR)
+
     @property
     def zip_package_name(self):
         """Compressed pacakge path for final collections"""
@@ -77,17 +112,37 @@ class HostCollector(object):
 
         return self._zip_package_name
 
+    @property
+    def zip_package_path(self):
+        return os.path.join(self.output_path,
+                            "%s.zip" % self.zip_package_name)
+
 
     def collect_hosts(self):
         """Collect hosts detailed based on given host list file
 
         Host with check status and do status is not success will be
-        collected. If force check is given, do status is ignored.
+        collected. If force check is given, do status is ignored. If
+        incremental is given, hosts support incremental collection are
+        always collected.
         """
 
         # Validation and prepare
         self._prepare()
 
+        # Resolve all collector drivers once before hosts are collected
+        drivers.prewarm(HOST_COLLECTOR_NAMESPACE)
+
+        # NOTE: Results are appended to package as soon as they
+        # are saved, package is finalized in package method
+        self._packager = self._create_packager()
+        try:
+            self._collect_hosts()
+        except BaseException:
+            self._packager.abort()
+            raise
+
+    def _collect_hosts(self):
         logging.info("Collecting hosts information "
                      "from %s..." %  self.host_file)
 
@@ -99,101 +154,132 @@ class HostCollector(object):
         hosts = pd.read_csv(self.host_file, keep_default_na=False)
 
         logging.info("Found %s host(s) in csv..." % len(hosts))
-        for index, row in hosts.iterrows():
-            logging.debug("Current row is: %s" % row.to_dict())
-
-            try:
-                host_ip      = row["ip"]
-                username     = row["username"]
-                password     = row["password"]
-                ssh_port     = row["ssh_port"]
-                key_path     = row["key_path"]
-                host_mac     = row["mac"]
-                check_status = row["check_status"]
-                os_type      = row["os"].upper()
-                version      = row["version"]
-                tcp_ports    = row["tcp_ports"]
-                do_status    = row["do_status"]
-
-                # host tag for display in log
-                host_tag = "[%s]%s" % (os_type, host_ip)
-
-                # Validate if host need to collect
-                if not self._is_need_check(check_status, do_status):
-                    logging.info("Skip to check host %s" % host_tag)
-                    continue
-
-                # Check if host can be check with authentication
-                if not self._can_check(
-                        host_ip, username, password, key_path):
-                    continue
-
-                logging.info("Collecting host %s..." % host_tag)
-                self.total_check_hosts.append(host_tag)
-
-                # Run collect method from each driver
-                driver_manager = driver.DriverManager(
-                        namespace=HOST_COLLECTOR_NAMESPACE,
-                        name=os_type,
-                        invoke_on_load=False)
-                # TODO(Ray): tcp ports should be saved into yaml file
-                c = driver_manager.driver(
-                        ip=host_ip,
-                        username=username,
-                        password=password,
-                        ssh_port=ssh_port,
-                        key_path=key_path,
-                        os_type=os_type,
-                        tcp_ports=tcp_ports,
-                        output_path=self.collection_path)
-                c.collect()
-
-                collect_summary = c.get_summary()
-
-                if collect_summary:
-                    self.summaries.append(collect_summary)
-
-                hosts.loc[index, "do_status"] = "success"
-                hosts.to_csv(self.host_file, index=False)
-                self.success_hosts.append(host_tag)
-
-                logging.info("Collect host %s success" % host_tag)
-            except Exception as e:
-                logging.error("Host %s check failed "
-                              "due to:" % host_ip)
-                logging.exception(e)
-                hosts.loc[index, "do_status"] = "failed"
-                hosts.to_csv(self.host_file, index=False)
-                self.failed_hosts.append(host_tag)
-
-            # Save collection report and index file
-            try:
-                self._save_collection_report(row)
-            except Exception as e:
-                logging.error("Saving report failed due to:")
-                logging.exception(e)
+
+        # NOTE: Hosts are collected in worker threads, but the
+        # csv status and summary are only updated in this thread when
+        # each collection is done, so we don't need any lock for them
+        with futures.ThreadPoolExecutor(
+                max_workers=self.workers) as executor:
+            tasks = {}
+            for index, row in hosts.iterrows():
+                logging.debug("Current row is: %s", utils.capped(row))
+
+                host_ip = row.get("ip")
+                try:
+                    # host tag for display in log
+                    host_tag = "[%s]%s" % (row["os"].upper(), host_ip)
+
+                    # Validate if host need to collect
+                    if not self._is_need_check(row["check_status"],
+                                               row["do_status"],
+                                               row["os"]):
+                        logging.info("Skip to check host %s" % host_tag)
+                        continue
+
+                    # Check if host can be check with authentication
+                    if not self._can_check(host_ip, row["username"],
+                                           row["password"],
+                                           row["key_path"]):
+                        continue
+
+                    self.total_check_hosts.append(host_tag)
+                    task = executor.submit(self._collect_host, row)
+                    tasks[task] = (index, row, host_tag)
+                except Exception as e:
+                    logging.error("Host %s check failed "
+                                  "due to:" % host_ip)
+                    logging.exception(e)
+
+            for task in futures.as_completed(tasks):
+                index, row, host_tag = tasks[task]
+                try:
+                    collect_summary = task.result()
+
+                    if collect_summary:
+                        self.summaries.append(collect_summary)
+
+                    hosts.loc[index, "do_status"] = "success"
+                    hosts.to_csv(self.host_file, index=False)
+                    self.success_hosts.append(host_tag)
+
+                    logging.info("Collect host %s success" % host_tag)
+                except Exception as e:
+                    logging.error("Host %s check failed "
+                                  "due to:" % host_tag)
+                    logging.exception(e)
+                    hosts.loc[index, "do_status"] = "failed"
+                    hosts.to_csv(self.host_file, index=False)
+                    self.failed_hosts.append(host_tag)
+
+                # Save collection report and index file
+                try:
+                    self._save_collection_report(row)
+                except Exception as e:
+                    logging.error("Saving report failed due to:")
+                    logging.exception(e)
 
         self._show_summary()
 
+    def _collect_host(self, row):
+        """Run collect method of host driver, return its summary"""
+        host_ip      = row["ip"]
+        username     = row["username"]
+        password     = row["password"]
+        ssh_port     = row["ssh_port"]
+        key_path     = row["key_path"]
+        os_type      = row["os"].upper()
+        tcp_ports    = row["tcp_ports"]
+
+        host_tag = "[%s]%s" % (os_type, host_ip)
+        logging.info("Collecting host %s..." % host_tag)
+
+        # Run collect method from each driver
+        collector_driver = drivers.get_driver(HOST_COLLECTOR_NAMESPACE,
+                                              os_type)
+        # TODO(Ray): tcp ports should be saved into yaml file
+        c = collector_driver(
+                ip=host_ip,
+                username=username,
+                password=password,
+                ssh_port=ssh_port,
+                key_path=key_path,
+                os_type=os_type,
+                tcp_ports=tcp_ports,
+                output_path=self.collection_path,
+                incremental=self.incremental,
+                state_path=self.state_path,
+                result_format=self.result_format,
+                packager=self._packager,
+                **self.collector_kwargs)
+        c.collect()
+
+        return c.get_summary()
+
     def package(self):
-        """Create compressed pacakge for hosts collection"""
+        """Finalize compressed pacakge for hosts collection"""
+        if not self._packager:
+            self._packager = self._create_packager()
+
         # NOTE(Ray): Because of the complex of user environment, we
         # collect running logs to help us improve our project
-        logging.info("Copying log file into collection info path...")
-
-        log_files = "%s/*.log" % self.output_path
-
-        for f in glob.glob(log_files):
-            logging.info("Copying %s to %s..." % (
-                f, self.collection_path))
-            shutil.copy(f, self.collection_path)
+        log_files = glob.glob("%s/*.log" % self.output_path)
 
         logging.info("Compressed pacakge in %s, "
                      "filename is %s.zip..." % (
                          self.output_path, self.zip_package_name))
-        os.chdir(self.output_path)
-        shutil.make_archive(self.zip_package_name, "zip",
-                            self.collection_path)
+        try:
+            self._packager.finalize(extra_files=log_files)
+        except BaseException:
+            self._packager.abort()
+            raise
+
+    def _create_packager(self):
+        result_packager = packager.StreamingPackager(
+                self.collection_path, self.zip_package_path,
+                compression=self.compression,
+                compress_level=self.compress_level)
+        result_packager.open()
+        return result_packager
 
     def _save_collection_report(self, row):
         """Save collection result to csv"""
@@ -211,6 +297,12 @@ class HostCollector(object):
             raise OSError("Host file %s is "
                           "not exists." % self.host_file)
 
+        # Validate result format and compression before any host is
+        # collected
+        formats.get_format(self.result_format)
+        packager.get_compression(self.compression)
+        packager.check_compress_level(self.compress_level)
+
         # Create output path if not exists
         if not os.path.exists(self.output_path):
             logging.info("Creating output path %s...")
@@ -226,17 +318,27 @@ class HostCollector(object):
             logging.info("Delete existing host collection "
                          "path %s Succesfully" % self.collection_path)
 
+            # State is useless without files of last collection
+            if os.path.exists(self.state_path):
+                logging.info("Deleting incremental collection "
+                             "state %s..." % self.state_path)
+                shutil.rmtree(self.state_path)
+
         if not os.path.exists(self.collection_path):
             logging.info("Creating collection path %s..." % self.collection_path)
             os.makedirs(self.collection_path)
 
-    def _is_need_check(self, check_status, do_status):
+    def _is_need_check(self, check_status, do_status, os_type):
         """Return True is host need to do collection"""
         logging.debug("Current host check status is %s, do status "
-                      "is %s, force check is %s" % (
-                      check_status, do_status, self.force_check))
+                      "is %s, force check is %s, incremental is %s" % (
+                      check_status, do_status, self.force_check,
+                      self.incremental))
         if check_status.upper() == "CHECK":
-            if do_status.upper() == "SUCCESS" and not self.force_check:
+            if self.incremental and \
+                    os_type.upper() in INCREMENTAL_OS_TYPES:
+                return True
+            elif do_status.upper() == "SUCCESS" and not self.force_check:
                 return False
             else:
                 return True
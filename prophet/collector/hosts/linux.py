@@ -17,7 +17,7 @@
 
      1. Test host connection
      2. Generate ansible configs and run ansible commands
-     3. Save results to yaml file
+     3. Save results to file
      
 """
 
@@ -28,6 +28,7 @@ import paramiko
 import socket
 import tempfile
 
+from prophet import utils
 from prophet.ansible_api import AnsibleApi
 from prophet.collector.base import BaseHostCollector
 
@@ -40,13 +41,13 @@ class LinuxCollector(BaseHostCollector):
 
         logging.info("Collecting host %s info..." % self.ip)
         host_info = self._collect_data()
-        logging.debug("Collect Linux %s returns: %s" % (self.ip,
-                                                       host_info))
+        logging.debug("Collect Linux %s returns: %s",
+                      self.ip, utils.capped(host_info))
         logging.info("Collected host %s info" % self.ip)
 
         if not host_info["success"]:
             raise Exception("Collect Linux %s failed, please "
-                            "check yaml file for detailed" % self.ip)
+                            "check result file for detailed" % self.ip)
         else:
             logging.info("Collect Linux %s info success" % self.ip)
 
@@ -57,7 +58,7 @@ class LinuxCollector(BaseHostCollector):
                 "tcp_ports": self.tcp_ports
             }
         }
-        self.save_to_yaml(self.collect_path, save_values)
+        self.save_result(self.collect_path, save_values)
 
         return [host_info]
 
@@ -17,36 +17,179 @@
 
      1. Test VMwarer connections.
      2. Get VCenter manager host info.
-     3. Get all esxi host info.
+     3. Get all esxi host info, store to config file for each esxi.
      4. Get all vms info for esxi.
-     5. Store information to config file for each virtual machine.
+     5. Store information to config file for each virtual machine,
+        which refers to config file of its esxi.
 
 """
 
 
-import atexit
+from concurrent import futures
+import hashlib
+import json
 import logging
 import os
-import sys
+import re
 import telnetlib
 import uuid
-import yaml
 
-from pyVim import connect
+from pyVmomi import VmomiSupport
 from pyVmomi import vmodl
 from pyVmomi import vim
 
 #from prophet.controller.config_file import ConfigFile, CsvDataFile
+from prophet import formats
+from prophet import utils
 from prophet.collector.base import BaseHostCollector
+from prophet.collector import vmware_cbt
+from prophet.collector.vmware_perf import (DEFAULT_BATCH_SIZE,
+                                           PerfStatsCollector)
+from prophet.collector.vmware_session import (DEFAULT_ENDPOINT_LIMIT,
+                                              session_manager)
 
 # default port for vmware connection
 DEFAULT_PORT = 443
 
+# Default count of threads to collect ESXi hosts and VMs
+DEFAULT_WORKERS = 4
+
+# Max count of objects returned in each page of property collector
+PAGE_SIZE = 500
+
+# VM property paths retrieved in bulk by property collector
+VM_PROPERTIES = [
+    "config.instanceUuid",
+    "config.name",
+    "config.uuid",
+    "config.locationId",
+    "config.guestId",
+    "config.guestFullName",
+    "config.version",
+    "config.firmware",
+    "config.files.vmPathName",
+    "config.files.snapshotDirectory",
+    "config.files.suspendDirectory",
+    "config.files.logDirectory",
+    "config.tools.toolsVersion",
+    "config.hardware.memoryMB",
+    "config.hardware.numCPU",
+    "config.hardware.numCoresPerSocket",
+    "config.hardware.device",
+    "config.datastoreUrl",
+    "summary.config.numEthernetCards",
+    "summary.config.numVirtualDisks",
+    "summary.guest.toolsStatus",
+    "summary.guest.ipAddress",
+    "summary.guest.hostName",
+    "runtime.host",
+    "runtime.powerState",
+    "capability.changeTrackingSupported",
+    "config.changeTrackingEnabled"
+]
+
+# Properties compared with last run to find changed VMs and ESXi hosts
+# in incremental collection
+WATCH_VM_PROPERTIES = ["config.changeVersion",
+                       "runtime.host",
+                       "runtime.powerState",
+                       "summary.guest.ipAddress",
+                       "summary.guest.hostName",
+                       "summary.guest.toolsStatus"]
+WATCH_HOST_PROPERTIES = ["name",
+                         "parent",
+                         "summary.config.product.build",
+                         "datastore",
+                         "network"]
+
+# Structural VM filters, the most specific given one is used as root of
+# VM container views, others only narrow down VMs in the roots
+STRUCTURAL_FILTERS = [("resource_pool", vim.ResourcePool),
+                      ("folder", vim.Folder),
+                      ("cluster", vim.ClusterComputeResource),
+                      ("datacenter", vim.Datacenter)]
+
+# Property VM filters and VM property paths they are evaluated against,
+# only these paths are retrieved before VMs are filtered
+PROPERTY_FILTERS = ["power_state", "name"]
+FILTER_VM_PROPERTIES = {"power_state": "runtime.powerState",
+                        "name": "config.name"}
+
+# Sub path of os type path to save each ESXi information
+ESXI_DIR = "esxi"
+
+# ESXi and cluster property paths to build lookup maps
+HOST_PROPERTIES = ["name", "parent"]
+CLUSTER_PROPERTIES = ["configuration.dasConfig.enabled",
+                      "configuration.drsConfig.enabled"]
+
+
+def _get_watch_value(value):
+    """Return JSON value of watched property, managed object as MOID"""
+    if isinstance(value, VmomiSupport.ManagedObject):
+        return value._moId
+    if isinstance(value, list):
+        # Order of datastores and networks is not meaningful
+        return sorted((_get_watch_value(v) for v in value), key=str)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+
+def get_digest(props):
+    """Return digest of watched properties of VM or ESXi"""
+    values = dict((path, _get_watch_value(value))
+                  for path, value in props.items())
+    return hashlib.md5(json.dumps(
+        values, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def parse_vm_filters(vm_filters):
+    """Parse key=value VM filters to dict of key and list of values
+
+    Values of the same key are OR, different keys are AND.
+    """
+    valid_keys = [k for k, _ in STRUCTURAL_FILTERS] + PROPERTY_FILTERS
+
+    filters = {}
+    for vm_filter in vm_filters or []:
+        key, sep, value = vm_filter.partition("=")
+        key = key.strip()
+        value = value.strip()
+
+        # NOTE: vSphere tags are only available by vSphere Automation
+        # REST API, legacy ManagedEntity.tag retrieved by property
+        # collector never has them, so tag filter is not supported
+        if key == "tag":
+            raise ValueError("Invalid VM filter %s, tag is not supported "
+                             "because vSphere tags are only available in "
+                             "vSphere Automation API" % vm_filter)
+        if not sep or key not in valid_keys:
+            raise ValueError("Invalid VM filter %s, format is key=value "
+                             "and key should be one of: %s" % (
+                                 vm_filter, ", ".join(valid_keys)))
+
+        if key == "name":
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise ValueError("Invalid VM filter %s, name is not a "
+                                 "valid regex: %s" % (vm_filter, e))
+        filters.setdefault(key, []).append(value)
+
+    return filters
+
 
 class VMwareCollector(BaseHostCollector):
 
     def __init__(self, ip, username, password, ssh_port, key_path,
-                 output_path, os_type, **kwargs):
+                 output_path, os_type, vmware_workers=DEFAULT_WORKERS,
+                 incremental=False, state_path=None,
+                 vmware_endpoint_limit=DEFAULT_ENDPOINT_LIMIT,
+                 vmware_perf_hours=0, vmware_perf_batch=DEFAULT_BATCH_SIZE,
+                 vmware_cbt=False,
+                 vmware_cbt_workers=vmware_cbt.DEFAULT_WORKERS,
+                 vm_filters=None, **kwargs):
 
         super(VMwareCollector, self).__init__(
                 ip, username, password, ssh_port, key_path,
@@ -56,8 +199,54 @@ class VMwareCollector(BaseHostCollector):
         if not self.ssh_port:
             self.ssh_port = DEFAULT_PORT
 
+        self.workers = int(vmware_workers or DEFAULT_WORKERS)
+        self.endpoint_limit = int(
+                vmware_endpoint_limit or DEFAULT_ENDPOINT_LIMIT)
+
+        # Performance statistics is disabled if history hours is 0
+        self.perf_hours = int(vmware_perf_hours or 0)
+        self.perf_batch = int(vmware_perf_batch or DEFAULT_BATCH_SIZE)
+
+        # Only collect VMs matched all filters
+        self.vm_filters = parse_vm_filters(vm_filters)
+        self._filter_properties = [FILTER_VM_PROPERTIES[k]
+                                   for k in PROPERTY_FILTERS
+                                   if k in self.vm_filters]
+        self._name_patterns = [re.compile(p)
+                               for p in self.vm_filters.get("name", [])]
+
+        # Roots of VM container views, and MOIDs of VMs in all
+        # structural filters if more than one are given
+        self._vm_roots = None
+        self._vm_scope = None
+
+        # Change rate measurement needs changeIds saved in state path
+        self.cbt = vmware_cbt and bool(state_path)
+        self.cbt_workers = vmware_cbt_workers
+
+        # VMs with temporary snapshot created for change rate
+        self._measured_vms = []
+
+        # NOTE: Incremental collection needs state of last run,
+        # if no state path is given, always do full collection
+        self.incremental = incremental and bool(state_path)
+        self.state_path = state_path
+
+        self._service_instance = None
         self._content = None
 
+        # Container views created in this run, key is view type
+        self._views = {}
+
+        # MOID keyed maps for ESXi lookup, built once for each run
+        self._esxi_objs = {}
+        self._esxi_names = {}
+        self._esxi_ha_drs = {}
+
+        # VM MOID to saved file and ESXi MOID, saved in state file
+        self._vms_files = {}
+        self._server_type = None
+
         # Dict to save different resources
         self._esxis_info = {}
         self._vms_info = {}
@@ -75,6 +264,9 @@ class VMwareCollector(BaseHostCollector):
         self.success_vms = []
         self.failed_vms = []
 
+        # MOIDs of failed VMs, they are collected again in next run
+        self._failed_vm_moids = set()
+
         # Report summary
         self._summary = {
             "info": [],
@@ -91,30 +283,67 @@ class VMwareCollector(BaseHostCollector):
         After that get all VMs and save to files.
         """
 
-        # Try to connect to server first
-        self.connect()
+        # NOTE: Multiple rows may point to the same vCenter, limit
+        # concurrent collections to avoid overloading it
+        with session_manager.endpoint_slot(self.ip, self.ssh_port,
+                                           self.endpoint_limit):
+            # Try to connect to server first
+            self.connect()
 
+            try:
+                self._build_index()
+                self._resolve_vm_filters()
+
+                # Only collect changed VMs and ESXi if last run is usable
+                if self.incremental and self._collect_updates():
+                    return
+
+                # NOTE: Digests are taken before collection, so objects
+                # changed during collection are collected in next run
+                if self.incremental:
+                    vm_digests = self._get_vm_digests()
+                    esxi_digests = self._get_esxi_digests()
+
+                    # Files of VMs deleted or not matched filters any
+                    # more since last run are removed
+                    self._vms_files = self._load_state().get("vms", {})
+                    for moid in set(self._vms_files) - set(vm_digests):
+                        self._delete_vm_file(moid)
+
+                # Get ESXi information
+                self._get_esxi_info()
+                self._save_server_info()
+
+                # Begin to collect all VMs
+                self._get_vms_info()
+
+                if self.incremental:
+                    self._save_digests(vm_digests, esxi_digests)
+            finally:
+                self._destroy_views()
+
+    @property
+    def server_file_path(self):
+        """Path of vCenter or ESXi information file"""
+        filename = self.get_filename(
+                "%s_%s" % (self.ip, self._server_type))
+        return os.path.join(self.base_path, filename)
+
+    def _save_server_info(self):
+        """Save vCenter or ESXi information with all ESXi hosts"""
         vmware_info = {}
-        server_type = "exsi"
-
-        # Get ESXi information
-        self._get_esxi_info()
+        self._server_type = "exsi"
 
         # If the given address is vCenter, also get vCenter infromation
         if self._content.about.name == "VMware vCenter Server":
-            server_type = "vcenter"
+            self._server_type = "vcenter"
             self._get_vcenter_info()
             self._vc_info[self.ip]["esxi"] = self._esxis_info
             vmware_info = self._vc_info
         else:
             vmware_info = self._esxis_info
 
-        filename = "%s_%s.yaml" % (self.ip, server_type)
-        yamlfile = os.path.join(self.base_path, filename)
-        self.save_to_yaml(yamlfile, vmware_info)
-
-        # Begin to collect all VMs
-        self._get_vms_info()
+        self.save_result(self.server_file_path, vmware_info)
 
     def connect(self):
         """Connect to vCenter or ESXi"""
@@ -127,22 +356,228 @@ class VMwareCollector(BaseHostCollector):
                       % (self.ip, self.ssh_port,
                          self.username, self.password))
         logging.info("Start connect %s vmware host..." % self.ip)
-        if self.disable_ssl_verification:
-            service_instance = connect.SmartConnectNoSSL(
-                host=self.ip,
-                user=self.username,
-                pwd=self.password,
-                port=int(self.ssh_port))
-        else:
-            service_instance = connect.SmartConnect(
-                host=self.ip,
-                user=self.username,
-                pwd=self.password,
-                port=int(self.ssh_port))
-        atexit.register(connect.Disconnect, service_instance)
+        service_instance = session_manager.connect(
+                self.ip, self.ssh_port, self.username, self.password,
+                disable_ssl_verification=self.disable_ssl_verification)
         logging.info("Connect %s vmware host sucessful." % self.ip)
+
+        # NOTE: All worker threads share this session, the soap
+        # stub keeps a pool of http connections, enlarge the pool to
+        # avoid reconnecting when all workers send requests
+        service_instance._stub.poolSize = max(
+                service_instance._stub.poolSize, self.workers)
+        self._service_instance = service_instance
         self._content = service_instance.RetrieveContent()
 
+    @property
+    def state_file(self):
+        """Path to save state for incremental collection"""
+        return os.path.join(self.state_path,
+                            "%s_vmware_state.json" % self.ip)
+
+    def _load_state(self):
+        """Return state saved in last run, empty dict if not found"""
+        if not self.state_path or not os.path.exists(self.state_file):
+            return {}
+
+        try:
+            with open(self.state_file, "r") as state_file:
+                return json.load(state_file)
+        except (IOError, ValueError) as e:
+            logging.warn("Failed to load state file %s, due to: "
+                         "%s" % (self.state_file, e))
+            return {}
+
+    def _save_state(self, state):
+        """Save state for next run, only owner can read the file"""
+        logging.info("Saving state to %s..." % self.state_file)
+        utils.mkdir_p(self.state_path)
+        utils.save_private_json(self.state_file, state)
+
+        logging.info("Saved state to %s" % self.state_file)
+
+    def _get_vm_digests(self, vms=None):
+        """Return digests of watched properties of VMs
+
+        All VMs in views are retrieved in bulk if VMs are not given, VMs
+        not matched filters are also included, so they are collected
+        once they match filters.
+        """
+        if vms is None:
+            return dict((vm._moId, get_digest(props))
+                        for vm, props in self._retrieve_properties(
+                            self._get_vm_views(), vim.VirtualMachine,
+                            WATCH_VM_PROPERTIES))
+
+        digests = {}
+        for start in range(0, len(vms), PAGE_SIZE):
+            for vm, props in self._retrieve_properties(
+                    None, vim.VirtualMachine, WATCH_VM_PROPERTIES,
+                    objs=vms[start:start + PAGE_SIZE]):
+                digests[vm._moId] = get_digest(props)
+        return digests
+
+    def _get_esxi_digests(self):
+        """Return digests of watched properties of all ESXi hosts"""
+        return dict((esxi._moId, get_digest(props))
+                    for esxi, props in self._retrieve_properties(
+                        self._get_view(vim.HostSystem), vim.HostSystem,
+                        WATCH_HOST_PROPERTIES))
+
+    def _save_digests(self, vm_digests, esxi_digests):
+        """Save digests with collected files for next run"""
+        # NOTE: Temporary snapshot of change rate measurement changes
+        # config.changeVersion, digests of measured VMs are taken again,
+        # so they are not seen as changed in next run
+        if self._measured_vms:
+            try:
+                vm_digests.update(self._get_vm_digests(self._measured_vms))
+            except vmodl.fault.ManagedObjectNotFound as e:
+                logging.warn("Skip to update digests of measured VMs in "
+                             "%s, due to: %s" % (self.ip, e))
+
+        # Failed VMs are not saved, so they are collected again
+        for moid in self._failed_vm_moids:
+            vm_digests.pop(moid, None)
+
+        self._save_state({
+            "server_type": self._server_type,
+            "vm_filters": self.vm_filters,
+            "vms": self._vms_files,
+            "vm_digests": vm_digests,
+            "esxi_digests": esxi_digests
+        })
+
+    def _collect_updates(self):
+        """Only collect VMs and ESXi hosts changed since last run
+
+        Watched properties of all VMs and ESXi hosts are retrieved in
+        bulk and compared with digests saved in last run, only changed
+        and new ones are collected. Return False if state of last run
+        can't be used, then full collection is needed.
+        """
+        state = self._load_state()
+        if "vm_digests" not in state:
+            logging.info("No digests of last run found for %s, run "
+                         "full collection" % self.ip)
+            return False
+
+        # NOTE: Collected VMs depend on filters, if filters are changed,
+        # run full collection
+        if state.get("vm_filters", {}) != self.vm_filters:
+            logging.info("VM filters are changed since last run for %s, "
+                         "run full collection" % self.ip)
+            return False
+
+        self._server_type = state["server_type"]
+        self._vms_files = state.get("vms", {})
+        if not self._load_esxis_info():
+            return False
+
+        vm_digests = self._get_vm_digests()
+        esxi_digests = self._get_esxi_digests()
+        old_vm_digests = state["vm_digests"]
+        old_esxi_digests = state.get("esxi_digests", {})
+
+        changed_esxis = set(moid for moid, digest in esxi_digests.items()
+                            if old_esxi_digests.get(moid) != digest)
+        deleted_esxis = set(old_esxi_digests) - set(esxi_digests)
+        changed_vms = set(moid for moid, digest in vm_digests.items()
+                          if old_vm_digests.get(moid) != digest)
+        deleted_vms = set(self._vms_files) - set(vm_digests)
+
+        logging.info("Found %s changed ESXi host(s), %s deleted ESXi "
+                     "host(s), %s changed VM(s), %s deleted VM(s) in "
+                     "%s" % (len(changed_esxis), len(deleted_esxis),
+                             len(changed_vms), len(deleted_vms), self.ip))
+
+        if changed_esxis or deleted_esxis:
+            # Remove ESXi hosts which are not in vCenter any more
+            esxi_names = set(self._esxi_names.values())
+            old_esxi_names = set(self._esxis_info.keys())
+            for name in old_esxi_names - esxi_names:
+                self._esxis_info.pop(name)
+                self._delete_esxi_file(name)
+
+            self._get_esxi_info(changed_esxis & set(self._esxi_objs))
+            self._save_server_info()
+
+            # NOTE: VMs only refer to ESXi file by name, they only need
+            # to be saved again if ESXi is renamed
+            renamed_esxis = set(
+                    moid for moid in changed_esxis
+                    if self._esxi_names.get(moid) not in old_esxi_names)
+            for moid, vm_file in self._vms_files.items():
+                if vm_file["esxi"] in renamed_esxis:
+                    changed_vms.add(moid)
+
+        for moid in deleted_vms:
+            changed_vms.discard(moid)
+            self._delete_vm_file(moid)
+
+        if changed_vms:
+            stub = self._content.propertyCollector._stub
+            self._get_vms_info(
+                [vim.VirtualMachine(moid, stub) for moid in changed_vms])
+
+        self._save_digests(vm_digests, esxi_digests)
+        return True
+
+    def _load_esxis_info(self):
+        """Load ESXi information saved in last run
+
+        Return False if information file is missing.
+        """
+        if not os.path.exists(self.server_file_path):
+            logging.warn("ESXi information file %s is missing, run full "
+                         "collection" % self.server_file_path)
+            return False
+
+        vmware_info = formats.load(self.server_file_path)
+
+        if self._server_type == "vcenter":
+            self._esxis_info = vmware_info[self.ip]["esxi"]
+        else:
+            self._esxis_info = vmware_info
+
+        return True
+
+    def _delete_vm_file(self, moid):
+        """Delete saved file of VM, used when VM is deleted or renamed"""
+        vm_file = self._vms_files.pop(moid, None)
+        if not vm_file:
+            return
+
+        result_file = os.path.join(self.base_path, vm_file["file"])
+        if os.path.exists(result_file):
+            logging.info("Deleting old file %s of VM %s..." % (
+                result_file, moid))
+            os.remove(result_file)
+
+    def _get_esxi_file(self, esxi_name):
+        """Return ESXi file path relative to collection path"""
+        # NOTE: The path is also used in package, so always use /
+        # as seperator
+        return "%s/%s/%s" % (self.os_type, ESXI_DIR, self.get_filename(
+                "%s_%s" % (self.ip, esxi_name)))
+
+    def _save_esxi_file(self, esxi_name):
+        """Save one ESXi information, referred by VMs in this ESXi"""
+        result_file = os.path.join(self.output_path,
+                                   self._get_esxi_file(esxi_name))
+        utils.mkdir_p(os.path.dirname(result_file))
+        self.save_result(result_file,
+                         {esxi_name: self._esxis_info[esxi_name]})
+
+    def _delete_esxi_file(self, esxi_name):
+        """Delete ESXi file which is not in vCenter any more"""
+        result_file = os.path.join(self.output_path,
+                                   self._get_esxi_file(esxi_name))
+        if os.path.exists(result_file):
+            logging.info("Deleting old file %s of ESXi %s..." % (
+                result_file, esxi_name))
+            os.remove(result_file)
+
     def _check_connect(self):
         try:
             logging.info("Check %s:%s host network..."
@@ -151,17 +586,133 @@ class VMwareCollector(BaseHostCollector):
         except Exception as error:
             logging.error("Check %s:%s failed, due to %s"
                           % (self.ip, self.ssh_port, error))
-            sys.exit()
+            raise
         else:
             logging.info("Host %s:%s check successful."
                          % (self.ip, self.ssh_port))
 
 
-    def _get_content_obj(self, content, viewtype, name=None):
-        recursive = True
-        containerView = content.viewManager.CreateContainerView(
-            content.rootFolder, viewtype, recursive)
-        return [view for view in containerView.view]
+    def _get_view(self, viewtype, root=None):
+        """Return container view of given type, create only once
+
+        View is rooted at root folder if root is not given.
+        """
+        if root is None:
+            root = self._content.rootFolder
+
+        key = (viewtype, root._moId)
+        if key not in self._views:
+            self._views[key] = \
+                self._content.viewManager.CreateContainerView(
+                    root, [viewtype], True)
+        return self._views[key]
+
+    def _destroy_views(self):
+        """Destroy all container views created in this run"""
+        for (viewtype, root), view in self._views.items():
+            try:
+                view.Destroy()
+            except Exception as e:
+                logging.warn("Failed to destroy %s view of %s, "
+                             "due to: %s" % (viewtype.__name__, root, e))
+        self._views = {}
+
+    def _get_vm_views(self):
+        return [self._get_view(vim.VirtualMachine, root)
+                for root in self._vm_roots]
+
+    def _resolve_vm_filters(self):
+        """Resolve structural VM filters to roots and scope of VMs"""
+        self._vm_roots = [self._content.rootFolder]
+        self._vm_scope = None
+
+        structural_filters = [(key, obj_type)
+                              for key, obj_type in STRUCTURAL_FILTERS
+                              if key in self.vm_filters]
+        for i, (key, obj_type) in enumerate(structural_filters):
+            entities = self._find_entities(obj_type, self.vm_filters[key])
+
+            # The most specific filter is used as roots of VM views
+            if i == 0:
+                self._vm_roots = entities
+                continue
+
+            # NOTE: Other filters only retrieve VM MOIDs without
+            # any property to narrow down VMs
+            views = [self._get_view(vim.VirtualMachine, e)
+                     for e in entities]
+            moids = set(vm._moId for vm, _ in self._retrieve_properties(
+                views, vim.VirtualMachine, []))
+            if self._vm_scope is None:
+                self._vm_scope = moids
+            else:
+                self._vm_scope &= moids
+
+        if structural_filters:
+            logging.info("Collect VMs in %s of %s" % (
+                self._vm_roots, self.ip))
+
+    def _find_entities(self, obj_type, names):
+        """Return all entities of given type with one of the names"""
+        entities = [obj for obj, props in self._retrieve_properties(
+                        self._get_view(obj_type), obj_type, ["name"])
+                    if props.get("name") in names]
+        if not entities:
+            raise ValueError("No %s named %s is found in %s" % (
+                obj_type.__name__, ", ".join(names), self.ip))
+
+        return entities
+
+    def _is_vm_matched(self, vm, props):
+        """Return True if VM matches all filters"""
+        if self._vm_scope is not None and vm._moId not in self._vm_scope:
+            return False
+
+        power_states = self.vm_filters.get("power_state")
+        if power_states and \
+                props.get("runtime.powerState") not in power_states:
+            return False
+
+        if self._name_patterns:
+            vm_name = props.get("config.name") or ""
+            if not any(p.search(vm_name) for p in self._name_patterns):
+                return False
+
+        return True
+
+    def _build_index(self):
+        """Build MOID keyed maps for ESXi name, HA and DRS
+
+        ESXi hosts and clusters are retrieved only once for each run,
+        so each VM can get its ESXi and the ESXi parent cluster HA/DRS
+        config without looping all objects.
+        """
+        logging.info("Trying to build ESXi and cluster index...")
+
+        clusters_ha_drs = {}
+        clusters_props = self._retrieve_properties(
+                self._get_view(vim.ClusterComputeResource),
+                vim.ClusterComputeResource, CLUSTER_PROPERTIES)
+        for cluster, props in clusters_props:
+            clusters_ha_drs[cluster._moId] = (
+                bool(props.get("configuration.dasConfig.enabled")),
+                bool(props.get("configuration.drsConfig.enabled")))
+
+        esxis_props = self._retrieve_properties(
+                self._get_view(vim.HostSystem),
+                vim.HostSystem, HOST_PROPERTIES)
+        for esxi, props in esxis_props:
+            moid = esxi._moId
+            parent = props.get("parent")
+            self._esxi_objs[moid] = esxi
+            self._esxi_names[moid] = props.get("name")
+            # ESXi not in cluster doesn't have HA or DRS
+            self._esxi_ha_drs[moid] = clusters_ha_drs.get(
+                    parent._moId if parent else None, (False, False))
+
+        logging.info("Built index for %s ESXi host(s) and %s "
+                     "cluster(s)" % (len(self._esxi_objs),
+                                     len(clusters_ha_drs)))
 
     def _get_vcenter_info(self):
         logging.info(
@@ -233,27 +784,78 @@ class VMwareCollector(BaseHostCollector):
                         item_name, ",".join(success_items))
                 self._summary["debug"].append(success_result)
 
-    def _get_vm_datastore_info(self, vm):
+    def _get_view_obj_spec(self, view):
+        """Return object spec for all objects in container view"""
+        traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+                name="traverseEntities", path="view", skip=False,
+                type=vim.view.ContainerView)
+        return vmodl.query.PropertyCollector.ObjectSpec(
+                obj=view, skip=True, selectSet=[traversal_spec])
+
+    def _retrieve_properties(self, view, obj_type, path_set, objs=None):
+        """Retrieve properties of all objects in container view
+
+        Instead of accessing properties of each object, which may be a
+        separate SOAP call for each attribute, all needed properties
+        are retrieved by RetrievePropertiesEx page by page, yield each
+        object and a dict of property path and value.
+
+        View can also be a list of container views. If objs is given,
+        only retrieve properties of these objects.
+        """
+        collector = self._content.propertyCollector
+
+        if objs is None:
+            views = view if isinstance(view, list) else [view]
+            obj_specs = [self._get_view_obj_spec(v) for v in views]
+        else:
+            obj_specs = [vmodl.query.PropertyCollector.ObjectSpec(
+                obj=obj, skip=False) for obj in objs]
+        prop_spec = vmodl.query.PropertyCollector.PropertySpec(
+                type=obj_type, pathSet=path_set, all=False)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+                objectSet=obj_specs, propSet=[prop_spec])
+        options = vmodl.query.PropertyCollector.RetrieveOptions(
+                maxObjects=PAGE_SIZE)
+
+        result = collector.RetrievePropertiesEx([filter_spec], options)
+        while result:
+            logging.info("Retrieved %s %s object(s)" % (
+                len(result.objects), obj_type.__name__))
+            for obj_content in result.objects:
+                props = {}
+                for prop in obj_content.propSet:
+                    props[prop.name] = prop.val
+
+                # NOTE(Ray): We found some fields is missing in some
+                # env, log them for further analysis
+                if obj_content.missingSet:
+                    logging.info("Missing properties of %s: %s" % (
+                        obj_content.obj,
+                        [m.path for m in obj_content.missingSet]))
+
+                yield obj_content.obj, props
+
+            if not result.token:
+                break
+            result = collector.ContinueRetrievePropertiesEx(result.token)
+
+    def _get_vm_datastore_info(self, vm_name, datastore_urls):
         datastore_info = {}
 
-        logging.info("Trying to get VM %s datastore..." % (
-            vm.config.name))
-        for dsurl in vm.config.datastoreUrl:
-            logging.info("Current datastore: %s" % dsurl)
+        logging.info("Trying to get VM %s datastore..." % vm_name)
+        for dsurl in datastore_urls or []:
+            logging.debug("Current datastore: %s", utils.capped(dsurl))
             datastore_name = dsurl.name
             datastore_info[datastore_name] = {
                 "url": dsurl.url
             }
-            #self._vms_info[vmid]["datastoreurl"] = {datastore_name: {}}
-            #self._vms_info[vmid]["datastoreurl"][datastore_name]["url"] = dsurl.url
-        #disks_info = self._get_vm_disk_info(vm)
-        #self._vms_info[vmid]["disks_info"] = disks_info
-        logging.info("Success to get VM %s datastore: %s" % (
-            vm.config.name, datastore_info))
+        logging.info("Success to get VM %s datastore: %s",
+                     vm_name, utils.capped(datastore_info))
 
         return datastore_info
 
-    def _get_vm_disks_info(self, vm):
+    def _get_vm_disks_info(self, vm_name, devices):
         disk_info = {}
         vdisk_types = [
             vim.VirtualDiskFlatVer1BackingInfo,
@@ -263,9 +865,9 @@ class VMwareCollector(BaseHostCollector):
             vim.VirtualDiskRawDiskMappingVer1BackingInfo,
         ]
         logging.info("Trying to get %s vm "
-                     "disk info..." % vm.config.name)
-        for dev in vm.config.hardware.device:
-            logging.info("Current disk is %s" % dev)
+                     "disk info..." % vm_name)
+        for dev in devices or []:
+            logging.debug("Current disk is %s", utils.capped(dev))
 
             # skip if not VirtualDisk
             if not isinstance(dev, vim.VirtualDisk):
@@ -300,24 +902,24 @@ class VMwareCollector(BaseHostCollector):
                     dev.backing, "deltaDiskFormat", False)
             }
 
-        logging.info("Success to get %s disk "
-                     "info: %s" % (vm.config.name, disk_info))
+        logging.info("Success to get %s disk info: %s",
+                     vm_name, utils.capped(disk_info))
 
         return disk_info
 
-    def _get_vm_network_info(self, vm):
+    def _get_vm_network_info(self, vm_name, devices):
         network_info = {}
         logging.info("Start to get %s "
-                     "network info." % vm.config.name)
-        logging.debug("vm.config.hardware."
-                      "device = %s" % vm.config.hardware.device)
+                     "network info." % vm_name)
+        logging.debug("vm.config.hardware.device = %s",
+                      utils.capped(devices))
 
-        for dev in vm.config.hardware.device:
+        for dev in devices or []:
 
             # NOTE(Ray): This code is copied from hamal
             if not isinstance(dev, vim.vm.device.VirtualEthernetCard):
                 continue
-            logging.debug("Found network device: %s" % dev)
+            logging.debug("Found network device: %s", utils.capped(dev))
             # if device.baking is not VirtualDeviceNetworkBackingInfo
             # means the vm has no network attribute
             nt_uuid = uuid.uuid1().hex
@@ -330,7 +932,8 @@ class VMwareCollector(BaseHostCollector):
                 addr = getattr(
                         dev.backing, "network.summary.ipPoolId", None)
 
-            logging.info("Current dev.backing is: %s" % dev.backing)
+            logging.debug("Current dev.backing is: %s",
+                          utils.capped(dev.backing))
             device_name = getattr(
                     dev.backing, "deviceName", None)
             # if contains distribution network
@@ -345,176 +948,300 @@ class VMwareCollector(BaseHostCollector):
                 "deviceName": device_name,
                 "ipPoolId": addr
             }
-            logging.debug("Get %s vm network %s info."
-                          % (vm.config.name, network_info))
+            logging.debug("Get %s vm network %s info.",
+                          vm_name, utils.capped(network_info))
 
-        logging.info("Get %s vm all nets info successful." % vm.config.name)
+        logging.info("Get %s vm all nets info successful." % vm_name)
         return network_info
 
-    def _get_vms_info(self):
+    def _get_vms_info(self, vms=None):
+        """Get VMs detail, only get given VMs if vms is given"""
         logging.info("Trying to get VMs detail...")
 
-        esxi_obj = self._get_content_obj(
-                self._content, [vim.HostSystem])
-        cluster_obj = self._get_content_obj(
-                self._content, [vim.ClusterComputeResource])
-        vms_obj = self._get_content_obj(
-                self._content, [vim.VirtualMachine])
-        logging.debug("VMs object: %s" % vms_obj)
-
-        logging.info("Trying to get VMs total "
-                     "count is %s" % len(vms_obj))
-        for vm in vms_obj:
-            vms_info = {}
-            vm_name = None
-
-            logging.info("Current vm object is %s" % vm)
-            # NOTE(Ray): vm.config is very important when we try to
-            # get data, we found some fields is missing in some env.
-            # So we log this object into log file for further analysis
-            logging.info("VM config object is: %s" % vm.config)
-
-            try:
-                # NOTE(Ray): Normally instanceUuid should be
-                # exsits in vm.config, but we found in some real
-                # env, it's not true. To work around, we get this
-                # value from vm.config.summary
-                # To use vim-cmd vmsvc/getallvms to search the id, return
-                # Invalid VM 'id', so we no need to care about this kind
-                # of situation, just skip it
-                vmid = getattr(vm.config, "instanceUuid", getattr(
-                    vm.config, "summary.instanceUuid", None))
-                vm_name = getattr(vm.config, "name", vmid)
-
-                vm_host = vm.summary.runtime.host
-
-                logging.info("Trying to get VM %s info..." % vm_name)
-
-                if vm_host in esxi_obj:
-                    vms_info[vmid] = self._get_vm_info(
-                            esxi_obj, cluster_obj, vm)
+        # NOTE: Each VM is saved in worker threads, errors are
+        # isolated in each VM, the summary is only updated in this
+        # thread when each VM is done
+        with futures.ThreadPoolExecutor(
+                max_workers=self.workers) as executor:
+            if self._filter_properties or self._vm_scope is not None:
+                vms = self._get_matched_vms(vms)
+            vms_props = list(self._retrieve_vms_properties(vms))
+            logging.info("Found %s VM(s) matched filters" % len(vms_props))
+            vms_stats = self._get_vms_perf_stats(vms_props)
+            vms_rates = self._get_vms_change_rates(vms_props)
+            tasks = {executor.submit(self._save_vm_info, vm, props,
+                                     vms_stats.get(vm._moId),
+                                     vms_rates.get(vm._moId)):
+                     (vm, props) for vm, props in vms_props}
+
+            for task in futures.as_completed(tasks):
+                vm_name, success = task.result()
+                if success:
+                    self.success_vms.append(vm_name)
+                    self._update_vm_file(*tasks[task])
                 else:
-                    logging.warn(
-                            "Skip to get VM %s info, due to VM "
-                            "is in ESXi host %s" % (vm_name, vm_host))
-
-                logging.info(
-                        "Success to get VM %s info" % vm_name)
-
-                filename = "%s_%s.yaml" % (vm.config.name, "vmware")
-                yamlfile = os.path.join(self.base_path, filename)
-                # NOTE(Ray): The tcp ports is the ports open on VMware
-                # vCenter or ESXi, so we don't need to add tcp ports
-                # For further development, we may read tcp ports from
-                # our scan results to get tcp ports for VMs
-                save_values = {
-                    self.root_key: {
-                        "results": vms_info,
-                        "os_type": self.os_type,
-                        "tcp_ports": None
-                    }
-                }
-                self.save_to_yaml(yamlfile, save_values)
+                    self.failed_vms.append(vm_name)
+                    self._failed_vm_moids.add(tasks[task][0]._moId)
 
-                self.success_vms.append(vm_name)
-            except Exception as e:
-                self.failed_vms.append(vm_name)
-                logging.warn("Skip to get VM %s info, due to:")
-                logging.exception(e)
+        logging.info("Get %s VMs info, %s failed" % (
+            len(self.success_vms), len(self.failed_vms)))
+
+    def _get_matched_vms(self, vms=None):
+        """Return VMs matched filters, only check given VMs if given
+
+        Only properties used by filters are retrieved, so full properties
+        are only retrieved for matched VMs.
+        """
+        matched = []
+        for vm, props in self._retrieve_properties(
+                self._get_vm_views(), vim.VirtualMachine,
+                self._filter_properties, objs=vms):
+            if self._is_vm_matched(vm, props):
+                matched.append(vm)
+            elif vm._moId in self._vms_files:
+                # VM saved in last run doesn't match any more
+                self._delete_vm_file(vm._moId)
+        return matched
+
+    def _retrieve_vms_properties(self, vms=None):
+        """Yield VMs and their properties, all VMs in views if not given
+
+        Given VMs are retrieved in pages, so each request is not too
+        large for many VMs.
+        """
+        if vms is None:
+            for vm_props in self._retrieve_properties(
+                    self._get_vm_views(), vim.VirtualMachine,
+                    VM_PROPERTIES):
+                yield vm_props
+            return
+
+        for start in range(0, len(vms), PAGE_SIZE):
+            for vm_props in self._retrieve_properties(
+                    None, vim.VirtualMachine, VM_PROPERTIES,
+                    objs=vms[start:start + PAGE_SIZE]):
+                yield vm_props
+
+    def _get_vms_perf_stats(self, vms_props):
+        """Return performance statistics of powered on VMs if enabled"""
+        if not self.perf_hours:
+            return {}
+
+        # Only powered on VMs have performance statistics
+        vms = [vm for vm, props in vms_props
+               if props.get("runtime.powerState") == "poweredOn"]
+        try:
+            perf_collector = PerfStatsCollector(
+                    self._service_instance, self.perf_hours,
+                    batch_size=self.perf_batch, workers=self.workers)
+            return perf_collector.collect(vms)
+        except Exception as e:
+            logging.warn("Skip to get VMs performance statistics "
+                         "in %s, due to:" % self.ip)
+            logging.exception(e)
+            return {}
+
+    def _get_vms_change_rates(self, vms_props):
+        """Return disk change rates of CBT enabled VMs if enabled"""
+        if not self.cbt:
+            return {}
+
+        vms_props = [(vm, props) for vm, props in vms_props
+                     if props.get("config.changeTrackingEnabled")]
+        state_file = os.path.join(self.state_path,
+                                  "%s_vmware_cbt.json" % self.ip)
+        try:
+            rate_collector = vmware_cbt.ChangeRateCollector(
+                    state_file, workers=self.cbt_workers)
+            self._measured_vms.extend(vm for vm, _ in vms_props)
+            return rate_collector.collect(vms_props)
+        except Exception as e:
+            logging.warn("Skip to measure VMs change rate "
+                         "in %s, due to:" % self.ip)
+            logging.exception(e)
+            return {}
+
+    def _get_vm_filename(self, props):
+        return self.get_filename(
+                "%s_%s" % (props["config.name"], "vmware"))
+
+    def _update_vm_file(self, vm, props):
+        """Record saved file of VM, delete old file if VM is renamed"""
+        filename = self._get_vm_filename(props)
+        old_file = self._vms_files.get(vm._moId)
+        if old_file and old_file["file"] != filename:
+            self._delete_vm_file(vm._moId)
+
+        esxi = props.get("runtime.host")
+        self._vms_files[vm._moId] = {
+            "file": filename,
+            "esxi": esxi._moId if esxi else None
+        }
 
+    def _save_vm_info(self, vm, props, perf_stats=None,
+                      change_rates=None):
+        """Save VM information from retrieved properties to file
 
-    def _get_vm_info(self, esxi_obj, cluster_obj, vm):
+        Return VM name and if VM is saved successfully.
+        """
+        vms_info = {}
+        vm_name = None
+
+        logging.info("Current vm object is %s", vm)
+
+        try:
+            # NOTE(Ray): Normally instanceUuid should be exsits in
+            # vm.config, but we found in some real env, it's not true.
+            # To use vim-cmd vmsvc/getallvms to search the id, return
+            # Invalid VM 'id', so we no need to care about this kind
+            # of situation, just skip it
+            vmid = props.get("config.instanceUuid")
+            vm_name = props.get("config.name", vmid)
+
+            vm_host = props.get("runtime.host")
+
+            logging.info("Trying to get VM %s info..." % vm_name)
+
+            if vm_host and vm_host._moId in self._esxi_names:
+                vms_info[vmid] = self._get_vm_info(
+                        props, perf_stats, change_rates)
+            else:
+                logging.warn(
+                        "Skip to get VM %s info, due to VM "
+                        "is in ESXi host %s" % (vm_name, vm_host))
+
+            logging.info(
+                    "Success to get VM %s info" % vm_name)
+
+            filename = self._get_vm_filename(props)
+            result_file = os.path.join(self.base_path, filename)
+            # NOTE(Ray): The tcp ports is the ports open on VMware
+            # vCenter or ESXi, so we don't need to add tcp ports
+            # For further development, we may read tcp ports from
+            # our scan results to get tcp ports for VMs
+            save_values = {
+                self.root_key: {
+                    "results": vms_info,
+                    "os_type": self.os_type,
+                    "tcp_ports": None
+                }
+            }
+            self.save_result(result_file, save_values)
+
+            return vm_name, True
+        except Exception as e:
+            logging.warn("Skip to get VM %s info, due to:" % vm_name)
+            logging.exception(e)
+            return vm_name, False
+
+    def _get_vm_info(self, props, perf_stats=None, change_rates=None):
         """Get VM summary information"""
         vm_info = {}
-        drs = False
-        ha = False
 
-        obj_index = esxi_obj.index(vm.summary.runtime.host)
-        esxi_host = esxi_obj[obj_index].name
+        # HA and DRS is the config of cluster which ESXi belongs to
+        esxi_moid = props["runtime.host"]._moId
+        esxi_host = self._esxi_names[esxi_moid]
+        ha, drs = self._esxi_ha_drs[esxi_moid]
+
+        vm_name = props.get("config.name")
+        devices = props.get("config.hardware.device")
 
-        ha, drs = self._is_ha_drs_enabled(cluster_obj)
+        # NOTE: ESXi information is saved once in its own file,
+        # VM only refers to it by ESXi name and file path
+        if esxi_host not in self._esxis_info:
+            raise KeyError("ESXi %s information is not "
+                           "collected" % esxi_host)
 
         vm_info = {
-            "esxi_host": {esxi_host: self._esxis_info[esxi_host]},
-            "name": vm.config.name,
-            "memoryMB": vm.config.hardware.memoryMB,
-            "numCpu": vm.config.hardware.numCPU,
-            "numCoresPerSocket": vm.config.hardware.numCoresPerSocket,
-            "numEthernetCards": vm.summary.config.numEthernetCards,
-            "powerState": vm.runtime.powerState,
-            "numVirtualDisks": vm.summary.config.numVirtualDisks,
-            "uuid": vm.config.uuid,
-            "locationId": vm.config.locationId,
-            "guestId": vm.config.guestId,
-            "guestFullName": vm.config.guestFullName,
-            "version": vm.config.version,
-            "firmware": vm.config.firmware,
-            "vmPathName": vm.config.files.vmPathName,
-            "toolsStatus": vm.summary.guest.toolsStatus,
-            "ipAddress": vm.summary.guest.ipAddress,
-            "hostName": vm.summary.guest.hostName,
-            "toolsVersion": vm.config.tools.toolsVersion,
-            "snapshotDirectory": vm.config.files.snapshotDirectory,
-            "suspendDirectory": vm.config.files.suspendDirectory,
-            "logDirectory": vm.config.files.logDirectory,
-            "changeTrackingSupported": vm.capability.changeTrackingSupported,
-            "network": self._get_vm_network_info(vm),
-            "datastoreurl": self._get_vm_datastore_info(vm),
-            "disks_info": self._get_vm_disks_info(vm),
+            "esxi_host": esxi_host,
+            "esxi_file": self._get_esxi_file(esxi_host),
+            "name": vm_name,
+            "memoryMB": props.get("config.hardware.memoryMB"),
+            "numCpu": props.get("config.hardware.numCPU"),
+            "numCoresPerSocket": props.get(
+                "config.hardware.numCoresPerSocket"),
+            "numEthernetCards": props.get(
+                "summary.config.numEthernetCards"),
+            "powerState": props.get("runtime.powerState"),
+            "numVirtualDisks": props.get(
+                "summary.config.numVirtualDisks"),
+            "uuid": props.get("config.uuid"),
+            "locationId": props.get("config.locationId"),
+            "guestId": props.get("config.guestId"),
+            "guestFullName": props.get("config.guestFullName"),
+            "version": props.get("config.version"),
+            "firmware": props.get("config.firmware"),
+            "vmPathName": props.get("config.files.vmPathName"),
+            "toolsStatus": props.get("summary.guest.toolsStatus"),
+            "ipAddress": props.get("summary.guest.ipAddress"),
+            "hostName": props.get("summary.guest.hostName"),
+            "toolsVersion": props.get("config.tools.toolsVersion"),
+            "snapshotDirectory": props.get(
+                "config.files.snapshotDirectory"),
+            "suspendDirectory": props.get(
+                "config.files.suspendDirectory"),
+            "logDirectory": props.get("config.files.logDirectory"),
+            "changeTrackingSupported": props.get(
+                "capability.changeTrackingSupported"),
+            "changeTrackingEnabled": props.get(
+                "config.changeTrackingEnabled"),
+            "network": self._get_vm_network_info(vm_name, devices),
+            "datastoreurl": self._get_vm_datastore_info(
+                vm_name, props.get("config.datastoreUrl")),
+            "disks_info": self._get_vm_disks_info(vm_name, devices),
             "ha": ha,
-            "drs": drs
+            "drs": drs,
+            "perf_stats": perf_stats,
+            "change_rates": change_rates
         }
 
         return vm_info
 
-    def _is_ha_drs_enabled(self, cluster_obj):
-        # TODO(Ray): Check if HA or DRS is enable, but seems it's not
-        # correct if there are multiple clusters, need to double check
-        # this logical
-        ha = False
-        drs = False
-
-        logging.info("Checking if cluster HA or DRS is enabled...")
-        for c in cluster_obj:
-            logging.info("Current cluster detailed: %s" % c)
-            if hasattr(c, "configuration"):
-                if c.configuration.drsConfig.enabled:
-                    drs = True
-                if c.configuration.dasConfig.enabled:
-                    ha = True
-                break
-        logging.info("HA enable is %s, DRS enable is %s" % (ha, drs))
-        return ha, drs
-
-    def _get_esxi_info(self):
-        """Get ESXi information"""
-
-        esxi_obj = self._get_content_obj(self._content,
-                                         [vim.HostSystem])
+    def _get_esxi_info(self, moids=None):
+        """Get ESXi information, only get given ESXi MOIDs if given"""
+        if moids is None:
+            moids = self._esxi_objs.keys()
 
         logging.info("Trying to get ESXi info...")
-        for esxi in esxi_obj:
-            try:
-                logging.info("Trying to get ESXi %s "
-                             "info: %s" % (esxi.name, esxi))
-
-                self._esxis_info[esxi.name] = {
-                    "esxi_info": self._get_esxi_summary(esxi),
-                    "datastore": self._get_esxi_datastore_info(esxi),
-                    "network": self._get_esxi_network_info(esxi)
-                }
-                self.success_esxis.append(esxi.name)
-            except Exception as e:
-                logging.info("Failed to get ESXi %s" % esxi.name)
-                logging.exception(e)
-                self.failed_esxis.append(esxi.name)
+        with futures.ThreadPoolExecutor(
+                max_workers=self.workers) as executor:
+            tasks = {}
+            for moid in moids:
+                esxi = self._esxi_objs[moid]
+                esxi_name = self._esxi_names[moid]
+                task = executor.submit(
+                        self._get_one_esxi_info, esxi, esxi_name)
+                tasks[task] = esxi_name
+
+            for task in futures.as_completed(tasks):
+                esxi_name = tasks[task]
+                try:
+                    self._esxis_info[esxi_name] = task.result()
+                    self._save_esxi_file(esxi_name)
+                    self.success_esxis.append(esxi_name)
+                except Exception as e:
+                    logging.info("Failed to get ESXi %s" % esxi_name)
+                    logging.exception(e)
+                    self.failed_esxis.append(esxi_name)
+
+        logging.info("Get %s esxis host info successful." % len(
+            self.success_esxis))
+
+    def _get_one_esxi_info(self, esxi, esxi_name):
+        """Return information of one ESXi"""
+        logging.info("Trying to get ESXi %s "
+                     "info: %s" % (esxi_name, esxi))
 
-        logging.info("Get %s esxis host info successful." % esxi.name)
+        return {
+            "esxi_info": self._get_esxi_summary(esxi, esxi_name),
+            "datastore": self._get_esxi_datastore_info(esxi, esxi_name),
+            "network": self._get_esxi_network_info(esxi, esxi_name)
+        }
 
-    def _get_esxi_summary(self, esxi):
+    def _get_esxi_summary(self, esxi, esxi_name):
         summary = esxi.summary
-        logging.info("Trying to get ESXi %s "
-                     "summary %s..." % (esxi.name, summary))
+        logging.info("Trying to get ESXi %s summary %s...",
+                     esxi_name, utils.capped(summary))
 
         esxi_info = {
             "vendor": summary.hardware.vendor,
@@ -536,47 +1263,50 @@ class VMwareCollector(BaseHostCollector):
             "numHBAs" : summary.hardware.numHBAs
         }
 
-        for i in esxi.summary.hardware.otherIdentifyingInfo:
+        for i in summary.hardware.otherIdentifyingInfo:
             if isinstance(i, vim.host.SystemIdentificationInfo):
                 esxi_info["SN"] = i.identifierValue
 
-        logging.info("Success to get ESXi %s "
-                     "summary: %s" % (esxi.name, esxi_info))
+        logging.info("Success to get ESXi %s summary: %s",
+                     esxi_name, utils.capped(esxi_info))
 
         return esxi_info
 
-    def _get_esxi_network_info(self, esxi):
-        logging.info("Trying to get ESXi %s "
-                     "network info: %s" % (esxi.name, esxi.network))
+    def _get_esxi_network_info(self, esxi, esxi_name):
+        # NOTE: Each access of managed object property is a SOAP
+        # call, only get networks once
+        networks = esxi.network
+        logging.info("Trying to get ESXi %s network info: %s",
+                     esxi_name, utils.capped(networks))
 
         # TODO(Ray): Need to double check if this works for
         # distribution network type
         network_info = {}
-        for nt in esxi.network:
-            logging.debug("Current network is %s" % nt)
+        for nt in networks:
+            logging.debug("Current network is %s", nt)
             network_info[nt.name] = {
                 "name" : nt.summary.name,
                 "accessible" : nt.summary.accessible,
                 "ipPoolName" : nt.summary.ipPoolName
             }
-            logging.debug("Success to get current "
-                          "network info: %s" % network_info[nt.name])
+            logging.debug("Success to get current network info: %s",
+                          utils.capped(network_info[nt.name]))
 
-        logging.info("Success to get ESXi %s "
-                     "network %s" % (esxi.name, network_info))
+        logging.info("Success to get ESXi %s network %s",
+                     esxi_name, utils.capped(network_info))
 
         return network_info
 
-    def _get_esxi_datastore_info(self, esxi):
-        logging.info("Trying to get ESXi %s "
-                     "datastore info: %s" % (
-                         esxi.name, esxi.datastore))
+    def _get_esxi_datastore_info(self, esxi, esxi_name):
+        datastores = esxi.datastore
+        logging.info("Trying to get ESXi %s datastore info: %s",
+                     esxi_name, utils.capped(datastores))
 
         # TODO(Ray): Need to double check if the logical works for
         # RDM or other storage types
         datastore_info = {}
-        for ds in esxi.datastore:
-            logging.debug("Current datastore is %s" % ds)
+        for ds in datastores:
+            logging.debug("Current datastore is %s", ds)
             datastore_info[ds.name] = {
                 "capacity" : ds.summary.capacity,
                 "freeSpace" : ds.summary.freeSpace,
@@ -596,10 +1326,10 @@ class VMwareCollector(BaseHostCollector):
                 "ssd" : getattr(ds.info, "vmfs.ssd", ""),
                 "local" : getattr(ds.info, "vmfs.local", "")
             }
-            logging.debug("Success to get current datastore "
-                          "info: %s" % datastore_info[ds.name])
+            logging.debug("Success to get current datastore info: %s",
+                          utils.capped(datastore_info[ds.name]))
 
-        logging.info("Success to get ESXi %s datastore "
-                     "info: %s" % (esxi.name, datastore_info))
+        logging.info("Success to get ESXi %s datastore info: %s",
+                     esxi_name, utils.capped(datastore_info))
 
         return datastore_info
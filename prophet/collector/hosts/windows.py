@@ -12,6 +12,7 @@
 #   See the Mulan PubL v2 for more details.
 
 import logging
+import time
 
 from prophet import utils
 from prophet.collector.base import BaseHostCollector
@@ -31,22 +32,38 @@ WMI_COMMANDS = [
 ]
 WMI_DELIMITER = "|ONEPROCLOUD|"
 
+# Raw disk counters sampled to calculate disk write rate
+DISK_PERF_CLASS = "Win32_PerfRawData_PerfDisk_PhysicalDisk"
+DISK_PERF_FIELDS = ["Name", "DiskWriteBytesPersec",
+                    "Timestamp_PerfTime", "Frequency_PerfTime"]
+
+# Default seconds between two disk samples
+DEFAULT_DISK_SAMPLE_INTERVAL = 10
+
 
 class WindowsCollector(BaseHostCollector):
     """Collect windows hosts info"""
 
+    def __init__(self, ip, username, password, ssh_port, key_path,
+                 output_path, os_type, disk_sample_window=0,
+                 disk_sample_interval=DEFAULT_DISK_SAMPLE_INTERVAL,
+                 **kwargs):
+
+        super(WindowsCollector, self).__init__(
+                ip, username, password, ssh_port, key_path,
+                output_path, os_type, **kwargs)
+
+        # Disk write sampling is disabled if window is not given
+        self.disk_sample_window = int(disk_sample_window or 0)
+        self.disk_sample_interval = int(
+                disk_sample_interval or DEFAULT_DISK_SAMPLE_INTERVAL)
+
     def collect(self):
         """Collect information from WMI interface"""
         collect_infos = {}
         for command in WMI_COMMANDS:
             logging.info("Running Windows command %s..." % command)
-            stdout, stderr = utils.execute(
-                'wmic --delimiter "{}" '
-                '-U {}%{} //{} "SELECT * FROM {}"'.format(
-                    WMI_DELIMITER, self.username,
-                    self.password, self.ip, command),
-                shell=True
-            )
+            stdout, stderr = self._run_wmic("SELECT * FROM %s" % command)
             if stderr:
                 logging.warn("Skip to save result of command %s, "
                              "return error message: %s" % (
@@ -56,7 +73,10 @@ class WindowsCollector(BaseHostCollector):
                         "Running Windows command %s success" % command)
                 collect_infos.update(self._parse_result(stdout))
 
-        # Save to yaml file
+        if self.disk_sample_window > 0:
+            collect_infos[DISK_PERF_CLASS] = self._sample_disk_writes()
+
+        # Save to result file
         save_values = {
             self.root_key: {
                 "results": collect_infos,
@@ -64,10 +84,52 @@ class WindowsCollector(BaseHostCollector):
                 "tcp_ports": self.tcp_ports
             }
         }
-        self.save_to_yaml(self.collect_path, save_values)
+        self.save_result(self.collect_path, save_values)
 
         return [collect_infos]
 
+    def _run_wmic(self, query):
+        """Run WQL query on remote host, return stdout and stderr"""
+        return utils.execute(
+            'wmic --delimiter "{}" '
+            '-U {}%{} //{} "{}"'.format(
+                WMI_DELIMITER, self.username,
+                self.password, self.ip, query),
+            shell=True
+        )
+
+    def _sample_disk_writes(self):
+        """Sample raw disk write counters in sample window
+
+        Raw counters of all samples are saved in one list, write rate
+        is calculated by parser from the differences between samples.
+        """
+        query = "SELECT %s FROM %s" % (
+                ",".join(DISK_PERF_FIELDS), DISK_PERF_CLASS)
+
+        logging.info("Sampling %s disk writes in %ss, interval is "
+                     "%ss..." % (self.ip, self.disk_sample_window,
+                                 self.disk_sample_interval))
+        samples = []
+        end_time = time.time() + self.disk_sample_window
+        while True:
+            stdout, stderr = self._run_wmic(query)
+            if stderr:
+                logging.warn("Skip disk sample of %s, return error "
+                             "message: %s" % (self.ip, stderr))
+            else:
+                for rows in self._parse_result(stdout).values():
+                    samples.extend(rows)
+
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.disk_sample_interval, remaining))
+
+        logging.info("Sampled %s disk writes, got %s "
+                     "record(s)" % (self.ip, len(samples)))
+        return samples
+
     def _parse_result(self, result):
         """Save wmi result in dict
 
@@ -81,7 +143,7 @@ class WindowsCollector(BaseHostCollector):
                          "please check the command returns.")
             return
 
-        logging.debug("Trying to parser result: %s" % lines)
+        logging.debug("Trying to parser result: %s", utils.capped(lines))
 
         # return payload: classname: lines
         payload = {}
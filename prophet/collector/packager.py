@@ -0,0 +1,224 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Streaming zip packager for hosts collection
+
+ Result files are appended to the package as soon as they are saved,
+ so packaging is done along with collection instead of at the end.
+
+ Steps:
+
+     1. Open <package>.zip.part when collection starts.
+     2. Append each result file when it's saved by host collectors.
+     3. Append log files and files of earlier runs which are not
+        appended yet.
+     4. Append manifest of all files, see prophet.manifest.
+     5. Close the part file and rename it to <package>.zip, so package
+        is never seen half written.
+
+"""
+
+import logging
+import os
+import sys
+import threading
+import zipfile
+
+from prophet import manifest
+
+DEFAULT_COMPRESSION = "deflate"
+
+# Compression algorithms in zip, zstd needs python 3.14 or later
+COMPRESSIONS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+    "zstd": getattr(zipfile, "ZIP_ZSTANDARD", None)
+}
+
+PART_SUFFIX = ".part"
+
+# Compression level of zip needs python 3.7 or later
+COMPRESS_LEVEL_VERSION = (3, 7)
+
+
+class StreamingPackager(object):
+    """Append files under base path to zip package"""
+
+    def __init__(self, base_path, package_path,
+                 compression=DEFAULT_COMPRESSION, compress_level=None):
+        self.base_path = base_path
+        self.package_path = package_path
+        self.compression = get_compression(compression)
+        self.compress_level = check_compress_level(compress_level)
+
+        self._lock = threading.Lock()
+        self._zip = None
+
+        # Name in package and its file path
+        self._names = {}
+
+        # Name in package and its manifest entry
+        self._entries = {}
+
+        # Names appended more than once, package is rebuilt if exists
+        self._rewritten = set()
+
+    @property
+    def part_path(self):
+        return self.package_path + PART_SUFFIX
+
+    @property
+    def _level_kwargs(self):
+        """Compress level argument of zipfile, empty if not given"""
+        if self.compress_level is None:
+            return {}
+        return {"compresslevel": self.compress_level}
+
+    def open(self):
+        logging.info("Creating package %s..." % self.part_path)
+        self._zip = zipfile.ZipFile(self.part_path, "w",
+                                    compression=self.compression,
+                                    allowZip64=True, **self._level_kwargs)
+
+    @property
+    def manifest_path(self):
+        """Manifest of last package, reused for unchanged files"""
+        return os.path.join(self.base_path, manifest.MANIFEST_NAME)
+
+    def add(self, path, name=None, values=None, entry=None):
+        """Append file to package, name is relative to base path
+
+        Values of result file is used to get hosts in manifest entry,
+        if entry is given, it's used without reading file.
+        """
+        name = self._get_name(path, name)
+
+        # NOTE: File is read once for both checksum and package,
+        # so they are the same even if file is changing, e.g. log file
+        with open(path, "rb") as f:
+            data = f.read()
+        if not entry:
+            entry = manifest.file_entry(path, data, values)
+
+        with self._lock:
+            self._entries[name] = entry
+            if name in self._names:
+                self._rewritten.add(name)
+                return
+
+            logging.debug("Appending %s to package as %s..." % (
+                path, name))
+            self._zip.writestr(zipfile.ZipInfo.from_file(path, name), data,
+                               compress_type=self.compression,
+                               **self._level_kwargs)
+            self._names[name] = path
+
+    def finalize(self, extra_files=None):
+        """Append left files, and rename part file to package
+
+        Extra files are appended to root of package, e.g. log files.
+        """
+        for path in extra_files or []:
+            self.add(path, os.path.basename(path))
+
+        # Files of earlier runs and files saved without packager, their
+        # entries in last manifest are reused if files are not changed
+        last_entries = manifest.load_file(self.manifest_path)
+        for root, _, files in os.walk(self.base_path):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = self._get_name(path)
+                if name in self._names or path == self.manifest_path:
+                    continue
+
+                entry = last_entries.get(name)
+                if entry and not manifest.is_entry_of(entry, path):
+                    entry = None
+                self.add(path, entry=entry)
+
+        # NOTE: Entries in zip can't be replaced or deleted, if
+        # any file is rewritten or deleted after it's appended, rebuild
+        # package from files on disk
+        missing = [name for name, path in self._names.items()
+                   if not os.path.exists(path)]
+        if self._rewritten or missing:
+            logging.info("%s file(s) are changed after appended, "
+                         "rebuilding package..." % (
+                             len(self._rewritten) + len(missing)))
+            self._rebuild()
+
+        manifest_content = manifest.dumps(self._entries)
+        self._zip.writestr(manifest.MANIFEST_NAME, manifest_content)
+        with open(self.manifest_path, "w") as f:
+            f.write(manifest_content)
+
+        self._zip.close()
+        os.replace(self.part_path, self.package_path)
+        logging.info("Created package %s with %s file(s)" % (
+            self.package_path, len(self._names)))
+
+    def abort(self):
+        """Close and delete part file"""
+        if self._zip:
+            self._zip.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def _get_name(self, path, name=None):
+        if not name:
+            name = os.path.relpath(path, self.base_path)
+        # NOTE: Name in zip always uses / as seperator
+        return name.replace(os.sep, "/")
+
+    def _rebuild(self):
+        self._zip.close()
+        names = self._names
+        entries = self._entries
+        self._names = {}
+        self._entries = {}
+        self._rewritten = set()
+
+        self.open()
+        for name, path in sorted(names.items()):
+            if os.path.exists(path):
+                self.add(path, name, entry=entries.get(name))
+
+
+def get_compression(name):
+    """Return zipfile compression of name
+
+    ValueError is raised if compression is unknown or not supported by
+    this python.
+    """
+    if name not in COMPRESSIONS:
+        raise ValueError("Unknown compression %s, should be one of "
+                         "%s" % (name, ", ".join(sorted(COMPRESSIONS))))
+
+    if COMPRESSIONS[name] is None:
+        raise ValueError("Compression %s is not supported by this "
+                         "python" % name)
+
+    return COMPRESSIONS[name]
+
+
+def check_compress_level(level):
+    """Return compress level if it's supported by this python
+
+    ValueError is raised if level is given with python before 3.7.
+    """
+    if level is not None and sys.version_info < COMPRESS_LEVEL_VERSION:
+        raise ValueError("Compress level needs python %s or later" %
+                         ".".join(str(v) for v in COMPRESS_LEVEL_VERSION))
+    return level
@@ -0,0 +1,198 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Measure disk change rate of CBT enabled VMs
+
+ Steps:
+
+     1. Create a temporary snapshot without memory for the VM.
+     2. Query changed disk areas of each disk since changeId saved in
+        last run, add up the changed bytes.
+     3. Save changeId of each disk in the snapshot for next run.
+     4. Remove the temporary snapshot.
+
+ The first run of a VM only saves changeIds, change rate is measured
+ from the second run.
+
+"""
+
+from concurrent import futures
+import json
+import logging
+import os
+import time
+
+from pyVim.task import WaitForTask
+from pyVmomi import vim
+
+from prophet import utils
+
+# Default count of VMs measured at the same time, each of them creates
+# and removes a snapshot, keep it small to avoid overloading vCenter
+DEFAULT_WORKERS = 2
+
+SNAPSHOT_NAME = "prophet-cbt"
+SNAPSHOT_DESCRIPTION = "Temporary snapshot to measure change rate, " \
+                       "created by prophet"
+
+
+class ChangeRateCollector(object):
+    """Measure changed bytes of VM disks using CBT"""
+
+    def __init__(self, state_file, workers=DEFAULT_WORKERS):
+        self.state_file = state_file
+        self.workers = int(workers or DEFAULT_WORKERS)
+
+    def collect(self, vms_props):
+        """Return dict of VM MOID and change rate of each disk
+
+        Change rate sample, key is device key of disk:
+
+            {
+                "2000": {
+                    "device": "[datastore] vm/vm.vmdk",
+                    "changed_bytes": 1073741824,
+                    "seconds": 86400,
+                    "change_rate": 12427
+                }
+            }
+        """
+        state = self._load_state()
+
+        vms_rates = {}
+        with futures.ThreadPoolExecutor(
+                max_workers=self.workers) as executor:
+            tasks = {}
+            for vm, props in vms_props:
+                task = executor.submit(self._measure_vm, vm,
+                                       props.get("config.name"),
+                                       state.get(vm._moId, {}))
+                tasks[task] = vm
+
+            for task in futures.as_completed(tasks):
+                vm = tasks[task]
+                try:
+                    rates, disks_state = task.result()
+                    state[vm._moId] = disks_state
+                    if rates:
+                        vms_rates[vm._moId] = rates
+                except Exception as e:
+                    logging.warn("Skip to measure change rate of %s, "
+                                 "due to: %s" % (vm, e))
+
+        self._save_state(state)
+        logging.info("Measured change rate of %s VM(s)" % len(vms_rates))
+        return vms_rates
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (IOError, ValueError) as e:
+            logging.warn("Failed to load CBT state file %s, due to: "
+                         "%s" % (self.state_file, e))
+            return {}
+
+    def _save_state(self, state):
+        utils.mkdir_p(os.path.dirname(self.state_file))
+        utils.save_private_json(self.state_file, state)
+
+    def _measure_vm(self, vm, vm_name, last_state):
+        """Return change rate and current changeId of each disk"""
+        logging.info("Measuring change rate of VM %s..." % vm_name)
+        snapshot = self._create_snapshot(vm)
+        try:
+            snapshot_time = time.time()
+
+            rates = {}
+            disks_state = {}
+            for disk in snapshot.config.hardware.device:
+                if not isinstance(disk, vim.vm.device.VirtualDisk):
+                    continue
+
+                key = str(disk.key)
+                change_id = disk.backing.changeId
+                if not change_id:
+                    continue
+                disks_state[key] = {"change_id": change_id,
+                                    "time": snapshot_time}
+
+                last_disk = last_state.get(key)
+                if not last_disk:
+                    continue
+
+                try:
+                    changed_bytes = self._query_changed_bytes(
+                            vm, snapshot, disk, last_disk["change_id"])
+                except vim.fault.VimFault as e:
+                    # NOTE: changeId is invalid if CBT is reset,
+                    # new changeId is used in next run
+                    logging.warn("Skip to query changed areas of %s "
+                                 "disk %s, due to: %s" % (
+                                     vm_name, key, e.msg))
+                    continue
+
+                seconds = snapshot_time - last_disk["time"]
+                rates[key] = {
+                    "device": disk.backing.fileName,
+                    "changed_bytes": changed_bytes,
+                    "seconds": int(seconds),
+                    "change_rate": int(changed_bytes / seconds)
+                                   if seconds > 0 else None
+                }
+        finally:
+            self._remove_snapshot(vm_name, snapshot)
+
+        logging.info("Measured change rate of VM %s: %s",
+                     vm_name, utils.capped(rates))
+        return rates, disks_state
+
+    def _create_snapshot(self, vm):
+        task = vm.CreateSnapshot_Task(name=SNAPSHOT_NAME,
+                                      description=SNAPSHOT_DESCRIPTION,
+                                      memory=False,
+                                      quiesce=False)
+        WaitForTask(task)
+        return task.info.result
+
+    def _remove_snapshot(self, vm_name, snapshot):
+        try:
+            WaitForTask(snapshot.RemoveSnapshot_Task(removeChildren=False))
+        except Exception as e:
+            logging.error("Failed to remove temporary snapshot %s of VM "
+                          "%s, please remove it manually, due to: %s" % (
+                              SNAPSHOT_NAME, vm_name, e))
+
+    def _query_changed_bytes(self, vm, snapshot, disk, change_id):
+        """Add up changed areas of disk since change_id"""
+        capacity = disk.capacityInBytes or disk.capacityInKB * 1024
+
+        changed_bytes = 0
+        offset = 0
+        while offset < capacity:
+            disk_areas = vm.QueryChangedDiskAreas(snapshot=snapshot,
+                                                  deviceKey=disk.key,
+                                                  startOffset=offset,
+                                                  changeId=change_id)
+            for area in disk_areas.changedArea:
+                changed_bytes += area.length
+
+            next_offset = disk_areas.startOffset + disk_areas.length
+            if next_offset <= offset:
+                break
+            offset = next_offset
+
+        return changed_bytes
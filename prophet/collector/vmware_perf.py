@@ -0,0 +1,214 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Collect VM performance statistics using PerformanceManager
+
+ Steps:
+
+     1. Resolve counter ids of needed counters once.
+     2. Choose the sample interval which covers the history window.
+     3. Query many VMs in one QueryPerf call, batch by batch.
+     4. Summarize each counter to avg, p95 and max.
+
+"""
+
+from concurrent import futures
+import datetime
+import logging
+import math
+
+from pyVmomi import vim
+
+# Counters to collect, full name is group.name.rollup
+PERF_COUNTERS = [
+    "cpu.usage.average",
+    "mem.usage.average",
+    "virtualDisk.read.average",
+    "virtualDisk.write.average",
+    "net.usage.average",
+    "net.received.average",
+    "net.transmitted.average"
+]
+
+# Default count of VMs in one QueryPerf call
+DEFAULT_BATCH_SIZE = 50
+
+# Realtime stats are kept for one hour with 20 seconds interval
+REALTIME_WINDOW = 3600
+
+# Percentile of summarized stats
+PERCENTILE = 95
+
+
+class PerfStatsCollector(object):
+    """Query and summarize performance statistics of VMs"""
+
+    def __init__(self, service_instance, hours,
+                 batch_size=DEFAULT_BATCH_SIZE, workers=1):
+        self.service_instance = service_instance
+        self.perf_manager = service_instance.content.perfManager
+        self.hours = hours
+        self.batch_size = int(batch_size or DEFAULT_BATCH_SIZE)
+        self.workers = workers
+
+        # Counter id to full name and unit
+        self._counters = None
+        self._interval_id = None
+
+    def collect(self, vms):
+        """Return dict of VM MOID and its performance statistics
+
+        Statistics sample:
+
+            {
+                "virtualDisk.write.average": {
+                    "unit": "KBps",
+                    "interval": 300,
+                    "samples": 288,
+                    "avg": 100.5,
+                    "p95": 300,
+                    "max": 1024
+                }
+            }
+        """
+        if not vms:
+            return {}
+
+        self._prepare()
+
+        end_time = self.service_instance.CurrentTime()
+        start_time = end_time - datetime.timedelta(hours=self.hours)
+
+        batches = [vms[i:i + self.batch_size]
+                   for i in range(0, len(vms), self.batch_size)]
+        logging.info("Querying performance statistics of %s VM(s) in "
+                     "%s batch(es), interval is %ss..." % (
+                         len(vms), len(batches), self._interval_id))
+
+        vms_stats = {}
+        with futures.ThreadPoolExecutor(
+                max_workers=self.workers) as executor:
+            tasks = [executor.submit(self._query_batch, batch,
+                                     start_time, end_time)
+                     for batch in batches]
+            for task in futures.as_completed(tasks):
+                try:
+                    vms_stats.update(task.result())
+                except Exception as e:
+                    logging.warn("Failed to query performance "
+                                 "statistics, due to: %s" % e)
+
+        logging.info("Got performance statistics of %s "
+                     "VM(s)" % len(vms_stats))
+        return vms_stats
+
+    def _prepare(self):
+        """Resolve counter ids and interval id only once"""
+        if self._counters is not None:
+            return
+
+        self._counters = {}
+        for counter in self.perf_manager.perfCounter:
+            name = "%s.%s.%s" % (counter.groupInfo.key,
+                                 counter.nameInfo.key,
+                                 counter.rollupType)
+            if name in PERF_COUNTERS:
+                self._counters[counter.key] = (
+                        name, counter.unitInfo.label)
+
+        missing = set(PERF_COUNTERS) - set(
+                name for name, _ in self._counters.values())
+        if missing:
+            logging.warn("Performance counters %s are not "
+                         "found" % ", ".join(sorted(missing)))
+
+        self._interval_id = self._get_interval_id()
+
+    def _get_interval_id(self):
+        """Return shortest sample interval which covers the window"""
+        window = self.hours * 3600
+        if window <= REALTIME_WINDOW:
+            return 20
+
+        intervals = sorted(self.perf_manager.historicalInterval,
+                           key=lambda i: i.samplingPeriod)
+        for interval in intervals:
+            if interval.enabled and interval.length >= window:
+                return interval.samplingPeriod
+
+        # Use the longest one if no interval covers the window
+        return intervals[-1].samplingPeriod
+
+    def _query_batch(self, vms, start_time, end_time):
+        metric_ids = [vim.PerformanceManager.MetricId(
+            counterId=counter_id, instance="*")
+            for counter_id in self._counters]
+        query_specs = [vim.PerformanceManager.QuerySpec(
+            entity=vm,
+            metricId=metric_ids,
+            startTime=start_time,
+            endTime=end_time,
+            intervalId=self._interval_id,
+            format="normal") for vm in vms]
+
+        vms_stats = {}
+        for entity_metric in self.perf_manager.QueryPerf(query_specs):
+            vms_stats[entity_metric.entity._moId] = self._summarize(
+                    entity_metric.value)
+
+        return vms_stats
+
+    def _summarize(self, series_list):
+        """Summarize series of each counter
+
+        Aggregated instance "" is used if exists, otherwise values of
+        all instances (disks or nics) are added up.
+        """
+        counter_values = {}
+        for series in series_list:
+            counter_id = series.id.counterId
+            values = counter_values.setdefault(counter_id, {})
+            values[series.id.instance] = series.value
+
+        stats = {}
+        for counter_id, instances in counter_values.items():
+            name, unit = self._counters[counter_id]
+            # -1 means no value in this sample
+            if "" in instances:
+                values = [v for v in instances[""] if v >= 0]
+            else:
+                values = []
+                for samples in zip(*instances.values()):
+                    valid_samples = [v for v in samples if v >= 0]
+                    if valid_samples:
+                        values.append(sum(valid_samples))
+
+            if not values:
+                continue
+
+            stats[name] = {
+                "unit": unit,
+                "interval": self._interval_id,
+                "samples": len(values),
+                "avg": float(sum(values)) / len(values),
+                "p95": self._percentile(values, PERCENTILE),
+                "max": max(values)
+            }
+
+        return stats
+
+    def _percentile(self, values, percent):
+        """Nearest rank percentile"""
+        values = sorted(values)
+        rank = int(math.ceil(percent / 100.0 * len(values)))
+        return values[max(rank, 1) - 1]
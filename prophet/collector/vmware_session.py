@@ -0,0 +1,117 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Session manager for vCenter and ESXi connections
+
+ Sessions are shared by all collections of the same endpoint in this
+ process, so each endpoint only login once and logout once at exit.
+
+"""
+
+import atexit
+import contextlib
+import logging
+import threading
+
+from pyVim import connect
+
+# Default count of collections of the same endpoint at the same time
+DEFAULT_ENDPOINT_LIMIT = 1
+
+
+class SessionManager(object):
+    """Cache vSphere sessions by endpoint"""
+
+    def __init__(self):
+        # Lock to create endpoint locks and semaphores
+        self._lock = threading.Lock()
+
+        # Lock for each endpoint, only one thread login at the same time
+        self._endpoint_locks = {}
+
+        # Semaphore for each endpoint to limit concurrent collections
+        self._endpoint_slots = {}
+
+        # Service instance, key is endpoint and username
+        self._sessions = {}
+
+    def _get_endpoint_lock(self, endpoint):
+        with self._lock:
+            return self._endpoint_locks.setdefault(
+                    endpoint, threading.Lock())
+
+    @contextlib.contextmanager
+    def endpoint_slot(self, host, port, limit=DEFAULT_ENDPOINT_LIMIT):
+        """Wait until collections of this endpoint is less than limit"""
+        endpoint = (host, int(port))
+        with self._lock:
+            slot = self._endpoint_slots.setdefault(
+                    endpoint, threading.BoundedSemaphore(limit))
+
+        logging.debug("Waiting for slot of %s:%s..." % endpoint)
+        with slot:
+            yield
+
+    def connect(self, host, port, username, password,
+                disable_ssl_verification=True):
+        """Return service instance of endpoint
+
+        Session in this process is reused if it's not expired, otherwise
+        login to endpoint.
+        """
+        endpoint = (host, int(port))
+        session_key = endpoint + (username,)
+        with self._get_endpoint_lock(endpoint):
+            service_instance = self._sessions.get(session_key)
+            if service_instance and self._is_alive(service_instance):
+                logging.info("Reuse session of %s:%s" % endpoint)
+                return service_instance
+
+            logging.info("Login to %s:%s..." % endpoint)
+            if disable_ssl_verification:
+                service_instance = connect.SmartConnectNoSSL(
+                    host=host, user=username, pwd=password,
+                    port=int(port))
+            else:
+                service_instance = connect.SmartConnect(
+                    host=host, user=username, pwd=password,
+                    port=int(port))
+            logging.info("Login to %s:%s successful" % endpoint)
+
+            self._sessions[session_key] = service_instance
+            return service_instance
+
+    def disconnect_all(self):
+        """Logout all sessions"""
+        for session_key, service_instance in self._sessions.items():
+            logging.info("Logout from %s:%s..." % session_key[:2])
+            try:
+                connect.Disconnect(service_instance)
+            except Exception as e:
+                logging.warn("Failed to logout from %s:%s, due "
+                             "to: %s" % (session_key[:2] + (e,)))
+        self._sessions = {}
+
+    def _is_alive(self, service_instance):
+        try:
+            return bool(
+                service_instance.content.sessionManager.currentSession)
+        except Exception as e:
+            logging.debug("Session is not alive, due to: %s" % e)
+            return False
+
+
+# NOTE: All collectors in this process share the same manager, so
+# each endpoint only login once and logout once at exit
+session_manager = SessionManager()
+atexit.register(session_manager.disconnect_all)
@@ -0,0 +1,80 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Registry of stevedore drivers
+
+Each driver is resolved from entry points only once in each process,
+instead of creating a DriverManager for every host or file. Drivers of
+a namespace can be loaded at start-up with prewarm.
+
+"""
+
+import logging
+import threading
+
+from stevedore import driver
+from stevedore import exception
+from stevedore import extension
+
+from prophet import exceptions
+
+_lock = threading.Lock()
+
+# Driver class, key is namespace and name
+_drivers = {}
+
+
+def get_driver(namespace, name):
+    """Return driver class of name in namespace
+
+    DriverNotFound is raised with available drivers if not found.
+    """
+    key = (namespace, name)
+    if key not in _drivers:
+        with _lock:
+            if key not in _drivers:
+                _drivers[key] = _load_driver(namespace, name)
+
+    return _drivers[key]
+
+
+def prewarm(namespace):
+    """Load all drivers of namespace with one entry points scan"""
+    manager = extension.ExtensionManager(namespace=namespace,
+                                         invoke_on_load=False)
+    with _lock:
+        for ext in manager:
+            _drivers[(namespace, ext.name)] = ext.plugin
+
+    logging.info("Loaded %s driver(s) of %s: %s" % (
+        len(manager.names()), namespace, ", ".join(manager.names())))
+
+
+def available_drivers(namespace):
+    """Return sorted names of drivers in namespace"""
+    manager = extension.ExtensionManager(namespace=namespace,
+                                         invoke_on_load=False)
+    return sorted(manager.names())
+
+
+def _load_driver(namespace, name):
+    logging.debug("Loading %s driver %s..." % (namespace, name))
+    try:
+        driver_manager = driver.DriverManager(namespace=namespace,
+                                              name=name,
+                                              invoke_on_load=False)
+    except exception.NoMatches:
+        raise exceptions.DriverNotFound(namespace, name,
+                                        available_drivers(namespace))
+
+    return driver_manager.driver
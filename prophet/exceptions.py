@@ -15,3 +15,16 @@
 class Error(Exception):
     """Base class for exceptions in this module."""
     pass
+
+
+class DriverNotFound(Error):
+    """Driver of name is not found in namespace"""
+
+    def __init__(self, namespace, name, available):
+        self.namespace = namespace
+        self.name = name
+        self.available = available
+        super(DriverNotFound, self).__init__(
+                "No %s driver named %s is found, available drivers "
+                "are: %s" % (namespace, name,
+                             ", ".join(available) or "none"))
@@ -0,0 +1,158 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Formats of collection result files
+
+Results are saved as yaml by default. JSON Lines and MessagePack are
+faster to write and read, and smaller for large collections. Structure
+of results is the same in all formats, format of each file is detected
+by its extension when it's loaded.
+
+"""
+
+import json
+import os
+
+from prophet import utils
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULT_FORMAT = "yaml"
+
+
+class ResultFormat(object):
+    """Base class of result file format"""
+
+    # Name used in command line
+    name = None
+
+    # Extension of result file, including dot
+    extension = None
+
+    # Open file in binary mode or not
+    binary = False
+
+    def is_available(self):
+        return True
+
+    def dump(self, values, stream):
+        raise NotImplementedError
+
+    def load(self, stream):
+        raise NotImplementedError
+
+
+class YamlFormat(ResultFormat):
+
+    name = "yaml"
+    extension = ".yaml"
+
+    def dump(self, values, stream):
+        utils.dump_yaml(values, stream)
+
+    def load(self, stream):
+        return utils.load_yaml(stream)
+
+
+class JsonLinesFormat(ResultFormat):
+    """Each root key and its values are saved in one json line"""
+
+    name = "jsonl"
+    extension = ".jsonl"
+
+    def dump(self, values, stream):
+        for key, value in utils.to_plain(values).items():
+            stream.write(json.dumps({key: value}))
+            stream.write("\n")
+
+    def load(self, stream):
+        values = {}
+        for line in stream:
+            if line.strip():
+                values.update(json.loads(line))
+        return values
+
+
+class MsgpackFormat(ResultFormat):
+
+    name = "msgpack"
+    extension = ".msgpack"
+    binary = True
+
+    def is_available(self):
+        return msgpack is not None
+
+    def dump(self, values, stream):
+        msgpack.pack(utils.to_plain(values), stream, use_bin_type=True)
+
+    def load(self, stream):
+        return msgpack.unpack(stream, raw=False)
+
+
+FORMATS = dict((f.name, f) for f in [
+    YamlFormat(), JsonLinesFormat(), MsgpackFormat()])
+
+_EXTENSIONS = dict((f.extension, f) for f in FORMATS.values())
+
+
+def get_format(name):
+    """Return result format by name
+
+    ValueError is raised if format is unknown or its library is not
+    installed.
+    """
+    result_format = FORMATS.get(name or DEFAULT_FORMAT)
+    if not result_format:
+        raise ValueError("Unknown result format %s, should be one of "
+                         "%s" % (name, ", ".join(sorted(FORMATS))))
+
+    check_available(result_format)
+    return result_format
+
+
+def check_available(result_format):
+    """Raise ValueError if library of result format is not installed"""
+    if not result_format.is_available():
+        raise ValueError("Result format %s is not available, please "
+                         "install prophet[%s] first" % (
+                             result_format.name, result_format.name))
+
+
+def detect_format(path):
+    """Return result format of file by extension, None if unknown"""
+    return _EXTENSIONS.get(os.path.splitext(path)[1])
+
+
+def dump(values, path, result_format):
+    mode = "wb" if result_format.binary else "w"
+    with open(path, mode) as f:
+        result_format.dump(values, f)
+
+
+def load(path):
+    """Load result file in format detected by extension
+
+    ValueError is raised if format is unknown or its library is not
+    installed.
+    """
+    result_format = detect_format(path)
+    if not result_format:
+        raise ValueError("Unknown format of result file %s" % path)
+    check_available(result_format)
+
+    mode = "rb" if result_format.binary else "r"
+    with open(path, mode) as f:
+        return result_format.load(f)
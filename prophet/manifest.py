@@ -0,0 +1,194 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Manifest of collection package
+
+Manifest is saved as manifest.json in root of package, it lists every
+file with its hosts, size, checksum and collection time, so tools can
+read only needed files from package and verify them one by one.
+
+Manifest sample:
+
+    {
+        "version": 1,
+        "created_at": 1634636400,
+        "files": {
+            "VMWARE/vm1_vmware.yaml": {
+                "format": "yaml",
+                "size": 7540,
+                "sha256": "9f86d08...",
+                "collected_at": 1634636000,
+                "hosts": [
+                    {"root_key": "VMWARE_192.168.10.2",
+                     "os_type": "VMWARE"}
+                ]
+            }
+        }
+    }
+
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+
+from prophet import formats
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Chunk size to calculate checksum
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_hosts(values):
+    """Return root key and os type of hosts in result values"""
+    if not isinstance(values, dict):
+        return []
+
+    return [{"root_key": root_key, "os_type": infos["os_type"]}
+            for root_key, infos in values.items()
+            if isinstance(infos, dict) and "os_type" in infos]
+
+
+def file_entry(path, data, values=None):
+    """Return manifest entry of file with content data
+
+    If values of result file is not given, it's loaded from file.
+    """
+    result_format = formats.detect_format(path)
+    if result_format and values is None:
+        values = formats.load(path)
+
+    return {
+        "format": result_format.name if result_format else None,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "collected_at": int(os.path.getmtime(path)),
+        "hosts": get_hosts(values)
+    }
+
+
+def is_entry_of(entry, path):
+    """Return True if entry is still valid for file"""
+    stat = os.stat(path)
+    return entry.get("size") == stat.st_size and \
+        entry.get("collected_at") == int(stat.st_mtime)
+
+
+def dumps(files):
+    return json.dumps({
+        "version": MANIFEST_VERSION,
+        "created_at": int(time.time()),
+        "files": files
+    }, indent=2, sort_keys=True)
+
+
+def load_file(path):
+    """Return files of manifest file, empty if it's missing or broken"""
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("files", {})
+    except (IOError, ValueError) as e:
+        logging.warn("Failed to load manifest %s, due to: %s" % (path, e))
+        return {}
+
+
+class PackageReader(object):
+    """Read files in collection package without extraction"""
+
+    def __init__(self, package_file):
+        self.package_file = package_file
+        self._zip = zipfile.ZipFile(package_file, "r")
+        self.files = self._load_manifest()
+
+    def _load_manifest(self):
+        """Return files in manifest
+
+        Packages created before manifest only have file formats, hosts
+        are unknown until files are loaded.
+        """
+        if MANIFEST_NAME in self._zip.namelist():
+            manifest = json.loads(self._zip.read(MANIFEST_NAME))
+            return manifest["files"]
+
+        logging.info("No manifest in package %s, list files in "
+                     "zip" % self.package_file)
+        files = {}
+        for info in self._zip.infolist():
+            if info.is_dir():
+                continue
+            result_format = formats.detect_format(info.filename)
+            files[info.filename] = {
+                "format": result_format.name if result_format else None,
+                "size": info.file_size
+            }
+        return files
+
+    def host_files(self, os_type=None):
+        """Return names of result files, filter by os type if given"""
+        names = []
+        for name, entry in sorted(self.files.items()):
+            if not entry.get("format"):
+                continue
+
+            # NOTE: Hosts are unknown in package without manifest,
+            # files without hosts are referred files, e.g. ESXi files
+            hosts = entry.get("hosts")
+            if hosts is None or any(not os_type or h["os_type"] == os_type
+                                    for h in hosts):
+                names.append(name)
+        return names
+
+    def read(self, name):
+        return self._zip.read(name)
+
+    def get_crc(self, name):
+        """Return CRC and size of file in zip directory"""
+        info = self._zip.getinfo(name)
+        return info.CRC, info.file_size
+
+    def load(self, name):
+        """Load result file from package without extraction"""
+        result_format = formats.detect_format(name)
+        if not result_format:
+            raise ValueError("Unknown format of result file %s" % name)
+        formats.check_available(result_format)
+
+        with self._zip.open(name) as f:
+            if not result_format.binary:
+                f = io.TextIOWrapper(f, encoding="utf-8")
+            return result_format.load(f)
+
+    def verify(self, name):
+        """Return True if checksum of file matches manifest"""
+        entry = self.files.get(name)
+        if not entry or not entry.get("sha256"):
+            raise ValueError("No checksum of %s in manifest of %s" % (
+                name, self.package_file))
+
+        checksum = hashlib.sha256()
+        with self._zip.open(name) as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                checksum.update(chunk)
+        return checksum.hexdigest() == entry["sha256"]
+
+    def close(self):
+        self._zip.close()
@@ -19,6 +19,10 @@ Inherit this class and implement each `parser` method in sub class.
 
 import logging
 
+# Version of parsed results, increase it if output of any parser is
+# changed, so cached results of old version are not used in report
+PARSER_VERSION = 3
+
 # Boot type
 BIOS_BOOT = "bios"
 EFI_BOOT = "efi"
@@ -34,9 +38,13 @@ VT_VENDORS = [VMWARE_DISK_VENDOR, KVM_DISK_VENDOR]
 
 class BaseHostParser(object):
 
-    def __init__(self, payload):
+    def __init__(self, payload, loader=None):
         self.payload = payload
 
+        # Loader to read other files referred by payload in the same
+        # package, see prophet.report.host_report.ReferenceLoader
+        self.loader = loader
+
         self.vt_platform = None
         self.vt_platform_ver = None
 
@@ -49,7 +57,8 @@ class BaseHostParser(object):
             "memory": self.parse_memory(),
             "disks": self.parse_disks(),
             "networks": self.parse_nics(),
-            "vt": self.parse_vt()
+            "vt": self.parse_vt(),
+            "perf": self.parse_perf()
         }
 
     def parse_basic(self):
@@ -194,6 +203,35 @@ class BaseHostParser(object):
             "vt_platform_ver": self.vt_platform_ver
         }
 
+    def parse_perf(self):
+        """Return a dict with performance statistics
+
+        NOTE: All rate unit should be bytes per second by default, if
+        no performance data is sampled, return None
+
+        Return sample:
+
+            {
+                "disk_write_rates": List of disk write rate dict,
+                "avg_disk_write_rate": Average write rate of host,
+                "p95_disk_write_rate": 95th percentile write rate,
+                "peak_disk_write_rate": Peak write rate of host,
+                "avg_net_usage_rate": Average network usage of host,
+                "peak_net_usage_rate": Peak network usage of host,
+                "stats": Raw statistics of each counter,
+                "change_rate": Disk change rate measured by CBT
+            }
+
+        Disk write rate dict sample:
+
+            {
+                "device": Name of disk,
+                "avg_write_rate": Average write rate of disk,
+                "peak_write_rate": Peak write rate of disk
+            }
+        """
+        return
+
     def _get_disk_total_size(self, disk_info):
         """Common method to calculate disk total size"""
         total_size = 0
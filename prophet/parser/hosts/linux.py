@@ -19,6 +19,8 @@ import re
 
 import humanfriendly
 
+from prophet import utils
+
 from prophet.parser.hosts.base import (BaseHostParser,
                                        BIOS_BOOT,
                                        EFI_BOOT,
@@ -27,6 +29,9 @@ from prophet.parser.hosts.base import (BaseHostParser,
                                        KVM_DISK_VENDOR,
                                        VT_VENDORS)
 
+# Convert all size to Bytes
+MB = 1024 * 1024
+
 # Regular expression for disk
 DISK_REGEX = re.compile(r"^[x]{0,1}[svh]d[a-z]")
 
@@ -36,8 +41,8 @@ NIC_TYPE = "ether"
 
 class LinuxParser(BaseHostParser):
 
-    def __init__(self, payload):
-        super(LinuxParser, self).__init__(payload)
+    def __init__(self, payload, loader=None):
+        super(LinuxParser, self).__init__(payload, loader=loader)
 
         self._conn_ip = None
         self._host_info = None
@@ -100,8 +105,8 @@ class LinuxParser(BaseHostParser):
     def parse_memory(self):
         return {
             "memory_info": None,
-            "total_mem": int(self._host_info["ansible_memtotal_mb"]) * 1024,
-            "free_mem": int(self._host_info["ansible_memfree_mb"]) * 1024
+            "total_mem": int(self._host_info["ansible_memtotal_mb"]) * MB,
+            "free_mem": int(self._host_info["ansible_memfree_mb"]) * MB
         }
 
     def parse_disks(self):
@@ -182,7 +187,7 @@ class LinuxParser(BaseHostParser):
             # Try to analysis VT type from disk vendor
             self._get_vt(vendor)
 
-        logging.info("Parsed disk info: %s" % disks)
+        logging.info("Parsed disk info: %s", utils.capped(disks))
         return disks
 
     def _get_vt(self, vendor):
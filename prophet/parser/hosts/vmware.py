@@ -27,8 +27,8 @@ MB = 1024 * 1024
 
 class VMwareParser(BaseHostParser):
 
-    def __init__(self, payload):
-        super(VMwareParser, self).__init__(payload)
+    def __init__(self, payload, loader=None):
+        super(VMwareParser, self).__init__(payload, loader=loader)
 
         # Initial host info
         self._host_info = None
@@ -57,7 +57,16 @@ class VMwareParser(BaseHostParser):
         for key, info in self.payload.items():
             self._host_info = info
 
-        for name, info in self._host_info["esxi_host"].items():
+        esxi_host = self._host_info["esxi_host"]
+
+        # NOTE: In old packages, ESXi information is saved in each
+        # VM, otherwise it's saved in ESXi file referred by VM
+        if isinstance(esxi_host, dict):
+            esxis = esxi_host
+        else:
+            esxis = self.loader.load(self._host_info["esxi_file"])
+
+        for name, info in esxis.items():
             self._esxi_name = name
             self._esxi_info = info["esxi_info"]
 
@@ -157,3 +166,42 @@ class VMwareParser(BaseHostParser):
             "vt_esxi": self._esxi_name,
             "vt_cbt": self._host_info["changeTrackingSupported"]
         }
+
+    def parse_perf(self):
+        """Parse performance statistics collected by QueryPerf
+
+        Rate counters of vSphere are KBps, convert them to bytes/s.
+        Change rate measured by CBT is already bytes/s.
+        """
+        perf_stats = self._host_info.get("perf_stats")
+        change_rates = self._host_info.get("change_rates")
+        if not perf_stats and not change_rates:
+            return
+
+        perf_stats = perf_stats or {}
+        disk_write = perf_stats.get("virtualDisk.write.average", {})
+        net_usage = perf_stats.get("net.usage.average", {})
+        return {
+            "avg_disk_write_rate": self._kbps_to_bps(disk_write.get("avg")),
+            "p95_disk_write_rate": self._kbps_to_bps(disk_write.get("p95")),
+            "peak_disk_write_rate": self._kbps_to_bps(disk_write.get("max")),
+            "avg_net_usage_rate": self._kbps_to_bps(net_usage.get("avg")),
+            "peak_net_usage_rate": self._kbps_to_bps(net_usage.get("max")),
+            "stats": perf_stats,
+            "change_rate": self._get_change_rate(change_rates)
+        }
+
+    def _get_change_rate(self, change_rates):
+        """Return total change rate of all disks measured by CBT"""
+        if not change_rates:
+            return
+
+        rates = [r["change_rate"] for r in change_rates.values()
+                 if r.get("change_rate") is not None]
+        if rates:
+            return sum(rates)
+
+    def _kbps_to_bps(self, value):
+        if value is None:
+            return
+        return int(value * KB)
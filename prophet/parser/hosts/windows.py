@@ -26,6 +26,7 @@ Currently we mainly use this class for Windows Parser:
   * Win32_PhysicalMemory
   * Win32_NetworkAdapterConfiguration
   * Win32_LogicalDisk
+  * Win32_PerfRawData_PerfDisk_PhysicalDisk (Optional)
 """
 
 import logging
@@ -34,11 +35,17 @@ from prophet.parser.hosts.base import (BaseHostParser,
                                        BIOS_BOOT,
                                        EFI_BOOT)
 
+# Convert all size to Bytes
+KB = 1024
+
+# Instance name of sum of all disks in performance counters
+TOTAL_INSTANCE = "_Total"
+
 
 class WindowsParser(BaseHostParser):
 
-    def __init__(self, payload):
-        super(WindowsParser, self).__init__(payload)
+    def __init__(self, payload, loader=None):
+        super(WindowsParser, self).__init__(payload, loader=loader)
 
         # Pre analysis of payload variables
         self._computer_system = None
@@ -50,6 +57,7 @@ class WindowsParser(BaseHostParser):
         self._network_info = None
         self._logical_disk = None
         self._process = None
+        self._disk_perf = None
 
         # Pre parse payload to save into variables
         self._pre_parse(payload)
@@ -64,6 +72,8 @@ class WindowsParser(BaseHostParser):
         self._logical_disk = payload['Win32_LogicalDisk']
         self._network_info = payload['Win32_NetworkAdapterConfiguration']
         self._process = payload['Win32_Process'][0]
+        self._disk_perf = payload.get(
+                'Win32_PerfRawData_PerfDisk_PhysicalDisk', [])
 
     def parse_basic(self):
         hostname = self._computer_system["Name"]
@@ -107,7 +117,8 @@ class WindowsParser(BaseHostParser):
     def parse_memory(self):
         memory_info = self._physical_memory["Caption"]
         total_mem = int(self._computer_system["TotalPhysicalMemory"])
-        free_mem = int(self._operating_system["FreePhysicalMemory"])
+        # NOTE: Total memory is in bytes, but free memory is in KB
+        free_mem = int(self._operating_system["FreePhysicalMemory"]) * KB
         return {
             "memory_info": memory_info,
             "total_mem": total_mem,
@@ -368,6 +379,115 @@ class WindowsParser(BaseHostParser):
             "count": len(nics),
         }
 
+    def parse_perf(self):
+        """Parse disk write rate from sampled raw disk counters
+
+        DiskWriteBytesPersec is a raw counter of written bytes, write
+        rate between two samples of same disk is:
+
+          (Counter2 - Counter1) / ((Timestamp2 - Timestamp1) / Frequency)
+
+        Sample Win32_PerfRawData_PerfDisk_PhysicalDisk Data:
+          - DiskWriteBytesPersec: '88923521024'
+            Frequency_PerfTime: '10000000'
+            Name: 0 C:
+            Timestamp_PerfTime: '1213424350591'
+        """
+        if not self._disk_perf:
+            return
+
+        disk_samples = {}
+        for sample in self._disk_perf:
+            disk_samples.setdefault(sample["Name"], []).append(sample)
+
+        disk_write_rates = []
+        for name, samples in sorted(disk_samples.items()):
+            if name == TOTAL_INSTANCE:
+                continue
+
+            rates = self._get_write_rates(samples)
+            if not rates:
+                logging.debug("Not enough samples for disk %s, "
+                              "ignore." % name)
+                continue
+
+            disk_write_rates.append({
+                "device": name,
+                "avg_write_rate": rates[0],
+                "peak_write_rate": rates[1]
+            })
+
+        # NOTE: Peaks of disks don't happen at the same time, if
+        # _Total instance is missing, counters of all disks are summed
+        # at each timestamp before host rate is calculated
+        total_samples = disk_samples.pop(TOTAL_INSTANCE, None)
+        if not total_samples:
+            total_samples = self._sum_samples(disk_samples)
+        total_rates = self._get_write_rates(total_samples)
+        if not total_rates:
+            return
+
+        return {
+            "disk_write_rates": disk_write_rates,
+            "avg_disk_write_rate": total_rates[0],
+            "peak_disk_write_rate": total_rates[1]
+        }
+
+    def _sum_samples(self, disk_samples):
+        """Return samples of sum of all disks at each timestamp
+
+        All disks are sampled by the same query with the same timestamp,
+        only timestamps sampled for all disks are used, so sums at each
+        timestamp are comparable.
+        """
+        counters = {}
+        for samples in disk_samples.values():
+            for sample in samples:
+                try:
+                    key = (int(sample["Timestamp_PerfTime"]),
+                           int(sample["Frequency_PerfTime"]))
+                    counter = int(sample["DiskWriteBytesPersec"])
+                except (KeyError, ValueError):
+                    continue
+                counters.setdefault(key, []).append(counter)
+
+        return [{"Timestamp_PerfTime": timestamp,
+                 "Frequency_PerfTime": frequency,
+                 "DiskWriteBytesPersec": sum(values)}
+                for (timestamp, frequency), values in counters.items()
+                if len(values) == len(disk_samples)]
+
+    def _get_write_rates(self, samples):
+        """Return average and peak write rate of one disk samples"""
+        points = []
+        for sample in samples:
+            try:
+                points.append((int(sample["Timestamp_PerfTime"]),
+                               int(sample["DiskWriteBytesPersec"]),
+                               int(sample["Frequency_PerfTime"])))
+            except (KeyError, ValueError):
+                logging.debug("Invalid disk sample %s, "
+                              "ignore." % sample)
+        points.sort()
+
+        peak_rate = 0
+        total_bytes = 0
+        total_seconds = 0
+        for prev, curr in zip(points, points[1:]):
+            seconds = float(curr[0] - prev[0]) / curr[2]
+            written = curr[1] - prev[1]
+            # Counter may be reset between two samples
+            if seconds <= 0 or written < 0:
+                continue
+            total_bytes += written
+            total_seconds += seconds
+            peak_rate = max(peak_rate, written / seconds)
+
+        if not total_seconds:
+            return
+
+        return int(total_bytes / total_seconds), int(peak_rate)
+
     def _get_value(self, value, separator=","):
         """Remove () and return values in list if multiple
 
@@ -0,0 +1,250 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Target flavor matching of hosts
+
+The cheapest flavor with enough vCPUs and RAM is matched for every host
+at once, cost of flavor is its price if given, otherwise its vCPUs and
+RAM relative to the largest flavor. Disks of host are created as
+volumes, so flavor disk is not matched.
+
+Total demand of vCPUs, RAM, instances and volumes is checked against
+quota, quota is in the same format of OpenStackDriver, -1 means no
+limit:
+
+    cores:
+      used: 10
+      total: 100
+    ram:
+      used: 20480
+      total: 204800
+    gigabytes:
+      used: 0
+      total: -1
+
+Flavors file is a list of flavors in yaml or json, e.g. output of
+"openstack flavor list -f json":
+
+    - name: m1.small
+      vcpus: 1
+      ram: 2048
+
+"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from prophet import utils
+from prophet.planner import wave
+from prophet.report import mapping as report_mapping
+from prophet.report import writers
+
+DEFAULT_MAPPING = "migration_summary"
+FIT_NAME = "flavor_fit.csv"
+
+# Count of hosts matched with all flavors at once
+MATCH_CHUNK_SIZE = 10000
+
+# Fields of hosts in report, the first field found in report is used
+CPU_FIELDS = ["cpu.cpu_cores"]
+MEMORY_FIELDS = ["memory.total_mem"]
+DISK_FIELDS = ["disks.total_size"]
+DISK_COUNT_FIELDS = ["disks.count"]
+
+# Size in report is MB, volume is GB
+GB = 1024
+
+# Quota resources and their names in report
+RESOURCES = [
+    ("cores", "vCPU"),
+    ("ram", "内存(MB)"),
+    ("instances", "实例数量"),
+    ("gigabytes", "卷容量(GB)"),
+    ("volumes", "卷数量")
+]
+
+FIT_COLUMNS = ["主机名", "IP", "CPU核数", "内存(MB)", "磁盘总容量(GB)",
+               "规格", "规格vCPU", "规格内存(MB)"]
+CAPACITY_SHEET = "capacity"
+CAPACITY_COLUMNS = ["资源", "需求", "已使用", "配额", "是否满足"]
+
+
+def load_flavors(flavors_file):
+    """Return flavors in file, keys are in lower case
+
+    ValueError is raised if any flavor has no vcpus or ram.
+    """
+    with open(flavors_file, "r", encoding="utf-8") as f:
+        content = utils.load_yaml(f)
+
+    if isinstance(content, dict):
+        content = content.get("flavors")
+
+    flavors = []
+    for flavor in content or []:
+        flavor = dict((str(k).lower(), v) for k, v in flavor.items())
+        if not flavor.get("vcpus") or not flavor.get("ram"):
+            raise ValueError("Flavor %s has no vcpus or ram" % flavor)
+        flavors.append(flavor)
+
+    if not flavors:
+        raise ValueError("No flavor in %s" % flavors_file)
+    return flavors
+
+
+def load_quota(quota_file):
+    """Return quota in file, numbers are taken as total"""
+    with open(quota_file, "r", encoding="utf-8") as f:
+        content = utils.load_yaml(f) or {}
+
+    quota = {}
+    for resource, value in content.items():
+        if not isinstance(value, dict):
+            value = {"used": 0, "total": value}
+        quota[resource] = value
+    return quota
+
+
+def match_flavors(cpus, rams, flavors):
+    """Return index of matched flavor of each host, -1 if none fits"""
+    cpus = np.asarray(cpus, dtype=float)
+    rams = np.asarray(rams, dtype=float)
+    flavor_cpus = np.array([f["vcpus"] for f in flavors], dtype=float)
+    flavor_rams = np.array([f["ram"] for f in flavors], dtype=float)
+    if all(f.get("price") is not None for f in flavors):
+        costs = np.array([f["price"] for f in flavors], dtype=float)
+    else:
+        costs = flavor_cpus / flavor_cpus.max() + \
+            flavor_rams / flavor_rams.max()
+
+    # NOTE: Hosts are matched in chunks, so the matrix of hosts
+    # and flavors is not too large for many hosts
+    matched = np.full(len(cpus), -1, dtype=int)
+    for start in range(0, len(cpus), MATCH_CHUNK_SIZE):
+        end = start + MATCH_CHUNK_SIZE
+        fits = (flavor_cpus >= cpus[start:end, None]) & \
+            (flavor_rams >= rams[start:end, None])
+        chunk_costs = np.where(fits, costs, np.inf)
+        matched[start:end] = np.where(fits.any(axis=1),
+                                      chunk_costs.argmin(axis=1), -1)
+    return matched
+
+
+def check_capacity(demand, quota):
+    """Return rows of demand, used and total of each resource in quota"""
+    rows = []
+    for resource, name in RESOURCES:
+        used = total = None
+        enough = True
+        if resource in quota:
+            used = quota[resource].get("used", 0)
+            total = quota[resource].get("total", -1)
+            enough = total == -1 or demand[resource] + used <= total
+        rows.append([name, demand[resource], used, total, enough])
+    return rows
+
+
+class FlavorMatcher(object):
+
+    def __init__(self, report_file, output_path, flavors_file,
+                 quota_file=None, fit_name=FIT_NAME,
+                 mapping=DEFAULT_MAPPING):
+        self.report_file = report_file
+        self.output_path = output_path
+        self.flavors_file = flavors_file
+        self.quota_file = quota_file
+        self.fit_name = fit_name
+        self.mapping = report_mapping.load_mapping(mapping)
+
+    @property
+    def fit_path(self):
+        return os.path.join(self.output_path, self.fit_name)
+
+    def match(self):
+        logging.info("Loading hosts from report %s..." % self.report_file)
+        hosts = self._load_hosts()
+        flavors = load_flavors(self.flavors_file)
+        quota = load_quota(self.quota_file) if self.quota_file else {}
+
+        logging.info("Matching %s hosts with %s flavors..." % (
+            len(hosts), len(flavors)))
+        hosts, demand = fit_hosts(hosts, flavors)
+
+        logging.info("Generating flavor fit report in %s..." %
+                     self.fit_path)
+        writer = writers.get_writer(self.fit_path, FIT_COLUMNS)
+        writer.open()
+        try:
+            writer.write_rows(zip(
+                hosts["name"].tolist(), hosts["ip"].tolist(),
+                hosts["cpu"].tolist(), hosts["ram"].tolist(),
+                hosts["volume"].tolist(), hosts["flavor"].tolist(),
+                hosts["flavor_cpu"].tolist(), hosts["flavor_ram"].tolist()))
+            writer.write_sheet(CAPACITY_SHEET, CAPACITY_COLUMNS,
+                               check_capacity(demand, quota))
+        finally:
+            writer.close()
+
+    def _load_hosts(self):
+        report = wave.read_report(self.report_file)
+
+        def get_number(fields, required=True):
+            return pd.to_numeric(wave.get_report_column(
+                report, self.mapping, fields, required),
+                errors="coerce").fillna(0)
+
+        return pd.DataFrame({
+            "name": wave.get_report_column(report, self.mapping,
+                                           wave.NAME_FIELDS),
+            "ip": wave.get_report_column(report, self.mapping,
+                                         wave.IP_FIELDS, required=False),
+            "cpu": get_number(CPU_FIELDS),
+            "ram": get_number(MEMORY_FIELDS),
+            "disk": get_number(DISK_FIELDS, required=False),
+            "disks": get_number(DISK_COUNT_FIELDS, required=False)
+        })
+
+
+def fit_hosts(hosts, flavors):
+    """Add matched flavor of hosts, return hosts and total demand
+
+    Hosts is a DataFrame of cpu, ram and disk in MB, and disks count.
+    Hosts without fitted flavor are not counted in demand.
+    """
+    hosts = hosts.copy()
+    matched = match_flavors(hosts["cpu"].values, hosts["ram"].values,
+                            flavors)
+    fitted = matched >= 0
+    if not fitted.all():
+        logging.warning("No flavor fits %s hosts" % (~fitted).sum())
+
+    names = np.array([f.get("name") for f in flavors] + [None],
+                     dtype=object)
+    flavor_cpus = np.array([f["vcpus"] for f in flavors] + [0])
+    flavor_rams = np.array([f["ram"] for f in flavors] + [0])
+    hosts["flavor"] = names[matched]
+    hosts["flavor_cpu"] = np.where(fitted, flavor_cpus[matched], None)
+    hosts["flavor_ram"] = np.where(fitted, flavor_rams[matched], None)
+    hosts["volume"] = np.ceil(hosts["disk"].values / GB).astype(int)
+
+    demand = {
+        "cores": int(flavor_cpus[matched][fitted].sum()),
+        "ram": int(flavor_rams[matched][fitted].sum()),
+        "instances": int(fitted.sum()),
+        "gigabytes": int(hosts["volume"].values[fitted].sum()),
+        "volumes": int(np.maximum(hosts["disks"].values[fitted], 1).sum())
+    }
+    return hosts, demand
@@ -0,0 +1,288 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Migration wave planner
+
+Hosts in report are packed into waves, each wave is a migration window
+that data of its hosts can be sent with the bandwidth in window length,
+and count of hosts migrated at the same time is limited.
+
+Hosts in the same group, ESXi server or subnet, are kept in the same
+wave if the whole group fits in a wave, larger groups are split into
+as few waves as possible. Groups are packed with first fit decreasing.
+
+Columns of report are found by mapping profile of report, so report
+generated by any mapping with needed fields can be planned.
+
+"""
+
+import ipaddress
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from prophet.report import mapping as report_mapping
+from prophet.report import transfer
+from prophet.report import writers
+
+DEFAULT_MAPPING = "transfer_estimate"
+PLAN_NAME = "wave_plan.csv"
+
+# Hours of each migration window
+DEFAULT_WINDOW = 8
+
+# Count of hosts migrated at the same time
+DEFAULT_MAX_HOSTS = 20
+
+GROUP_BY_ESXI = "esxi"
+GROUP_BY_SUBNET = "subnet"
+GROUP_BY_NONE = "none"
+GROUP_BYS = [GROUP_BY_ESXI, GROUP_BY_SUBNET, GROUP_BY_NONE]
+
+# Prefix length of subnet to group hosts
+SUBNET_PREFIX = 24
+
+# Fields of hosts in report, the first field found in report is used
+NAME_FIELDS = ["basic.hostname", "basic.vm_name", "basic.conn_ip"]
+IP_FIELDS = ["basic.conn_ip"]
+ESXI_FIELDS = ["vt.vt_esxi"]
+SIZE_FIELDS = ["transfer.transfer_size", "transfer.used_size",
+               "disks.total_size"]
+
+MB = 1024 * 1024
+
+PLAN_COLUMNS = ["波次", "主机名", "IP", "分组", "传输数据量(MB)",
+                "预计传输时间(小时)"]
+WAVES_SHEET = "waves"
+WAVES_COLUMNS = ["波次", "主机数量", "传输数据量(MB)", "预计时间(小时)",
+                 "是否超出窗口"]
+
+
+class WavePlanner(object):
+
+    def __init__(self, report_file, output_path, plan_name=PLAN_NAME,
+                 mapping=DEFAULT_MAPPING,
+                 bandwidth=transfer.DEFAULT_BANDWIDTH,
+                 window=DEFAULT_WINDOW, max_hosts=DEFAULT_MAX_HOSTS,
+                 group_by=GROUP_BY_ESXI):
+        self.report_file = report_file
+        self.output_path = output_path
+        self.plan_name = plan_name
+        self.mapping = report_mapping.load_mapping(mapping)
+
+        # Bandwidth in Mbit/s and window in hours
+        self.bandwidth = float(bandwidth)
+        self.window = float(window)
+        self.max_hosts = int(max_hosts)
+        self.group_by = group_by
+
+        if self.bandwidth <= 0 or self.window <= 0 or self.max_hosts <= 0:
+            raise ValueError("Bandwidth, window and max hosts should be "
+                             "positive numbers")
+        if self.group_by not in GROUP_BYS:
+            raise ValueError("Unknown group by %s, should be one of "
+                             "%s" % (group_by, ", ".join(GROUP_BYS)))
+
+    @property
+    def plan_path(self):
+        return os.path.join(self.output_path, self.plan_name)
+
+    @property
+    def wave_capacity(self):
+        """Size in MB can be sent in a window"""
+        return self.bandwidth * transfer.MBIT * self.window * \
+            transfer.HOUR / MB
+
+    def plan(self):
+        logging.info("Loading hosts from report %s..." % self.report_file)
+        hosts = self._load_hosts()
+
+        logging.info("Packing %s hosts into waves of %.2f MB and %s "
+                     "hosts..." % (len(hosts), self.wave_capacity,
+                                   self.max_hosts))
+        hosts["wave"] = pack_waves(hosts["size"].values,
+                                   hosts["group"].values,
+                                   self.wave_capacity, self.max_hosts) + 1
+        hosts["hours"] = self._get_hours(hosts["size"])
+
+        logging.info("Generating wave plan in %s..." % self.plan_path)
+        self._write_plan(hosts)
+
+    def _load_hosts(self):
+        """Return DataFrame of name, ip, group and size of hosts"""
+        report = read_report(self.report_file)
+
+        def get_column(fields, required=True):
+            return get_report_column(report, self.mapping, fields, required)
+
+        hosts = pd.DataFrame({
+            "name": get_column(NAME_FIELDS),
+            "ip": get_column(IP_FIELDS, required=False),
+            "esxi": get_column(ESXI_FIELDS, required=False),
+            "size": pd.to_numeric(get_column(SIZE_FIELDS),
+                                  errors="coerce").fillna(0)
+        })
+        hosts["group"] = self._get_groups(hosts)
+        return hosts
+
+    def _get_groups(self, hosts):
+        """Return group of each host, hosts in no group are alone"""
+        groups = pd.Series([None] * len(hosts), index=hosts.index,
+                           dtype=object)
+        if self.group_by != GROUP_BY_NONE:
+            groups = hosts["ip"].map(_get_subnet)
+        if self.group_by == GROUP_BY_ESXI:
+            groups = hosts["esxi"].where(hosts["esxi"].notna(), groups)
+
+        alone = groups.isna()
+        groups[alone] = ["host-%s" % i for i in np.flatnonzero(alone)]
+        return groups
+
+    def _get_hours(self, sizes):
+        """Return hours to send sizes in MB with the whole bandwidth"""
+        return np.round(sizes * MB / (self.bandwidth * transfer.MBIT) /
+                        transfer.HOUR, 2)
+
+    def _write_plan(self, hosts):
+        hosts = hosts.sort_values(["wave", "group", "size"],
+                                  ascending=[True, True, False])
+        waves = hosts.groupby("wave")["size"].agg(["count", "sum"])
+        waves["hours"] = self._get_hours(waves["sum"])
+
+        writer = writers.get_writer(self.plan_path, PLAN_COLUMNS)
+        writer.open()
+        try:
+            writer.write_rows(zip(
+                hosts["wave"].tolist(), hosts["name"].tolist(),
+                hosts["ip"].tolist(), hosts["group"].tolist(),
+                np.round(hosts["size"], 2).tolist(),
+                hosts["hours"].tolist()))
+            writer.write_sheet(WAVES_SHEET, WAVES_COLUMNS, zip(
+                waves.index.tolist(), waves["count"].tolist(),
+                np.round(waves["sum"], 2).tolist(),
+                waves["hours"].tolist(),
+                (waves["hours"] > self.window).tolist()))
+        finally:
+            writer.close()
+
+        logging.info("Planned %s hosts in %s waves" % (len(hosts),
+                                                       len(waves)))
+
+
+def pack_waves(sizes, groups, capacity, max_hosts):
+    """Return index of wave of each host
+
+    Groups are packed with first fit decreasing, a group larger than
+    a wave is split into parts filling whole waves, and a host larger
+    than a wave has a wave of its own.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    if not len(sizes):
+        return np.zeros(0, dtype=int)
+
+    codes, _ = pd.factorize(groups)
+    order = np.argsort(codes, kind="stable")
+    members = np.split(order, np.cumsum(np.bincount(codes))[:-1])
+
+    # Items to pack, each item is indices of hosts in the same wave
+    items = []
+    for indices in members:
+        if len(indices) <= max_hosts and \
+                sizes[indices].sum() <= capacity:
+            items.append(indices)
+        else:
+            items.extend(_split_group(indices, sizes, capacity,
+                                      max_hosts))
+    item_sizes = np.array([sizes[i].sum() for i in items])
+
+    waves = np.zeros(len(sizes), dtype=int)
+    # NOTE: Count of waves is never larger than count of items,
+    # fit waves of each item are found in arrays at once
+    remaining = np.zeros(len(items))
+    counts = np.zeros(len(items), dtype=int)
+    count = 0
+    for i in np.argsort(-item_sizes, kind="stable"):
+        indices = items[i]
+        fits = np.flatnonzero(
+            (remaining[:count] >= item_sizes[i]) &
+            (counts[:count] + len(indices) <= max_hosts))
+        if len(fits):
+            wave = fits[0]
+        else:
+            wave = count
+            remaining[wave] = capacity
+            count += 1
+        remaining[wave] -= item_sizes[i]
+        counts[wave] += len(indices)
+        waves[indices] = wave
+
+    return waves
+
+
+def _split_group(indices, sizes, capacity, max_hosts):
+    """Split hosts of group into parts fit in waves, larger first"""
+    parts = []
+    part = []
+    part_size = 0
+    for index in indices[np.argsort(-sizes[indices], kind="stable")]:
+        if part and (part_size + sizes[index] > capacity or
+                     len(part) >= max_hosts):
+            parts.append(np.array(part))
+            part = []
+            part_size = 0
+        part.append(index)
+        part_size += sizes[index]
+
+    if part:
+        parts.append(np.array(part))
+    return parts
+
+
+def read_report(report_file):
+    """Return DataFrame of report file generated by prophet-cli report"""
+    if not os.path.exists(report_file):
+        raise FileNotFoundError("Report file %s is not found." % report_file)
+
+    if os.path.splitext(report_file)[1].lower() == \
+            writers.XlsxWriter.extension:
+        return pd.read_excel(report_file, sheet_name=0)
+    return pd.read_csv(report_file, encoding="utf-8-sig")
+
+
+def get_report_column(report, mapping, fields, required=True):
+    """Return column of the first field found in report, None if empty
+
+    Columns are found by column names of fields in mapping of report,
+    ValueError is raised if none of fields is found and it's required.
+    """
+    paths = dict(mapping.columns)
+    for field in fields:
+        if paths.get(field) in report.columns:
+            column = report[paths[field]].astype(object)
+            return column.where(column.notna(), None)
+
+    if required:
+        raise ValueError("None of %s is in report with mapping %s" % (
+            ", ".join(fields), mapping.name))
+    return pd.Series([None] * len(report), index=report.index)
+
+
+def _get_subnet(ip):
+    """Return subnet of IP, None if it's not a valid IP"""
+    try:
+        return str(ipaddress.ip_network("%s/%s" % (ip, SUBNET_PREFIX),
+                                        strict=False))
+    except ValueError:
+        return None
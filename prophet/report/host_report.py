@@ -13,121 +13,403 @@
 
 """Host report generation class"""
 
-import glob
+import collections
+from concurrent import futures
 import logging
-import shutil
-import tempfile
 import os
-import yaml
 import zipfile
 
+import numpy as np
 import pandas as pd
-from stevedore import driver
+
+from prophet import drivers
+from prophet import manifest
+from prophet.report import mapping as report_mapping
+from prophet.report.parse_cache import CACHE_DIR
+from prophet.report.parse_cache import ParseCache
+from prophet.report import transfer
+from prophet.report import writers
 
 HOST_PARSER_NAMESPACE = "host_parser"
 
+# Default count of processes to parse files
+DEFAULT_JOBS = 1
+
+# Count of files pending for each process
+JOB_CHUNK_SIZE = 16
+
+# Count of hosts converted and written to report at once
+ROW_CHUNK_SIZE = 1000
+
 # Size define
 MB = 1024 * 1024
 
-# TODO(Ray): This should be placed in seperate config files that we can
-# generate different report based on mapping
-MAPPING = (
-    ("basic.host_type", "平台类型"),
-    ("basic.hostname", "主机名"),
-    ("basic.vm_name", "VMware主机名"),
-    ("basic.conn_ip", "IP"),
-    ("basic.conn_mac", "Mac"),
-    ("os.os", "操作系统类型"),
-    ("os.os_version", "操作系统版本"),
-    ("os.os_bit", "操作系统位数"),
-    ("os.os_kernel", "操作系统内核版本"),
-    ("disks.boot_type", "启动方式"),
-    ("cpu.cpu_info", "CPU"),
-    ("cpu.cpu_cores", "CPU核数"),
-    ("memory.memory_info", "内存"),
-    ("memory.total_mem", "总内存(GB)"),
-    ("memory.free_mem", "剩余内存(GB)"),
-    ("disks.count", "磁盘数量"),
-    ("disks.total_size", "磁盘总容量(GB)"),
-    ("disks.disks", "磁盘信息"),
-    ("disks.partitions", "分区信息"),
-    ("networks.count", "网卡数量"),
-    ("networks.nics", "网卡信息"),
-    ("vt.vt_platform", "虚拟化类型"),
-    ("vt.vt_platform_ver", "虚拟化版本"),
-    ("vt.vt_esxi", "ESXi服务器"),
-    ("vt.vt_cbt", "是否支持CBT")
-)
-
 # When generate report, all these fields value will converted to GB
-SIZE_FIELDS = ["total_mem", "free_mem", "total_size", "size"]
+SIZE_FIELDS = ["total_mem", "free_mem", "total_size", "size",
+               "used_size", "transfer_size", "change_size"]
+
+
+def compile_mapping(mapping):
+    """Return accessor of each column in mapping and if it's size"""
+    return [_compile_accessor(path) for path, _ in mapping.columns]
+
+
+def _compile_accessor(path):
+    """Return function to get column of dotted path from host values
+
+    Columns of parent keys are shared by fields in the same section,
+    e.g. "basic" of all hosts is got once for all "basic.*" fields.
+    Columns estimated from host values, e.g. "transfer.*", are added
+    to parents beforehand. Sizes at the end of path are returned as
+    they are, they are converted for the whole column when report is
+    generated.
+    """
+    keys = tuple(path.split("."))
+    size_column = keys[-1] in SIZE_FIELDS
+    prefixes = [keys[:i + 1] for i in range(len(keys))]
+
+    def accessor(results, parents):
+        column = results
+        for prefix in prefixes:
+            if prefix not in parents:
+                parents[prefix] = _get_items(column, prefix[-1])
+            column = parents[prefix]
+        return column
+
+    return accessor, size_column
+
+
+def _get_items(column, key):
+    """Return value of key in each item of column
+
+    Items which are not dict, e.g. empty values and formatted lists,
+    are kept as they are, empty lists are not formatted either.
+    """
+    column = [d.get(key, None) if isinstance(d, dict) else d
+              for d in column]
+    return [_format_output_list(d) if d and isinstance(d, list) else d
+            for d in column]
+
+
+def _format_output_list(data):
+    """Format list type with | seperate in report"""
+    ret_lines = []
+    for d in data:
+        lines = []
+        for key, value in d.items():
+            if key in SIZE_FIELDS:
+                value = _convert_size(value)
+            lines.append(str(value))
+        ret_lines.append("|".join(lines))
+
+    return "\n".join(ret_lines)
 
-# default report name
-REPORT_NAME = "analysis_report.csv"
+
+def _convert_size(value, unit=MB):
+    return '{0:.2f}'.format(value / unit)
+
+
+def _to_array(values):
+    """Return object array of values, types are kept as they are"""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _convert_size_column(array, unit=MB):
+    """Convert all sizes in column at once, empty values are kept
+
+    Zero sizes are converted as other sizes, so all values in column
+    have the same format.
+    """
+    sizes = pd.to_numeric(pd.Series(array), errors="coerce").to_numpy(
+            dtype=float)
+    converted = ~np.isnan(sizes)
+    array[converted] = np.char.mod("%.2f", sizes[converted] / unit)
+    return array
+
+
+class ReferenceLoader(object):
+    """Load files referred by host files in the same package
+
+    Same file may be referred by many hosts, e.g. ESXi file is referred
+    by all VMs in this ESXi, so loaded content is cached.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._cache = {}
+
+        # Paths loaded since last reset, saved with parsed results
+        self.referred = set()
+
+    def load(self, path):
+        """Return content of file, path is relative to package"""
+        self.referred.add(path)
+        if path not in self._cache:
+            logging.info("Loading referred file %s..." % path)
+            self._cache[path] = self.reader.load(path)
+
+        return self._cache[path]
 
 
 class HostReporter(object):
 
-    def __init__(self, package_file, output_path, clean, report_name=REPORT_NAME):
+    def __init__(self, package_file, output_path, clean=False,
+                 report_name=None, jobs=DEFAULT_JOBS,
+                 cache=True, clear_cache=False, mappings=None,
+                 transfer_config=None):
         self.package_file = package_file
         self.output_path = output_path
+        # NOTE: Package is read without extraction, no temp dir
+        # needs to be cleaned any more, only kept for compatibility
         self.clean = clean
+        # NOTE: Report name is only used when there is only one
+        # mapping, otherwise each report uses name in its mapping
         self.report_name = report_name
+        self.jobs = int(jobs or DEFAULT_JOBS)
+
+        # Parsed results of unchanged files are reused from cache
+        self.cache = cache
+        self.clear_cache = clear_cache
 
-        # Report lines
-        self._report_lines = []
+        # Mapping profiles, one report is generated for each of them
+        self.mappings = [
+            m if isinstance(m, report_mapping.Mapping)
+            else report_mapping.load_mapping(m)
+            for m in mappings or [report_mapping.DEFAULT_MAPPING]]
 
-        # Tmp dir to unzip files
-        self.work_path = tempfile.mktemp()
+        # Config of transfer estimation, used if any mapping has
+        # estimated columns
+        self.transfer_config = transfer_config
+
+        # Reader of package and loader for files referred by host files
+        self._reader = None
+        self._loader = None
+
+    def get_report_path(self, mapping):
+        report_name = mapping.report_name
+        if self.report_name and len(self.mappings) == 1:
+            report_name = self.report_name
+        return os.path.join(self.output_path, report_name)
 
     @property
-    def report_path(self):
-        return os.path.join(self.output_path, self.report_name)
+    def cache_path(self):
+        return os.path.join(self.output_path, CACHE_DIR)
 
     def analysis(self):
         logging.info("Precheck for packages...")
         self._precheck()
 
-        logging.info("Uncompress package file to analysis")
-        self._unzip()
-
-        yaml_files = glob.glob("%s/**/*.yaml" % self.work_path)
-        for yaml_file in yaml_files:
-            logging.info("Parsing yaml file %s..." % yaml_file)
-            # In yaml, root key is the filename without extension
-            root_key = os.path.splitext(
-                    os.path.basename(yaml_file))[0]
-            with open(yaml_file, "r") as yf:
-                content = yaml.safe_load(yf.read())
-
-                for root_key, infos in content.items():
-                    os_type = None
-                    if "os_type" in infos:
-                        os_type = infos["os_type"]
-                        payload = infos["results"]
-                        logging.info("Load host parser driver %s" % os_type)
-                        driver_manager = driver.DriverManager(
-                            namespace=HOST_PARSER_NAMESPACE,
-                            name=os_type,
-                            invoke_on_load=False
-                        )
-                        try:
-                            parser = driver_manager.driver(payload)
-                            values = parser.parse()
-                            self._generate_report_lines(values)
-                        except Exception as e:
-                            logging.warning("Skip to parse %s, "
-                                            "due to:" % yaml_file)
-                            logging.exception(e)
-                    else:
-                        logging.info("Skip to parser %s" % yaml_file)
-                        continue
-
-        logging.info("Generating report in %s..." % self.report_path)
-        self._generate_report()
-
-        if self.clean:
-            self._clean()
+        # NOTE: Parser drivers are resolved once before files are
+        # parsed, worker processes inherit them
+        drivers.prewarm(HOST_PARSER_NAMESPACE)
+
+        # Package reader, parse cache and writers are closed even if
+        # analysis fails
+        outputs = []
+        parse_cache = None
+        try:
+            # NOTE: Result files are read from package one by one
+            # without extraction, format of each file is detected by
+            # extension, so packages with mixed formats can be analyzed
+            result_files = self._reader.host_files()
+            parse_cache = self._open_cache()
+
+            # NOTE: Rows are written to reports once a chunk of
+            # hosts is parsed, so memory doesn't grow with count of
+            # hosts, and package is parsed once for all reports
+            estimator = self._open_estimator()
+            for mapping in self.mappings:
+                report_path = self.get_report_path(mapping)
+                logging.info("Generating report %s in %s..." % (
+                    mapping.name, report_path))
+                writer = writers.get_writer(report_path,
+                                            mapping.column_names)
+                writer.open()
+                # NOTE: Mapping is compiled once, values of report
+                # are got column by column for each chunk of hosts
+                outputs.append((writer, compile_mapping(mapping)))
+
+            results = []
+            for file_results in self._iter_results(result_files,
+                                                   parse_cache):
+                results.extend(file_results)
+                if len(results) >= ROW_CHUNK_SIZE:
+                    self._write_rows(outputs, results, estimator)
+                    results = []
+            self._write_rows(outputs, results, estimator)
+
+            if estimator:
+                self._write_transfer_summary(outputs, estimator)
+        finally:
+            for writer, _ in outputs:
+                writer.close()
+            if parse_cache:
+                parse_cache.close()
+            self._reader.close()
+
+    def _open_estimator(self):
+        if not any(m.uses(transfer.SECTION) for m in self.mappings):
+            return None
+
+        logging.info("Estimating transfer time with config %s..." % (
+            self.transfer_config or "defaults"))
+        return transfer.load_estimator(self.transfer_config)
+
+    def _write_transfer_summary(self, outputs, estimator):
+        summary = estimator.summary()
+        for mapping, (writer, _) in zip(self.mappings, outputs):
+            if mapping.uses(transfer.SECTION):
+                writer.write_sheet(transfer.SUMMARY_SHEET,
+                                   transfer.SUMMARY_COLUMNS, summary)
+
+    def _open_cache(self):
+        if not self.cache:
+            return None
+
+        parse_cache = ParseCache(self.cache_path)
+        if self.clear_cache:
+            parse_cache.clear()
+        return parse_cache
+
+    def _get_refs(self, referred):
+        """Return CRC and size of referred files"""
+        return dict((path, list(self._reader.get_crc(path)))
+                    for path in referred)
+
+    def _get_cached_results(self, parse_cache, result_file):
+        """Return cached results, None if file or referred file changed"""
+        if not parse_cache:
+            return None
+
+        cached = parse_cache.get(result_file,
+                                 *self._reader.get_crc(result_file))
+        if not cached:
+            return None
+
+        refs, results = cached
+        try:
+            if self._get_refs(refs) != refs:
+                return None
+        except KeyError:
+            # Referred file is not in package any more
+            return None
+
+        logging.info("Use cached results of %s" % result_file)
+        return results
+
+
+    def _iter_results(self, result_files, parse_cache):
+        """Yield results of each file in the same order of files
+
+        Cached results are used if file is not changed, other files are
+        parsed in this process or process pool. At most JOB_CHUNK_SIZE
+        files are pending for each process.
+        """
+        executor = None
+        window = 0
+        if self.jobs > 1:
+            logging.info("Parsing files in %s processes..." % self.jobs)
+            executor = futures.ProcessPoolExecutor(max_workers=self.jobs)
+            window = self.jobs * JOB_CHUNK_SIZE
+
+        pending = collections.deque()
+        try:
+            for result_file in result_files:
+                results = self._get_cached_results(parse_cache,
+                                                   result_file)
+                parsed = None
+                if results is None and executor:
+                    parsed = executor.submit(_parse_file_in_worker,
+                                             self.package_file, result_file)
+                elif results is None:
+                    parsed = self._parse_file(result_file)
+                pending.append((result_file, results, parsed))
+
+                while len(pending) > window:
+                    yield self._get_results(parse_cache,
+                                            *pending.popleft())
+
+            while pending:
+                yield self._get_results(parse_cache, *pending.popleft())
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def _get_results(self, parse_cache, result_file, results, parsed):
+        """Return cached or parsed results, parsed results are cached"""
+        if results is not None:
+            return results
+
+        if isinstance(parsed, futures.Future):
+            parsed = parsed.result()
+        results, referred, complete = parsed
+
+        # NOTE: Files with errors are not cached, so errors
+        # are logged again in next run
+        if parse_cache and complete:
+            parse_cache.put(result_file, *self._reader.get_crc(result_file),
+                            refs=self._get_refs(referred),
+                            results=results)
+        return results
+
+    def _parse_file(self, result_file):
+        """Return parsed values of hosts in result file
+
+        Return a tuple of values list, paths of referred files and if
+        all hosts are parsed. Errors are logged and skipped, so other
+        files are not affected.
+        """
+        logging.info("Parsing result file %s..." % result_file)
+        if not self._verify(result_file):
+            return [], [], False
+
+        try:
+            content = self._reader.load(result_file)
+        except Exception as e:
+            logging.warning("Skip to load %s, due to:" % result_file)
+            logging.exception(e)
+            return [], [], False
+
+        self._loader.referred = set()
+        results = []
+        complete = True
+        for root_key, infos in content.items():
+            os_type = None
+            if "os_type" in infos:
+                os_type = infos["os_type"]
+                payload = infos["results"]
+                logging.debug("Use host parser driver %s" % os_type)
+                try:
+                    parser_driver = drivers.get_driver(
+                            HOST_PARSER_NAMESPACE, os_type)
+                    parser = parser_driver(payload, loader=self._loader)
+                    results.append(parser.parse())
+                except Exception as e:
+                    logging.warning("Skip to parse %s, "
+                                    "due to:" % result_file)
+                    logging.exception(e)
+                    complete = False
+            else:
+                logging.info("Skip to parser %s" % result_file)
+                continue
+
+        return results, sorted(self._loader.referred), complete
+
+    def _verify(self, result_file):
+        """Return False if checksum of file doesn't match manifest"""
+        try:
+            if self._reader.verify(result_file):
+                return True
+        except ValueError:
+            # Packages created before manifest have no checksum
+            return True
+
+        logging.error("Skip to parse %s, its checksum doesn't match "
+                      "manifest, the file is corrupt or modified after "
+                      "collection" % result_file)
+        return False
 
     def _precheck(self):
         logging.info("Checking package file %s is exists..."
@@ -139,72 +421,45 @@ class HostReporter(object):
 
         logging.info("Checking package file %s "
                      "is zip format..." % self.package_file)
-        self.zip_package_file = zipfile.ZipFile(self.package_file)
-        if self.zip_package_file.testzip():
+        # NOTE: Each file is verified by CRC when it's read, so
+        # the whole package is not tested here
+        if not zipfile.is_zipfile(self.package_file):
             raise zipfile.BadZipFile("Package file %s is bad zip file."
                                      % self.package_file)
+        self._open_package()
         logging.info("Package file %s is zip format" % self.package_file)
 
-    def _unzip(self):
-        logging.info("Unzipping package file %s into %s..." % (
-            self.package_file, self.work_path))
-        for names in self.zip_package_file.namelist():
-            self.zip_package_file.extract(names, self.work_path)
-        logging.info("Unzip package file %s into %s done." % (
-            self.package_file, self.work_path))
-
-    def _generate_report_lines(self, values):
-        """Generate report"""
-        lines = []
-        for x in MAPPING:
-            field = x[0]
-            lines.append(self._get_value(field, values))
-
-        self._report_lines.append(lines)
-
-    def _get_value(self, path, values):
-        paths = path.split(".")
-
-        data = values
-        for p in paths:
-            data = data.get(p, None)
-
-            # break loop if data is None
-            if not data:
-                break
-
-            if p in SIZE_FIELDS:
-                data = self._convert_size(data)
-
-            if isinstance(data, list):
-                data = self._format_output_list(data)
-                break
-
-        return data
-
-    def _format_output_list(self, data):
-        """Format list type with | seperate in report"""
-        ret_lines = []
-        for d in data:
-            lines = []
-            for key, item in d.items():
-                value = d[key]
-                if key in SIZE_FIELDS:
-                    value = self._convert_size(value)
-                lines.append(str(value))
-            ret_lines.append("|".join(lines))
-
-        return "\n".join(ret_lines)
-
-    def _convert_size(self, value, unit=MB):
-        return '{0:.2f}'.format(value / MB)
-
-    def _generate_report(self):
-        columns = [x[1] for x in MAPPING]
-        dt = pd.DataFrame(self._report_lines, columns=columns)
-        dt.to_csv(self.report_path, encoding="utf-8-sig", index=False)
-
-    def _clean(self):
-        logging.info("Deleting temp dir %s..." % self.work_path)
-        shutil.rmtree(self.work_path)
-        logging.info("Temp dir %s deleted." % self.work_path)
+    def _open_package(self):
+        self._reader = manifest.PackageReader(self.package_file)
+        self._loader = ReferenceLoader(self._reader)
+
+    def _write_rows(self, outputs, results, estimator=None):
+        """Write rows of hosts in results to each report"""
+        # Columns of parent keys are shared by all reports
+        parents = {}
+        if estimator:
+            estimator.estimate(results, parents)
+        for writer, accessors in outputs:
+            columns = []
+            for accessor, size_column in accessors:
+                column = accessor(results, parents)
+                if size_column:
+                    column = _convert_size_column(_to_array(column))
+                columns.append(column)
+
+            writer.write_rows(zip(*columns))
+
+
+# NOTE: Reporter in each worker process opens package by itself
+# on first use, so only file names and report lines are passed between
+# processes
+_worker_reporter = None
+
+
+def _parse_file_in_worker(package_file, result_file):
+    global _worker_reporter
+    if not _worker_reporter or \
+            _worker_reporter.package_file != package_file:
+        _worker_reporter = HostReporter(package_file, None)
+        _worker_reporter._open_package()
+    return _worker_reporter._parse_file(result_file)
@@ -0,0 +1,102 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Mapping profiles of report
+
+Each profile is a yaml file which maps fields of parsed host values to
+columns of a report. Builtin profiles are in prophet/report/mappings,
+other profiles are loaded by file path.
+
+Profile sample:
+
+    name: migration_summary
+    description: Target sizing and source platform of each host
+    report_name: migration_summary.csv
+    columns:
+      - path: basic.hostname
+        name: 主机名
+      - path: memory.total_mem
+        name: 总内存(MB)
+
+Column name is the same as path if it's not given.
+
+"""
+
+import os
+
+from prophet import utils
+
+MAPPINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "mappings")
+MAPPING_EXTENSION = ".yaml"
+
+DEFAULT_MAPPING = "analysis"
+
+
+class Mapping(object):
+
+    def __init__(self, name, columns, report_name=None, description=None):
+        self.name = name
+        # List of field path and column name
+        self.columns = columns
+        self.report_name = report_name or name + ".csv"
+        self.description = description
+
+    @property
+    def column_names(self):
+        return [x[1] for x in self.columns]
+
+    def uses(self, section):
+        """Return True if any column is in section"""
+        return any(path.split(".")[0] == section
+                   for path, _ in self.columns)
+
+
+def available_mappings():
+    """Return names of builtin profiles"""
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(MAPPINGS_DIR)
+                  if f.endswith(MAPPING_EXTENSION))
+
+
+def load_mapping(name):
+    """Load builtin profile by name, or profile file by path
+
+    ValueError is raised if profile is not found or invalid.
+    """
+    path = name
+    if not os.path.exists(path):
+        path = os.path.join(MAPPINGS_DIR, name + MAPPING_EXTENSION)
+    if not os.path.exists(path):
+        raise ValueError("Unknown mapping %s, should be a profile file or "
+                         "one of %s" % (name,
+                                        ", ".join(available_mappings())))
+
+    with open(path, "r", encoding="utf-8") as f:
+        profile = utils.load_yaml(f)
+
+    if not isinstance(profile, dict) or not profile.get("columns"):
+        raise ValueError("No columns in mapping %s" % path)
+
+    columns = []
+    for column in profile["columns"]:
+        if not isinstance(column, dict) or not column.get("path"):
+            raise ValueError("Column %s of mapping %s has no "
+                             "path" % (column, path))
+        columns.append((column["path"], column.get("name") or
+                        column["path"]))
+
+    return Mapping(profile.get("name") or
+                   os.path.splitext(os.path.basename(path))[0],
+                   columns,
+                   report_name=profile.get("report_name"),
+                   description=profile.get("description"))
@@ -0,0 +1,83 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Cache of parsed results for repeated reporting
+
+Parsed values of each file in package are saved in a sqlite database,
+keyed by file name, CRC and size in zip and parser version. Files
+referred while parsing, e.g. ESXi files of VMs, are saved with their
+CRC and size too, cached values are used only if none of them changed.
+
+"""
+
+import json
+import logging
+import os
+import sqlite3
+
+from prophet import utils
+from prophet.parser.hosts.base import PARSER_VERSION
+
+CACHE_DIR = ".prophet_cache"
+CACHE_NAME = "parse_cache.db"
+
+
+class ParseCache(object):
+
+    def __init__(self, cache_path, version=PARSER_VERSION):
+        self.cache_path = cache_path
+        self.version = str(version)
+
+        utils.mkdir_p(cache_path)
+        self._db = sqlite3.connect(os.path.join(cache_path, CACHE_NAME))
+        self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "name TEXT PRIMARY KEY, crc INTEGER, "
+                         "size INTEGER, version TEXT, refs TEXT, "
+                         "results TEXT)")
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, crc, size):
+        """Return referred files and parsed values if file not changed
+
+        Referred files is a dict of path and [crc, size], caller should
+        check them, None is returned if no valid cache.
+        """
+        row = self._db.execute(
+                "SELECT refs, results FROM results WHERE name = ? AND "
+                "crc = ? AND size = ? AND version = ?",
+                (name, crc, size, self.version)).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, name, crc, size, refs, results):
+        self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (name, crc, size, self.version, json.dumps(refs),
+                 json.dumps(utils.to_plain(results))))
+
+    def clear(self):
+        logging.info("Clearing parse cache in %s..." % self.cache_path)
+        self._db.execute("DELETE FROM results")
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+        logging.info("Parse cache hits %s, misses %s" % (
+            self.hits, self.misses))
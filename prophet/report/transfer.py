@@ -0,0 +1,264 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Data transfer time estimation of hosts
+
+Used capacity of each host is the used size of its partitions, or the
+capacity of its disks if no partition is collected, e.g. VMware VMs.
+Data is sent with bandwidth of the site which host IP belongs to, after
+compression and deduplication.
+
+    full sync = used size * ratios / bandwidth
+    incremental sync = change rate * sync interval * ratios / bandwidth
+
+Change rate is measured by CBT, average disk write rate is used if CBT
+is not available. Estimated values are columns of "transfer" section,
+so they can be used in mapping profiles, e.g. transfer.full_sync_hours.
+
+Config sample, bandwidth is in Mbit/s, interval is in hours:
+
+    bandwidth: 100
+    compression_ratio: 0.6
+    dedup_ratio: 0.9
+    sync_interval: 24
+    sites:
+      - name: beijing
+        bandwidth: 1000
+        subnets:
+          - 192.168.10.0/24
+
+"""
+
+import ipaddress
+
+import numpy as np
+
+from prophet import utils
+
+# Section of estimated values in host values
+SECTION = "transfer"
+
+DEFAULT_BANDWIDTH = 100
+DEFAULT_COMPRESSION_RATIO = 1.0
+DEFAULT_DEDUP_RATIO = 1.0
+DEFAULT_SYNC_INTERVAL = 24
+
+# Site of hosts which are not in any configured subnet
+DEFAULT_SITE = "default"
+
+# Size define
+MB = 1024 * 1024
+MBIT = 1000 * 1000 / 8
+HOUR = 3600
+
+SUMMARY_SHEET = "summary"
+SUMMARY_COLUMNS = ["站点", "带宽(Mbps)", "主机数量", "已用容量(MB)",
+                   "传输数据量(MB)", "全量同步时间(小时)", "增量数据量(MB)",
+                   "增量同步时间(小时)"]
+
+
+class Site(object):
+
+    def __init__(self, name, bandwidth, subnets=None):
+        self.name = name
+        self.bandwidth = _get_positive(bandwidth, "bandwidth of site %s"
+                                       % name)
+        self.networks = [ipaddress.ip_network(s, strict=False)
+                         for s in subnets or []]
+
+
+class TransferEstimator(object):
+    """Estimate transfer time of hosts chunk by chunk
+
+    Totals of each site are accumulated, so summary is available after
+    all hosts are estimated. Sites are supposed to use their own links,
+    so total sync time is the time of the slowest site.
+    """
+
+    def __init__(self, bandwidth=DEFAULT_BANDWIDTH,
+                 compression_ratio=DEFAULT_COMPRESSION_RATIO,
+                 dedup_ratio=DEFAULT_DEDUP_RATIO,
+                 sync_interval=DEFAULT_SYNC_INTERVAL, sites=None):
+        self.bandwidth = _get_positive(bandwidth, "bandwidth")
+        self.ratio = _get_positive(compression_ratio, "compression ratio") \
+            * _get_positive(dedup_ratio, "dedup ratio")
+        self.sync_interval = _get_positive(sync_interval, "sync interval")
+        self.sites = [s if isinstance(s, Site) else Site(**s)
+                      for s in sites or []]
+
+        # Bandwidth of each site, hosts in no site use the last one
+        self._bandwidths = np.array(
+            [s.bandwidth for s in self.sites] + [self.bandwidth],
+            dtype=float)
+        count = len(self._bandwidths)
+        self._hosts = np.zeros(count)
+        self._used_sizes = np.zeros(count)
+        self._change_sizes = np.zeros(count)
+
+    def estimate(self, results, columns):
+        """Add estimated columns of hosts in results to columns
+
+        Columns are keyed by tuple of section and field, the same as
+        parent columns of report accessors.
+        """
+        ips = []
+        used_sizes = []
+        change_rates = []
+        for values in results:
+            ips.append((values.get("basic") or {}).get("conn_ip"))
+            used_sizes.append(_get_used_size(values.get("disks") or {}))
+            change_rates.append(_get_change_rate(values.get("perf") or {}))
+
+        sites = self._match_sites(ips)
+        bandwidths = self._bandwidths[sites] * MBIT
+        used_sizes = np.array(used_sizes, dtype=float)
+        transfer_sizes = used_sizes * self.ratio
+        change_sizes = np.array(change_rates, dtype=float) * \
+            self.sync_interval * HOUR * self.ratio
+
+        site_names = [s.name for s in self.sites] + [DEFAULT_SITE]
+        estimated = {
+            "site": [site_names[i] for i in sites],
+            "bandwidth": self._bandwidths[sites].tolist(),
+            "used_size": used_sizes.tolist(),
+            "transfer_size": transfer_sizes.tolist(),
+            "full_sync_hours": np.round(
+                transfer_sizes / bandwidths / HOUR, 2).tolist(),
+            "change_size": change_sizes.tolist(),
+            "incremental_sync_hours": np.round(
+                change_sizes / bandwidths / HOUR, 2).tolist()
+        }
+        for key, column in estimated.items():
+            columns[(SECTION, key)] = column
+
+        count = len(self._bandwidths)
+        self._hosts += np.bincount(sites, minlength=count)
+        self._used_sizes += np.bincount(sites, weights=used_sizes,
+                                        minlength=count)
+        self._change_sizes += np.bincount(sites, weights=change_sizes,
+                                          minlength=count)
+
+    def summary(self):
+        """Return summary rows of each site and total"""
+        site_names = [s.name for s in self.sites] + [DEFAULT_SITE]
+        transfer_sizes = self._used_sizes * self.ratio
+        full_hours = transfer_sizes / (self._bandwidths * MBIT) / HOUR
+        incremental_hours = self._change_sizes / \
+            (self._bandwidths * MBIT) / HOUR
+
+        rows = []
+        for i, name in enumerate(site_names):
+            if not self._hosts[i]:
+                continue
+            rows.append([name, float(self._bandwidths[i]),
+                         int(self._hosts[i]),
+                         _round(self._used_sizes[i] / MB),
+                         _round(transfer_sizes[i] / MB),
+                         _round(full_hours[i]),
+                         _round(self._change_sizes[i] / MB),
+                         _round(incremental_hours[i])])
+
+        rows.append(["总计", None, int(self._hosts.sum()),
+                     _round(self._used_sizes.sum() / MB),
+                     _round(transfer_sizes.sum() / MB),
+                     _round(full_hours.max()),
+                     _round(self._change_sizes.sum() / MB),
+                     _round(incremental_hours.max())])
+        return rows
+
+    def _match_sites(self, ips):
+        """Return index of site of each IP, hosts in no site use last"""
+        default = len(self.sites)
+        sites = np.full(len(ips), default, dtype=int)
+
+        addresses = np.zeros(len(ips), dtype=np.uint32)
+        is_ipv4 = np.zeros(len(ips), dtype=bool)
+        for i, ip in enumerate(ips):
+            try:
+                address = ipaddress.ip_address(ip)
+            except ValueError:
+                continue
+
+            if address.version == 4:
+                addresses[i] = int(address)
+                is_ipv4[i] = True
+                continue
+
+            # NOTE: IPv6 addresses are rare, match them one by one
+            for index, site in enumerate(self.sites):
+                if any(address in n for n in site.networks):
+                    sites[i] = index
+                    break
+
+        # NOTE: Sites are matched in reverse order, so the first
+        # site wins if subnets of sites are overlapped
+        for index in reversed(range(len(self.sites))):
+            for network in self.sites[index].networks:
+                if network.version != 4:
+                    continue
+                matched = is_ipv4 & (
+                    (addresses & np.uint32(int(network.netmask))) ==
+                    np.uint32(int(network.network_address)))
+                sites[matched] = index
+
+        return sites
+
+
+def load_estimator(config_file=None):
+    """Return estimator of config file, defaults are used if not given
+
+    ValueError is raised if config is invalid.
+    """
+    if not config_file:
+        return TransferEstimator()
+
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = utils.load_yaml(f) or {}
+
+    if not isinstance(config, dict):
+        raise ValueError("Invalid transfer config %s" % config_file)
+
+    try:
+        return TransferEstimator(**config)
+    except TypeError as e:
+        raise ValueError("Invalid transfer config %s, due to: %s" % (
+            config_file, e))
+
+
+def _get_positive(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value <= 0:
+        raise ValueError("%s should be a positive number" %
+                         name.capitalize())
+    return value
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def _get_used_size(disks):
+    """Return used size of partitions, or capacity of disks"""
+    used_size = 0
+    for partition in disks.get("partitions") or []:
+        used_size += (partition.get("size_total") or 0) - \
+            (partition.get("size_available") or 0)
+    return used_size or disks.get("total_size") or 0
+
+
+def _get_change_rate(perf):
+    """Return change rate by CBT, or average disk write rate"""
+    return perf.get("change_rate") or perf.get("avg_disk_write_rate") or 0
@@ -0,0 +1,148 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Streaming writers of report
+
+Rows are written as soon as they are generated, so memory doesn't grow
+with count of hosts. Writer is selected by extension of report name.
+
+"""
+
+import csv
+import os
+
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+DEFAULT_SHEET = "report"
+
+
+class ReportWriter(object):
+    """Base class of report writer"""
+
+    # Extension of report file, including dot
+    extension = None
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+
+    def open(self):
+        raise NotImplementedError
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def write_sheet(self, name, columns, rows):
+        """Write extra sheet of report, e.g. summary"""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class CsvWriter(ReportWriter):
+    """Write report as csv, rows are flushed after each write"""
+
+    extension = ".csv"
+
+    def __init__(self, path, columns):
+        super(CsvWriter, self).__init__(path, columns)
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        # NOTE: BOM is written so Excel detects utf-8 encoding
+        self._file = open(self.path, "w", newline="",
+                          encoding="utf-8-sig")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(self.columns)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def write_sheet(self, name, columns, rows):
+        """Write sheet to <report>_<name>.csv"""
+        base, extension = os.path.splitext(self.path)
+        writer = CsvWriter("%s_%s%s" % (base, name, extension), columns)
+        writer.open()
+        try:
+            writer.write_rows(rows)
+        finally:
+            writer.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class XlsxWriter(ReportWriter):
+    """Write report as xlsx in write only mode
+
+    Rows are not kept in memory by openpyxl, but the file is only
+    readable after it's closed.
+    """
+
+    extension = ".xlsx"
+
+    def __init__(self, path, columns, sheet_name=DEFAULT_SHEET):
+        super(XlsxWriter, self).__init__(path, columns)
+        self.sheet_name = sheet_name
+        self._workbook = None
+        self._sheet = None
+
+    def open(self):
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(self.sheet_name)
+        self._sheet.append(self.columns)
+
+    def write_rows(self, rows):
+        _append_rows(self._sheet, rows)
+
+    def write_sheet(self, name, columns, rows):
+        sheet = self._workbook.create_sheet(name)
+        sheet.append(columns)
+        _append_rows(sheet, rows)
+
+    def close(self):
+        if self._workbook:
+            self._workbook.save(self.path)
+
+
+WRITERS = dict((w.extension, w) for w in [CsvWriter, XlsxWriter])
+
+
+def get_writer(path, columns):
+    """Return writer of report by extension
+
+    ValueError is raised if extension is not supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError("Unknown report type %s, should be one of "
+                         "%s" % (path, ", ".join(sorted(WRITERS))))
+
+    return WRITERS[extension](path, columns)
+
+
+def _append_rows(sheet, rows):
+    for row in rows:
+        sheet.append([_to_cell_value(v) for v in row])
+
+
+def _to_cell_value(value):
+    """Return value which can be saved in xlsx cell"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return ILLEGAL_CHARACTERS_RE.sub("", str(value))
@@ -0,0 +1,258 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of incremental collection of VMware collector"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pyVmomi import vim
+
+from prophet.collector import vmware_session
+from prophet.collector.hosts import vmware
+from prophet.collector.hosts.vmware import VMwareCollector
+
+ESXI_INFO = {"esxi_info": {}, "datastore": {}, "network": {}}
+
+
+class FakePropertyCollector(object):
+    """Property collector returning properties of known objects"""
+
+    def __init__(self, stub):
+        self._stub = stub
+        self.objects = {}
+
+    def add(self, obj, props):
+        self.objects[obj._moId] = (obj, props)
+
+    def RetrievePropertiesEx(self, spec_set, options):
+        spec = spec_set[0]
+        prop_spec = spec.propSet[0]
+        if spec.objectSet[0].skip:
+            # Objects in container view
+            objs = [obj for obj, _ in self.objects.values()
+                    if isinstance(obj, prop_spec.type)]
+        else:
+            objs = [self.objects[s.obj._moId][0] for s in spec.objectSet
+                    if s.obj._moId in self.objects]
+
+        contents = []
+        for obj in objs:
+            props = self.objects[obj._moId][1]
+            contents.append(SimpleNamespace(
+                obj=obj, missingSet=[],
+                propSet=[SimpleNamespace(name=path, val=props[path])
+                         for path in prop_spec.pathSet if path in props]))
+        return SimpleNamespace(objects=contents, token=None)
+
+
+class VMwareCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_path)
+        self.state_path = os.path.join(self.output_path, "state")
+
+        self.stub = mock.Mock(poolSize=1)
+        self.property_collector = FakePropertyCollector(self.stub)
+        self.esxi = vim.HostSystem("host-1", self.stub)
+        self.set_esxi(name="esxi-1")
+        for i in range(3):
+            self.set_vm(i)
+
+        content = mock.Mock(propertyCollector=self.property_collector)
+        content.about.name = "VMware vCenter Server"
+        content.viewManager.CreateContainerView.return_value = \
+            vim.view.ContainerView("view-1", self.stub)
+        service_instance = mock.Mock(_stub=self.stub)
+        service_instance.RetrieveContent.return_value = content
+
+        for patcher in (
+                mock.patch.object(vmware.session_manager, "connect",
+                                  return_value=service_instance),
+                mock.patch.object(VMwareCollector, "_check_connect"),
+                mock.patch.object(VMwareCollector, "_get_vcenter_info"),
+                mock.patch.object(VMwareCollector, "_get_one_esxi_info",
+                                  return_value=ESXI_INFO)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def set_esxi(self, **props):
+        esxi_props = {"parent": None,
+                      "summary.config.product.build": "17325551",
+                      "datastore": [],
+                      "network": []}
+        esxi_props.update(props)
+        self.property_collector.add(self.esxi, esxi_props)
+
+    def set_vm(self, i, **props):
+        vm_props = {"config.name": "vm%s" % i,
+                    "config.instanceUuid": "uuid-%s" % i,
+                    "config.changeVersion": "1",
+                    "runtime.host": self.esxi,
+                    "runtime.powerState": "poweredOn",
+                    "summary.guest.ipAddress": "10.0.0.%s" % i}
+        vm_props.update(props)
+        self.property_collector.add(
+            vim.VirtualMachine("vm-%s" % i, self.stub), vm_props)
+
+    def collect(self, vm_filters=None, cbt=False):
+        collector = VMwareCollector(
+                "192.168.10.1", "administrator", "password", 443, None,
+                self.output_path, "VMWARE", incremental=True,
+                state_path=self.state_path, vm_filters=vm_filters,
+                vmware_cbt=cbt)
+        collector._vc_info[collector.ip] = {}
+        collector.collect()
+        return collector
+
+    def get_vm_files(self):
+        return sorted(f for f in os.listdir(
+            os.path.join(self.output_path, "VMWARE"))
+            if f.startswith("vm"))
+
+    def test_full_collection_saves_digests(self):
+        collector = self.collect()
+
+        self.assertEqual(["vm0", "vm1", "vm2"], sorted(collector.success_vms))
+        with open(collector.state_file) as state_file:
+            state = json.load(state_file)
+        self.assertEqual(["vm-0", "vm-1", "vm-2"],
+                         sorted(state["vm_digests"]))
+        self.assertEqual(["host-1"], list(state["esxi_digests"]))
+        # Only state is saved, no session is kept for next run
+        self.assertEqual([os.path.basename(collector.state_file)],
+                         os.listdir(self.state_path))
+
+    def test_unchanged_collects_nothing(self):
+        self.collect()
+        collector = self.collect()
+
+        self.assertEqual([], collector.success_vms)
+        self.assertEqual([], collector.success_esxis)
+        self.assertEqual(["vm0_vmware.yaml", "vm1_vmware.yaml",
+                          "vm2_vmware.yaml"], self.get_vm_files())
+
+    def test_cbt_snapshot_is_not_changed(self):
+        self.set_vm(0, **{"config.changeTrackingEnabled": True})
+        self.set_vm(1, **{"config.changeTrackingEnabled": True})
+
+        def create_snapshots(vms_props):
+            # Temporary snapshot changes config of VM
+            for vm, _ in vms_props:
+                props = self.property_collector.objects[vm._moId][1]
+                props["config.changeVersion"] = str(
+                    int(props["config.changeVersion"]) + 1)
+            return {}
+
+        with mock.patch.object(vmware.vmware_cbt.ChangeRateCollector,
+                               "collect",
+                               side_effect=create_snapshots) as collect:
+            self.collect(cbt=True)
+            collector = self.collect(cbt=True)
+
+        self.assertEqual(1, collect.call_count)
+        self.assertEqual(["vm-0", "vm-1"], sorted(
+            vm._moId for vm, _ in collect.call_args[0][0]))
+        self.assertEqual([], collector.success_vms)
+
+    def test_changed_new_and_deleted_vms(self):
+        self.collect()
+        self.set_vm(1, **{"config.name": "vm1-renamed",
+                          "config.changeVersion": "2"})
+        self.set_vm(3)
+        self.property_collector.objects.pop("vm-2")
+        collector = self.collect()
+
+        self.assertEqual(["vm1-renamed", "vm3"],
+                         sorted(collector.success_vms))
+        self.assertEqual(["vm0_vmware.yaml", "vm1-renamed_vmware.yaml",
+                          "vm3_vmware.yaml"], self.get_vm_files())
+
+    def test_powered_off_vm_is_changed(self):
+        self.collect()
+        self.set_vm(0, **{"runtime.powerState": "poweredOff"})
+        collector = self.collect()
+
+        self.assertEqual(["vm0"], collector.success_vms)
+
+    def test_name_filter(self):
+        collector = self.collect(["name=^vm[01]$", "name=^vm9"])
+
+        self.assertEqual(["vm0", "vm1"], sorted(collector.success_vms))
+
+    def test_renamed_esxi_collects_its_vms(self):
+        self.collect()
+        self.set_esxi(name="esxi-2")
+        collector = self.collect()
+
+        self.assertEqual(["esxi-2"], collector.success_esxis)
+        self.assertEqual(["vm0", "vm1", "vm2"], sorted(collector.success_vms))
+
+    def test_changed_filters_run_full_collection(self):
+        self.collect()
+        self.set_vm(2, **{"runtime.powerState": "poweredOff"})
+        collector = self.collect(["power_state=poweredOn"])
+
+        self.assertEqual(["vm0", "vm1"], sorted(collector.success_vms))
+        self.assertEqual(["vm0_vmware.yaml", "vm1_vmware.yaml"],
+                         self.get_vm_files())
+
+
+class ParseVMFiltersTest(unittest.TestCase):
+
+    def test_parse_vm_filters(self):
+        self.assertEqual(
+            {"cluster": ["prod"], "name": ["^web", "^db"]},
+            vmware.parse_vm_filters(["cluster=prod", "name=^web",
+                                     "name = ^db"]))
+
+    def test_invalid_key(self):
+        self.assertRaises(ValueError, vmware.parse_vm_filters,
+                          ["host=esxi-1"])
+        self.assertRaises(ValueError, vmware.parse_vm_filters,
+                          ["cluster"])
+
+    def test_tag_is_rejected(self):
+        self.assertRaisesRegex(ValueError, "tag is not supported",
+                               vmware.parse_vm_filters, ["tag=prod"])
+
+    def test_invalid_name_regex(self):
+        self.assertRaisesRegex(ValueError, "not a valid regex",
+                               vmware.parse_vm_filters, ["name=web[0-9"])
+
+
+class SessionManagerTest(unittest.TestCase):
+
+    @mock.patch.object(vmware_session.connect, "Disconnect")
+    @mock.patch.object(vmware_session.connect, "SmartConnectNoSSL",
+                       create=True)
+    def test_disconnect_all_logout_sessions(self, smart_connect,
+                                            disconnect):
+        manager = vmware_session.SessionManager()
+        service_instance = manager.connect("192.168.10.1", 443,
+                                           "administrator", "password")
+        manager.connect("192.168.10.2", 443, "administrator", "password")
+
+        # Alive session is reused in the same process
+        self.assertIs(service_instance, manager.connect(
+            "192.168.10.1", 443, "administrator", "password"))
+        self.assertEqual(2, smart_connect.call_count)
+
+        manager.disconnect_all()
+        self.assertEqual(2, disconnect.call_count)
@@ -0,0 +1,60 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of performance statistics of VMware VMs"""
+
+import unittest
+
+from prophet.parser.hosts.vmware import VMwareParser
+
+
+def parse_perf(perf_stats=None, change_rates=None):
+    payload = {"vm": {"esxi_host": {"192.168.10.1": {"esxi_info": {}}},
+                      "perf_stats": perf_stats,
+                      "change_rates": change_rates}}
+    return VMwareParser(payload).parse_perf()
+
+
+class ParsePerfTest(unittest.TestCase):
+
+    def test_kbps_to_bps(self):
+        perf = parse_perf(perf_stats={
+            "virtualDisk.write.average": {"avg": 10, "p95": 20.5,
+                                          "max": 100},
+            "net.usage.average": {"avg": 1, "max": 0}})
+
+        self.assertEqual(10 * 1024, perf["avg_disk_write_rate"])
+        self.assertEqual(20 * 1024 + 512, perf["p95_disk_write_rate"])
+        self.assertEqual(100 * 1024, perf["peak_disk_write_rate"])
+        self.assertEqual(1024, perf["avg_net_usage_rate"])
+        self.assertEqual(0, perf["peak_net_usage_rate"])
+        self.assertIsNone(perf["change_rate"])
+
+    def test_missing_counters(self):
+        perf = parse_perf(perf_stats={
+            "virtualDisk.write.average": {"avg": 10}})
+
+        self.assertIsNone(perf["peak_disk_write_rate"])
+        self.assertIsNone(perf["avg_net_usage_rate"])
+
+    def test_change_rate_is_bps(self):
+        perf = parse_perf(change_rates={
+            "2000": {"change_rate": 1000},
+            "2001": {"change_rate": 24},
+            "2002": {"change_rate": None}})
+
+        self.assertEqual(1024, perf["change_rate"])
+        self.assertIsNone(perf["avg_disk_write_rate"])
+
+    def test_no_stats(self):
+        self.assertIsNone(parse_perf())
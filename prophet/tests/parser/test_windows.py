@@ -0,0 +1,102 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of disk write rate of Windows hosts"""
+
+import unittest
+
+from prophet.parser.hosts.windows import WindowsParser
+
+FREQUENCY = 10000000
+
+
+def get_samples(name, counters, seconds=None):
+    """Return raw disk samples of counters, one sample each second"""
+    seconds = seconds or range(len(counters))
+    return [{"Name": name,
+             "Timestamp_PerfTime": str(second * FREQUENCY),
+             "Frequency_PerfTime": str(FREQUENCY),
+             "DiskWriteBytesPersec": str(counter)}
+            for second, counter in zip(seconds, counters)]
+
+
+def parse_perf(samples):
+    payload = {
+        "Win32_ComputerSystem": [{}],
+        "Win32_OperatingSystem": [{}],
+        "Win32_Processor": [],
+        "Win32_PhysicalMemory": [{}],
+        "Win32_DiskDrive": [],
+        "Win32_DiskPartition": [],
+        "Win32_LogicalDisk": [],
+        "Win32_NetworkAdapterConfiguration": [],
+        "Win32_Process": [{}],
+        "Win32_PerfRawData_PerfDisk_PhysicalDisk": samples
+    }
+    return WindowsParser(payload).parse_perf()
+
+
+class ParsePerfTest(unittest.TestCase):
+
+    def test_per_disk_samples(self):
+        # Peaks of disks are in different seconds
+        perf = parse_perf(get_samples("0 C:", [0, 100, 100]) +
+                          get_samples("1 D:", [0, 0, 100]))
+
+        self.assertEqual([
+            {"device": "0 C:", "avg_write_rate": 50,
+             "peak_write_rate": 100},
+            {"device": "1 D:", "avg_write_rate": 50,
+             "peak_write_rate": 100}], perf["disk_write_rates"])
+        # Host peak is the peak of sum, not sum of peaks
+        self.assertEqual(100, perf["avg_disk_write_rate"])
+        self.assertEqual(100, perf["peak_disk_write_rate"])
+
+    def test_per_disk_samples_missing_timestamp(self):
+        perf = parse_perf(get_samples("0 C:", [0, 100, 300]) +
+                          get_samples("1 D:", [0, 100], seconds=[0, 1]))
+
+        # Only timestamps sampled for all disks are summed
+        self.assertEqual(200, perf["avg_disk_write_rate"])
+        self.assertEqual(200, perf["peak_disk_write_rate"])
+
+    def test_total_samples(self):
+        perf = parse_perf(get_samples("_Total", [0, 100, 400]))
+
+        self.assertEqual([], perf["disk_write_rates"])
+        self.assertEqual(200, perf["avg_disk_write_rate"])
+        self.assertEqual(300, perf["peak_disk_write_rate"])
+
+    def test_mixed_samples(self):
+        perf = parse_perf(get_samples("0 C:", [0, 100, 100]) +
+                          get_samples("1 D:", [0, 0, 100]) +
+                          get_samples("_Total", [0, 150, 300]))
+
+        self.assertEqual(["0 C:", "1 D:"], [
+            r["device"] for r in perf["disk_write_rates"]])
+        # _Total instance is used if it's sampled
+        self.assertEqual(150, perf["avg_disk_write_rate"])
+        self.assertEqual(150, perf["peak_disk_write_rate"])
+
+    def test_counter_reset(self):
+        perf = parse_perf(get_samples("_Total", [0, 100, 50, 250]))
+
+        self.assertEqual(150, perf["avg_disk_write_rate"])
+        self.assertEqual(200, perf["peak_disk_write_rate"])
+
+    def test_single_sample(self):
+        self.assertIsNone(parse_perf(get_samples("_Total", [100])))
+        self.assertIsNone(parse_perf(get_samples("0 C:", [100])))
+
+    def test_no_samples(self):
+        self.assertIsNone(parse_perf([]))
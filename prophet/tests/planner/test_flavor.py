@@ -0,0 +1,172 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of flavor fit of Linux, Windows and VMware hosts"""
+
+import unittest
+
+import pandas as pd
+
+from prophet.parser.hosts.linux import LinuxParser
+from prophet.parser.hosts.vmware import VMwareParser
+from prophet.parser.hosts.windows import WindowsParser
+from prophet.planner import flavor
+from prophet.report import host_report
+
+FLAVORS = [
+    {"name": "m1.small", "vcpus": 1, "ram": 2048},
+    {"name": "m1.medium", "vcpus": 2, "ram": 4096},
+    {"name": "m1.large", "vcpus": 4, "ram": 8192},
+    {"name": "m1.xlarge", "vcpus": 8, "ram": 16384}
+]
+
+# Payloads of 8 GB hosts with only fields of memory
+LINUX_PAYLOAD = {
+    "failed": {},
+    "success": {"192.168.10.2": {"ansible_facts": {
+        "ansible_memtotal_mb": 7821,
+        "ansible_memfree_mb": 1024}}}
+}
+WINDOWS_PAYLOAD = {
+    "Win32_ComputerSystem": [{"TotalPhysicalMemory": "8589463552"}],
+    "Win32_OperatingSystem": [{"FreePhysicalMemory": "1048576"}],
+    "Win32_Processor": [],
+    "Win32_PhysicalMemory": [{"Caption": "Physical Memory"}],
+    "Win32_DiskDrive": [],
+    "Win32_DiskPartition": [],
+    "Win32_LogicalDisk": [],
+    "Win32_NetworkAdapterConfiguration": [],
+    "Win32_Process": [{}]
+}
+VMWARE_PAYLOAD = {
+    "vm": {"memoryMB": 8192,
+           "esxi_host": {"192.168.10.1": {"esxi_info": {}}}}
+}
+
+MB = 1024 * 1024
+
+
+def get_hosts(names, cpus, rams, disks=None):
+    """Return hosts DataFrame, RAM in bytes is converted as report"""
+    return pd.DataFrame({
+        "name": names,
+        "cpu": cpus,
+        "ram": pd.to_numeric(host_report._convert_size_column(
+            host_report._to_array(rams))),
+        "disk": disks or [0] * len(names),
+        "disks": [1] * len(names)
+    })
+
+
+class ParseMemoryTest(unittest.TestCase):
+
+    def test_linux(self):
+        memory = LinuxParser(LINUX_PAYLOAD).parse_memory()
+        self.assertEqual(7821 * MB, memory["total_mem"])
+        self.assertEqual(1024 * MB, memory["free_mem"])
+
+    def test_windows(self):
+        memory = WindowsParser(WINDOWS_PAYLOAD).parse_memory()
+        self.assertEqual(8589463552, memory["total_mem"])
+        # Free memory of Windows is in KB
+        self.assertEqual(1048576 * 1024, memory["free_mem"])
+
+    def test_vmware(self):
+        memory = VMwareParser(VMWARE_PAYLOAD).parse_memory()
+        self.assertEqual(8192 * MB, memory["total_mem"])
+
+
+class FitHostsTest(unittest.TestCase):
+
+    def test_hosts_of_all_types_fit_the_same_flavor(self):
+        names = []
+        rams = []
+        for name, parser, payload in (
+                ("linux", LinuxParser, LINUX_PAYLOAD),
+                ("windows", WindowsParser, WINDOWS_PAYLOAD),
+                ("vmware", VMwareParser, VMWARE_PAYLOAD)):
+            names.append(name)
+            rams.append(parser(payload).parse_memory()["total_mem"])
+
+        hosts, demand = flavor.fit_hosts(
+            get_hosts(names, [2] * len(names), rams), FLAVORS)
+
+        self.assertEqual(["m1.large"] * 3, hosts["flavor"].tolist())
+        self.assertEqual(8192 * 3, demand["ram"])
+        self.assertEqual(4 * 3, demand["cores"])
+        self.assertEqual(3, demand["instances"])
+
+    def test_host_larger_than_all_flavors(self):
+        hosts, demand = flavor.fit_hosts(
+            get_hosts(["small", "huge"], [1, 16],
+                      [1024 * MB, 65536 * MB], [10240, 204800]),
+            FLAVORS)
+
+        self.assertEqual([False, True],
+                         hosts["flavor"].isnull().tolist())
+        self.assertEqual("m1.small", hosts["flavor"][0])
+        self.assertEqual(2048, hosts["flavor_ram"][0])
+        self.assertTrue(pd.isnull(hosts["flavor_ram"][1]))
+        # Host without fitted flavor is not counted in demand
+        self.assertEqual({"cores": 1, "ram": 2048, "instances": 1,
+                          "gigabytes": 10, "volumes": 1}, demand)
+
+
+class MatchFlavorsTest(unittest.TestCase):
+
+    def test_cheapest_flavor(self):
+        self.assertEqual([0, 1, 2, 3, -1], flavor.match_flavors(
+            [1, 2, 3, 1, 9], [2048, 2048, 1024, 10240, 1024],
+            FLAVORS).tolist())
+
+    def test_price(self):
+        flavors = [{"name": "cpu", "vcpus": 8, "ram": 4096, "price": 1},
+                   {"name": "ram", "vcpus": 2, "ram": 16384, "price": 2}]
+        self.assertEqual([0, 1], flavor.match_flavors(
+            [2, 2], [4096, 8192], flavors).tolist())
+
+    def test_tie_matches_the_first_flavor(self):
+        flavors = [{"name": "a", "vcpus": 4, "ram": 8192},
+                   {"name": "b", "vcpus": 4, "ram": 8192},
+                   {"name": "c", "vcpus": 8, "ram": 16384}]
+        self.assertEqual([0, 0], flavor.match_flavors(
+            [1, 4], [1024, 8192], flavors).tolist())
+
+    def test_empty_hosts(self):
+        self.assertEqual([], flavor.match_flavors(
+            [], [], FLAVORS).tolist())
+
+
+class CheckCapacityTest(unittest.TestCase):
+
+    DEMAND = {"cores": 16, "ram": 32768, "instances": 4,
+              "gigabytes": 400, "volumes": 6}
+
+    def test_quota_exceeded(self):
+        quota = {"cores": {"used": 10, "total": 20},
+                 "ram": {"used": 0, "total": 65536},
+                 "gigabytes": {"used": 0, "total": -1}}
+        rows = dict((row[0], row[1:])
+                    for row in flavor.check_capacity(self.DEMAND, quota))
+
+        self.assertEqual([16, 10, 20, False], rows["vCPU"])
+        self.assertEqual([32768, 0, 65536, True], rows["内存(MB)"])
+        # -1 means no limit
+        self.assertEqual([400, 0, -1, True], rows["卷容量(GB)"])
+        # Resources not in quota are always enough
+        self.assertEqual([4, None, None, True], rows["实例数量"])
+
+    def test_quota_exactly_enough(self):
+        rows = flavor.check_capacity(
+            self.DEMAND, {"volumes": {"used": 4, "total": 10}})
+        self.assertEqual(["卷数量", 6, 4, 10, True], rows[-1])
@@ -0,0 +1,91 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of packing hosts into migration waves"""
+
+import unittest
+
+import numpy as np
+
+from prophet.planner import wave
+
+
+def pack_waves(sizes, groups, capacity, max_hosts):
+    # Planner passes values of report columns
+    return wave.pack_waves(np.array(sizes), np.array(groups), capacity,
+                           max_hosts)
+
+
+class PackWavesTest(unittest.TestCase):
+
+    def assertWavesFit(self, waves, sizes, capacity, max_hosts):
+        sizes = np.asarray(sizes, dtype=float)
+        for index in np.unique(waves):
+            hosts = waves == index
+            self.assertLessEqual(hosts.sum(), max_hosts)
+            # Only a wave of one host can be larger than capacity
+            if hosts.sum() > 1:
+                self.assertLessEqual(sizes[hosts].sum(), capacity)
+
+    def test_capacity_of_each_wave(self):
+        sizes = [60, 50, 40, 30, 20, 10]
+        waves = pack_waves(sizes, list(range(6)), 100, 10)
+
+        self.assertWavesFit(waves, sizes, 100, 10)
+        # First fit decreasing: 60+40 and 50+30+20 fill two waves
+        self.assertEqual([0, 1, 0, 1, 1, 2], waves.tolist())
+
+    def test_max_hosts_of_each_wave(self):
+        sizes = [1] * 5
+        waves = pack_waves(sizes, list(range(5)), 100, 2)
+
+        self.assertWavesFit(waves, sizes, 100, 2)
+        self.assertEqual(3, len(np.unique(waves)))
+
+    def test_oversize_host_has_its_own_wave(self):
+        sizes = [150, 30, 20]
+        waves = pack_waves(sizes, list(range(3)), 100, 10)
+
+        self.assertEqual([0, 1, 1], waves.tolist())
+
+    def test_group_in_the_same_wave(self):
+        sizes = [30, 30, 50, 40]
+        waves = pack_waves(sizes, ["a", "b", "a", "b"], 100, 10)
+
+        self.assertEqual(waves[0], waves[2])
+        self.assertEqual(waves[1], waves[3])
+        self.assertNotEqual(waves[0], waves[1])
+
+    def test_large_group_is_split(self):
+        sizes = [60, 50, 40]
+        waves = pack_waves(sizes, ["a"] * 3, 100, 10)
+
+        self.assertWavesFit(waves, sizes, 100, 10)
+        self.assertEqual(2, len(np.unique(waves)))
+
+    def test_deterministic_order(self):
+        sizes = [10] * 6
+        groups = ["a", "b", "c", "a", "b", "c"]
+        waves = pack_waves(sizes, groups, 40, 10)
+
+        # Equal items are packed in order of input
+        self.assertEqual([0, 0, 1, 0, 0, 1], waves.tolist())
+        for _ in range(3):
+            self.assertEqual(waves.tolist(), pack_waves(
+                sizes, groups, 40, 10).tolist())
+
+    def test_empty_hosts(self):
+        waves = pack_waves([], [], 100, 10)
+
+        self.assertEqual(0, len(waves))
+        self.assertEqual(np.int_, waves.dtype.type)
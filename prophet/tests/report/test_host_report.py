@@ -0,0 +1,86 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of host report generation"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from prophet import manifest
+from prophet.report import parse_cache
+from prophet.report.host_report import HostReporter
+
+
+class HostReporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_path)
+
+    def create_package(self, files):
+        package_file = os.path.join(self.output_path, "hosts.zip")
+        with zipfile.ZipFile(package_file, "w") as package:
+            for name, data in files.items():
+                package.writestr(name, data)
+        return package_file
+
+    @mock.patch.object(parse_cache.ParseCache, "close", autospec=True)
+    @mock.patch.object(manifest.PackageReader, "close", autospec=True)
+    def test_close_on_error(self, close_reader, close_cache):
+        package_file = self.create_package({"collect_report.csv": ""})
+        reporter = HostReporter(package_file, self.output_path)
+
+        with mock.patch.object(HostReporter, "_write_rows",
+                               side_effect=RuntimeError):
+            self.assertRaises(RuntimeError, reporter.analysis)
+
+        close_reader.assert_called_once_with(reporter._reader)
+        self.assertEqual(1, close_cache.call_count)
+
+    def test_skip_corrupt_file(self):
+        files = {"LINUX/a.yaml": "{}\n", "LINUX/b.yaml": "{}\n"}
+        entries = dict((name, {
+            "format": "yaml",
+            "sha256": hashlib.sha256(data.encode()).hexdigest()})
+            for name, data in files.items())
+        # Content of b is changed after manifest is created
+        files["LINUX/b.yaml"] = "{LINUX_192.168.10.2: {}}\n"
+        files[manifest.MANIFEST_NAME] = json.dumps({"files": entries})
+
+        reporter = HostReporter(self.create_package(files),
+                                self.output_path)
+        reporter._open_package()
+        self.addCleanup(reporter._reader.close)
+
+        self.assertEqual(([], [], True),
+                         reporter._parse_file("LINUX/a.yaml"))
+        with mock.patch.object(reporter._reader, "load") as load:
+            self.assertEqual(([], [], False),
+                             reporter._parse_file("LINUX/b.yaml"))
+        load.assert_not_called()
+
+    def test_package_without_checksum(self):
+        reporter = HostReporter(
+            self.create_package({"LINUX/a.yaml": "{}\n"}),
+            self.output_path)
+        reporter._open_package()
+        self.addCleanup(reporter._reader.close)
+
+        self.assertEqual(([], [], True),
+                         reporter._parse_file("LINUX/a.yaml"))
@@ -0,0 +1,116 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of data transfer time estimation"""
+
+import unittest
+
+from prophet.report import transfer
+
+# Bytes sent in one hour with 100 Mbit/s
+HOUR_BYTES = 100 * 1000 * 1000 / 8 * 3600
+
+
+def get_host(ip, used_size=HOUR_BYTES, change_rate=0):
+    return {"basic": {"conn_ip": ip},
+            "disks": {"total_size": used_size},
+            "perf": {"change_rate": change_rate}}
+
+
+def estimate(estimator, hosts):
+    columns = {}
+    estimator.estimate(hosts, columns)
+    return dict((field, column) for (_, field), column in columns.items())
+
+
+class TransferEstimatorTest(unittest.TestCase):
+
+    SITES = [{"name": "beijing", "bandwidth": 1000,
+              "subnets": ["192.168.10.0/24", "fd00::/64"]},
+             {"name": "shanghai", "bandwidth": 50,
+              "subnets": ["192.168.20.0/24"]}]
+
+    def test_sync_hours(self):
+        estimator = transfer.TransferEstimator(
+            bandwidth=100, compression_ratio=0.5, dedup_ratio=0.5,
+            sync_interval=24)
+        columns = estimate(estimator, [
+            get_host("10.0.0.1", used_size=HOUR_BYTES * 4,
+                     change_rate=HOUR_BYTES / 3600 / 24)])
+
+        self.assertEqual([HOUR_BYTES * 4], columns["used_size"])
+        self.assertEqual([HOUR_BYTES], columns["transfer_size"])
+        self.assertEqual([1.0], columns["full_sync_hours"])
+        self.assertEqual([0.25], columns["incremental_sync_hours"])
+
+    def test_hosts_outside_all_subnets(self):
+        estimator = transfer.TransferEstimator(bandwidth=100,
+                                               sites=self.SITES)
+        columns = estimate(estimator, [
+            get_host("10.0.0.1"), get_host("fd01::1"),
+            get_host(None), get_host("not an ip")])
+
+        self.assertEqual([transfer.DEFAULT_SITE] * 4, columns["site"])
+        self.assertEqual([100.0] * 4, columns["bandwidth"])
+        self.assertEqual([1.0] * 4, columns["full_sync_hours"])
+
+    def test_hosts_in_sites(self):
+        estimator = transfer.TransferEstimator(bandwidth=100,
+                                               sites=self.SITES)
+        columns = estimate(estimator, [
+            get_host("192.168.10.5"), get_host("192.168.20.5"),
+            get_host("fd00::5")])
+
+        self.assertEqual(["beijing", "shanghai", "beijing"],
+                         columns["site"])
+        self.assertEqual([0.1, 2.0, 0.1], columns["full_sync_hours"])
+
+    def test_overlapping_subnets_use_the_first_site(self):
+        sites = [{"name": "office", "bandwidth": 10,
+                  "subnets": ["192.168.10.0/28"]},
+                 {"name": "datacenter", "bandwidth": 1000,
+                  "subnets": ["192.168.0.0/16"]}]
+        estimator = transfer.TransferEstimator(sites=sites)
+        columns = estimate(estimator, [get_host("192.168.10.5"),
+                                       get_host("192.168.10.20")])
+        self.assertEqual(["office", "datacenter"], columns["site"])
+
+        estimator = transfer.TransferEstimator(sites=sites[::-1])
+        columns = estimate(estimator, [get_host("192.168.10.5")])
+        self.assertEqual(["datacenter"], columns["site"])
+
+    def test_summary(self):
+        estimator = transfer.TransferEstimator(bandwidth=100,
+                                               sites=self.SITES)
+        # Hosts are estimated chunk by chunk
+        estimate(estimator, [get_host("192.168.20.5"),
+                             get_host("10.0.0.1")])
+        estimate(estimator, [get_host("10.0.0.2")])
+
+        rows = estimator.summary()
+        # Sites without host are skipped
+        self.assertEqual(["shanghai", transfer.DEFAULT_SITE, "总计"],
+                         [row[0] for row in rows])
+        self.assertEqual([2, 2.0], [rows[1][2], rows[1][5]])
+        # Total sync time is the time of the slowest site
+        self.assertEqual([3, 2.0], [rows[2][2], rows[2][5]])
+
+    def test_invalid_values(self):
+        sites = [{"name": "beijing", "bandwidth": 0,
+                  "subnets": ["192.168.10.0/24"]}]
+        self.assertRaisesRegex(ValueError, "site beijing",
+                               transfer.TransferEstimator, sites=sites)
+        self.assertRaises(ValueError, transfer.TransferEstimator,
+                          bandwidth=-1)
+        self.assertRaises(ValueError, transfer.TransferEstimator,
+                          compression_ratio="none")
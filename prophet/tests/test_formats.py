@@ -0,0 +1,56 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Tests of result file formats"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from prophet import formats
+
+VALUES = {"LINUX_192.168.10.2": {"results": {"cpu": 2},
+                                 "os_type": "LINUX",
+                                 "tcp_ports": None}}
+
+
+class FormatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_dump_and_load(self):
+        for name in ("yaml", "jsonl"):
+            result_format = formats.get_format(name)
+            path = os.path.join(self.path, "host" + result_format.extension)
+            formats.dump(VALUES, path, result_format)
+            self.assertEqual(VALUES, formats.load(path))
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, formats.get_format, "xml")
+        self.assertRaises(ValueError, formats.load,
+                          os.path.join(self.path, "host.xml"))
+
+    @mock.patch.object(formats, "msgpack", None)
+    def test_format_not_available(self):
+        message = "install prophet\\[msgpack\\] first"
+        self.assertRaisesRegex(ValueError, message,
+                               formats.get_format, "msgpack")
+
+        path = os.path.join(self.path, "host.msgpack")
+        with open(path, "wb") as f:
+            f.write(b"\x80")
+        self.assertRaisesRegex(ValueError, message, formats.load, path)
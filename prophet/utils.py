@@ -14,6 +14,7 @@ import logging
 import calendar
 import errno
 import functools
+import json
 import logging
 import os
 import platform
@@ -23,8 +24,20 @@ import shlex
 import signal
 import subprocess
 import time
+from datetime import date
 from datetime import datetime
 
+import yaml
+
+# NOTE: libyaml based dumper and loader are much faster than pure
+# python ones, use them if pyyaml is built with libyaml
+try:
+    from yaml import CSafeDumper as YamlDumper
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+    from yaml import SafeLoader as YamlLoader
+
 # Default path for logs
 DEFAULT_PATH = "logs"
 
@@ -371,6 +384,134 @@ def mkdir_p(path):
             raise
 
 
+# Max length of payload in log unless payload tracing is enabled
+PAYLOAD_LOG_LIMIT = 512
+
+# Log full payloads, set by --trace-payloads
+_trace_payloads = False
+
+
+def set_trace_payloads(enabled):
+    """Log full payloads instead of capped ones"""
+    global _trace_payloads
+    _trace_payloads = enabled
+
+
+class CappedRepr(object):
+    """Lazy string of payload for logging
+
+    The payload is only formatted when the log record is emitted, and
+    it's capped to PAYLOAD_LOG_LIMIT chars unless payload tracing is
+    enabled.
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        text = str(self.payload)
+        if _trace_payloads or len(text) <= PAYLOAD_LOG_LIMIT:
+            return text
+
+        return "%s...(%s chars truncated)" % (
+                text[:PAYLOAD_LOG_LIMIT], len(text) - PAYLOAD_LOG_LIMIT)
+
+
+def capped(payload):
+    """Return lazy capped payload to use as logging argument, e.g.:
+
+        logging.debug("Current disk is %s", utils.capped(disk))
+    """
+    return CappedRepr(payload)
+
+
+def save_private_json(path, data):
+    """Save data to json file which only owner can read
+
+    The file is created with 0600 mode and replaced at once, so other
+    readers never see a broken file.
+    """
+    tmp_path = "%s.tmp" % path
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def to_plain(value):
+    """Convert value to builtin types which yaml safe dumper can save
+
+    Sub classes of builtin types (e.g. AnsibleUnsafeText or enum of
+    pyVmomi) are converted to builtin types, keys of dict are converted
+    to str as json does, pyVmomi managed objects are converted to MOID
+    and data objects to dict.
+    """
+    value_type = type(value)
+    if value_type in _PLAIN_TYPES:
+        return value
+
+    if isinstance(value, dict):
+        return {_to_plain_key(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, date):
+        return value.isoformat()
+    # pyVmomi managed object
+    if hasattr(value, "_moId"):
+        return value._moId
+    # pyVmomi data object
+    if hasattr(value, "_GetPropertyList"):
+        return {p.name: to_plain(getattr(value, p.name))
+                for p in value._GetPropertyList()}
+
+    raise TypeError("Object of type %s can not be saved" %
+                    value_type.__name__)
+
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def _to_plain_key(key):
+    """Convert key of dict to str as json.dumps does"""
+    if type(key) is str:
+        return key
+    if isinstance(key, str):
+        return str(key)
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, (int, float)):
+        return json.dumps(key)
+    raise TypeError("Key of type %s can not be saved" %
+                    type(key).__name__)
+
+
+def dump_yaml(values, stream):
+    """Save values to yaml stream with the fastest safe dumper"""
+    yaml.dump(to_plain(values), stream, Dumper=YamlDumper,
+              default_flow_style=False)
+
+
+def load_yaml(stream):
+    """Load yaml stream with the fastest safe loader"""
+    return yaml.load(stream, Loader=YamlLoader)
+
+
 def init_logging(debug=False, verbose=True,
                  log_file=None, log_path=None):
     """Initilize logging for common usage
@@ -0,0 +1,75 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Benchmark result formats
+
+Host payloads in examples/hosts_collection_sample are saved and loaded
+many times in each available result format.
+
+Usage: python tools/bench_formats.py [ROUNDS]
+"""
+
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from prophet import formats
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "..", "examples",
+                           "hosts_collection_sample")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    payloads = [formats.load(path) for path in
+                sorted(glob.glob("%s/*/*.yaml" % SAMPLE_PATH))]
+    work_path = tempfile.mkdtemp()
+
+    print("Payloads: %s, rounds: %s" % (len(payloads), rounds))
+    print("%-8s %10s %10s %10s" % ("format", "size(KB)", "dump(s)",
+                                   "load(s)"))
+    try:
+        for name in sorted(formats.FORMATS):
+            result_format = formats.FORMATS[name]
+            if not result_format.is_available():
+                print("%-8s not available" % name)
+                continue
+
+            paths = [os.path.join(work_path, "%s%s" % (
+                i, result_format.extension)) for i in range(len(payloads))]
+
+            start = time.time()
+            for _ in range(rounds):
+                for payload, path in zip(payloads, paths):
+                    formats.dump(payload, path, result_format)
+            dump_time = time.time() - start
+
+            start = time.time()
+            for _ in range(rounds):
+                for path in paths:
+                    formats.load(path)
+            load_time = time.time() - start
+
+            size = sum(os.path.getsize(path) for path in paths)
+            print("%-8s %10s %10.3f %10.3f" % (
+                name, size // 1024, dump_time, load_time))
+    finally:
+        shutil.rmtree(work_path)
+
+
+if __name__ == "__main__":
+    main()
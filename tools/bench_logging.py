@@ -0,0 +1,218 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Benchmark logging cost of VMware VM collection
+
+Parse devices of fake VMs with VMwareCollector helpers, log to a file
+at INFO level as a normal run does, and compare helpers with eager
+formatting used before with lazy capped logging.
+
+Usage: python tools/bench_logging.py [VM_COUNT]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from pyVmomi import vim
+
+from prophet import utils
+from prophet.collector.hosts.vmware import VMwareCollector
+
+
+def fake_vm(i):
+    """Return devices and datastore urls of a fake VM"""
+    devices = []
+    for n in range(2):
+        devices.append(vim.vm.device.VirtualVmxnet3(
+            key=4000 + n,
+            macAddress="00:50:56:00:%02x:%02x" % (i % 256, n),
+            backing=vim.vm.device.VirtualEthernetCard.NetworkBackingInfo(
+                deviceName="VM Network %s" % n)))
+    for n in range(4):
+        devices.append(vim.vm.device.VirtualDisk(
+            key=2000 + n,
+            capacityInKB=100 * 1024 * 1024,
+            backing=vim.vm.device.VirtualDisk.FlatVer2BackingInfo(
+                fileName="[ds] vm%s/vm%s_%s.vmdk" % (i, i, n),
+                diskMode="persistent",
+                uuid="uuid-%s-%s" % (i, n),
+                contentId="content-%s" % n,
+                changeId="52 aa bb/%s" % n)))
+    datastore_urls = [vim.vm.ConfigInfo.DatastoreUrlPair(
+        name="ds", url="/vmfs/volumes/ds")]
+    return devices, datastore_urls
+
+
+# NOTE: Helpers below are copied from collector before lazy
+# logging, so the baseline is measured with its own log calls only
+
+def legacy_datastore_info(vm_name, datastore_urls):
+    datastore_info = {}
+
+    logging.info("Trying to get VM %s datastore..." % vm_name)
+    for dsurl in datastore_urls or []:
+        logging.info("Current datastore: %s" % dsurl)
+        datastore_name = dsurl.name
+        datastore_info[datastore_name] = {
+            "url": dsurl.url
+        }
+    logging.info("Success to get VM %s datastore: %s" % (
+        vm_name, datastore_info))
+
+    return datastore_info
+
+
+def legacy_disks_info(vm_name, devices):
+    disk_info = {}
+    vdisk_types = [
+        vim.VirtualDiskFlatVer1BackingInfo,
+        vim.VirtualDiskFlatVer2BackingInfo,
+        vim.VirtualDiskSparseVer1BackingInfo,
+        vim.VirtualDiskSparseVer2BackingInfo,
+        vim.VirtualDiskRawDiskMappingVer1BackingInfo,
+    ]
+    logging.info("Trying to get %s vm "
+                 "disk info..." % vm_name)
+    for dev in devices or []:
+        logging.info("Current disk is %s" % dev)
+
+        # skip if not VirtualDisk
+        if not isinstance(dev, vim.VirtualDisk):
+            logging.warning("Current disk is not "
+                            "instance of VirtualDisk")
+            continue
+
+        back_info = dev.backing
+        if not isinstance(back_info,
+                          vim.VirtualDeviceFileBackingInfo):
+            result = "non-file backing virtual disk exists"
+            logging.warning(result)
+            disk_info["backing"] = result
+            continue
+        # Query if disks in virtual types
+        if not any(map(lambda ty: isinstance(
+            back_info, ty), vdisk_types)):
+            result = ("Unsuported backing type: %s"
+                      % back_info.__name__)
+            disk_info["backing"] = result
+            continue
+
+        disk_info[dev.backing.uuid] = {
+            "capacityInKB": dev.capacityInKB,
+            "fileName":  dev.backing.fileName,
+            "diskMode":  dev.backing.diskMode,
+            "thinProvisioned": getattr(
+                dev.backing, "thinProvisioned", False),
+            "contentId":  dev.backing.contentId,
+            "changeId": dev.backing.changeId,
+            "deltaDiskFormat": getattr(
+                dev.backing, "deltaDiskFormat", False)
+        }
+
+    logging.info("Success to get %s disk "
+                 "info: %s" % (vm_name, disk_info))
+
+    return disk_info
+
+
+def legacy_network_info(vm_name, devices):
+    network_info = {}
+    logging.info("Start to get %s "
+                 "network info." % vm_name)
+    logging.debug("vm.config.hardware."
+                  "device = %s" % devices)
+
+    for dev in devices or []:
+
+        if not isinstance(dev, vim.vm.device.VirtualEthernetCard):
+            continue
+        logging.debug("Found network device: %s" % dev)
+        nt_uuid = uuid.uuid1().hex
+        network_info[nt_uuid] = {}
+
+        addr = ""
+        if isinstance(
+                dev.backing,
+                vim.VirtualEthernetCardNetworkBackingInfo):
+            addr = getattr(
+                    dev.backing, "network.summary.ipPoolId", None)
+
+        logging.info("Current dev.backing is: %s" % dev.backing)
+        device_name = getattr(
+                dev.backing, "deviceName", None)
+        if isinstance(
+                dev.backing,
+                vim.vm.device.VirtualEthernetCard.DistributedVirtualPortBackingInfo):
+            device_name = getattr(
+                    dev.backing.port, "portgroupKey", None)
+
+        network_info[nt_uuid] = {
+            "macAddress": dev.macAddress,
+            "deviceName": device_name,
+            "ipPoolId": addr
+        }
+        logging.debug("Get %s vm network %s info."
+                      % (vm_name, network_info))
+
+    logging.info("Get %s vm all nets info successful." % vm_name)
+    return network_info
+
+
+def collect(collector, vms, legacy):
+    start = time.time()
+    for i, (devices, datastore_urls) in enumerate(vms):
+        vm_name = "vm%s" % i
+        if legacy:
+            legacy_network_info(vm_name, devices)
+            legacy_datastore_info(vm_name, datastore_urls)
+            legacy_disks_info(vm_name, devices)
+            continue
+        collector._get_vm_network_info(vm_name, devices)
+        collector._get_vm_datastore_info(vm_name, datastore_urls)
+        collector._get_vm_disks_info(vm_name, devices)
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    work_path = tempfile.mkdtemp()
+
+    handler = logging.FileHandler(os.path.join(work_path, "bench.log"))
+    logger = logging.getLogger()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    collector = VMwareCollector("127.0.0.1", "user", "password", 443,
+                                None, work_path, "VMWARE")
+    vms = [fake_vm(i) for i in range(count)]
+
+    legacy = collect(collector, vms, legacy=True)
+    lazy = collect(collector, vms, legacy=False)
+
+    logger.setLevel(logging.DEBUG)
+    utils.set_trace_payloads(True)
+    traced = collect(collector, vms, legacy=False)
+
+    print("VMs: %s" % count)
+    print("Eager formatting (before):   %.3fs" % legacy)
+    print("Lazy capped logging (after): %.3fs" % lazy)
+    print("Debug with --trace-payloads: %.3fs" % traced)
+    print("Saved: %.1f%%" % ((legacy - lazy) / legacy * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Benchmark report assembly of parsed host values
+
+Build report of fake parsed hosts with per host lines and one big
+DataFrame used before, and with compiled accessors and streaming
+writer, outputs are checked to be the same. Peak memory allocated
+while building report is measured in a second run.
+
+Usage: python tools/bench_report.py [HOST_COUNT]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from prophet.report import host_report
+from prophet.report.host_report import MB, SIZE_FIELDS
+from prophet.report import mapping
+from prophet.report import writers
+
+ANALYSIS = mapping.load_mapping(mapping.DEFAULT_MAPPING)
+
+
+def fake_host(i):
+    """Return parsed values of a fake host"""
+    disks = [{"name": "disk%s" % n, "size": (n + 1) * 40 * 1024 ** 3}
+             for n in range(2)]
+    return {
+        "basic": {"host_type": "VMWARE", "hostname": "host%s" % i,
+                  "vm_name": "vm%s" % i, "conn_ip": "10.0.%s.%s" % (
+                      i // 256 % 256, i % 256),
+                  "conn_mac": None},
+        "os": {"os": "Linux", "os_version": "CentOS 7", "os_bit": 64,
+               "os_kernel": None},
+        "cpu": {"cpu_info": "Intel Xeon", "cpu_cores": 4},
+        "memory": {"memory_info": None, "total_mem": 8 * 1024 ** 3,
+                   "free_mem": 0 if i % 10 else i * 1024 ** 2},
+        "disks": {"boot_type": "BIOS", "count": len(disks),
+                  "total_size": sum(d["size"] for d in disks),
+                  "disks": disks, "partitions": []},
+        "networks": {"count": 1, "nics": [{"name": "eth0"}]},
+        "vt": {"vt_platform": "VMware", "vt_platform_ver": "6.7",
+               "vt_esxi": "192.168.10.2", "vt_cbt": True},
+        "perf": {"avg_disk_write_rate": i, "change_rate": None}
+    }
+
+
+def legacy_value(path, values):
+    """Walk dotted path of host, as reporter did before"""
+    data = values
+    for p in path.split("."):
+        data = data.get(p, None)
+        # Zero sizes are formatted as other sizes
+        if p in SIZE_FIELDS and isinstance(data, (int, float)):
+            data = '{0:.2f}'.format(data / MB)
+        if not data:
+            break
+        if isinstance(data, list):
+            data = host_report._format_output_list(data)
+            break
+    return data
+
+
+def legacy_report(hosts, report_path):
+    lines = [[legacy_value(x[0], values) for x in ANALYSIS.columns]
+             for values in hosts]
+    dt = pd.DataFrame(lines, columns=ANALYSIS.column_names)
+    dt.to_csv(report_path, encoding="utf-8-sig", index=False)
+
+
+def streaming_report(hosts, report_path):
+    reporter = host_report.HostReporter(None, None)
+    writer = writers.get_writer(report_path, ANALYSIS.column_names)
+    writer.open()
+    outputs = [(writer, host_report.compile_mapping(ANALYSIS))]
+    for i in range(0, len(hosts), host_report.ROW_CHUNK_SIZE):
+        reporter._write_rows(outputs,
+                             hosts[i:i + host_report.ROW_CHUNK_SIZE])
+    writer.close()
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024.0 / 1024
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    work_path = tempfile.mkdtemp()
+    legacy_path = os.path.join(work_path, "legacy.csv")
+    streaming_path = os.path.join(work_path, "streaming.csv")
+
+    hosts = [fake_host(i) for i in range(count)]
+    legacy = timed(legacy_report, hosts, legacy_path)
+    streaming = timed(streaming_report, hosts, streaming_path)
+
+    with open(legacy_path, "rb") as a, open(streaming_path, "rb") as b:
+        same = a.read() == b.read()
+
+    print("Hosts: %s" % count)
+    print("Per host lines (before):   %.3fs, peak %.1f MB" % (
+        legacy, peak_memory(legacy_report, hosts, legacy_path)))
+    print("Streaming columns (after): %.3fs, peak %.1f MB" % (
+        streaming, peak_memory(streaming_report, hosts, streaming_path)))
+    print("Same output: %s" % same)
+
+
+if __name__ == "__main__":
+    main()
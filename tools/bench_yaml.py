@@ -0,0 +1,99 @@
+# Copyright (c) 2021 OnePro Cloud Ltd.
+#
+#   prophet is licensed under Mulan PubL v2.
+#   You can use this software according to the terms and conditions of the Mulan PubL v2.
+#   You may obtain a copy of Mulan PubL v2 at:
+#
+#            http://license.coscl.org.cn/MulanPubL-2.0
+#
+#   THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+#   EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+#   MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+#   See the Mulan PubL v2 for more details.
+
+"""Benchmark saving and loading of host yaml files
+
+Host payloads in examples/hosts_collection_sample are saved and loaded
+many times, with json round-trip and pure python safe dumper used
+before, and with libyaml dumper and loader used now. Strings of payload
+are wrapped like AnsibleUnsafeText returned by ansible.
+
+Usage: python tools/bench_yaml.py [ROUNDS]
+"""
+
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+import yaml
+
+from prophet import utils
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "..", "examples",
+                           "hosts_collection_sample")
+
+
+class UnsafeText(str):
+    """Same as AnsibleUnsafeText, safe dumper can't represent it"""
+
+
+def wrap(value):
+    if isinstance(value, dict):
+        return {k: wrap(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [wrap(v) for v in value]
+    if isinstance(value, str):
+        return UnsafeText(value)
+    return value
+
+
+def legacy_dump(values, stream):
+    data_values = json.loads(json.dumps(values))
+    yaml.safe_dump(data_values, stream, default_flow_style=False)
+
+
+def bench(func, payloads, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        for payload in payloads:
+            func(payload)
+    return time.time() - start
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    payloads = []
+    for path in sorted(glob.glob("%s/*/*.yaml" % SAMPLE_PATH)):
+        with open(path, "r") as yf:
+            payloads.append(wrap(yaml.safe_load(yf)))
+    texts = []
+    for payload in payloads:
+        stream = io.StringIO()
+        utils.dump_yaml(payload, stream)
+        texts.append(stream.getvalue())
+
+    size = sum(len(text) for text in texts)
+    print("Payloads: %s, %s KB, rounds: %s" % (
+        len(payloads), size // 1024, rounds))
+    print("Dumper: %s, loader: %s" % (utils.YamlDumper.__name__,
+                                      utils.YamlLoader.__name__))
+
+    legacy = bench(lambda p: legacy_dump(p, io.StringIO()),
+                   payloads, rounds)
+    current = bench(lambda p: utils.dump_yaml(p, io.StringIO()),
+                    payloads, rounds)
+    print("Dump, json round-trip + safe_dump (before): %.3fs" % legacy)
+    print("Dump, to_plain + libyaml (after):           %.3fs" % current)
+
+    legacy = bench(yaml.safe_load, texts, rounds)
+    current = bench(utils.load_yaml, texts, rounds)
+    print("Load, safe_load (before): %.3fs" % legacy)
+    print("Load, libyaml (after):    %.3fs" % current)
+
+
+if __name__ == "__main__":
+    main()